@@ -0,0 +1,98 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+from backend.customer_backend_mgr import CustomerAccount, ItineraryCollectionManager
+from backend.itinerary_store import ItineraryStore
+
+
+class CustomerAccountRepository:
+    """
+    SQLite-backed (WAL mode) store of customer accounts.
+
+    Accounts are loaded on demand through the primary-key / unique-username indexes and kept in a bounded
+    LRU of recently used accounts, so hot lookups by username or customer_id are dictionary hits and
+    cold ones are a single indexed query. With an itinerary_store, every account handed out keeps its
+    itineraries there.
+    """
+
+    def __init__(self, db_path: str = ":memory:", max_cached_accounts: int = 10000,
+                 itinerary_store: ItineraryStore = None):
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS customer_accounts (
+                customer_id   TEXT PRIMARY KEY,
+                username      TEXT NOT NULL UNIQUE,
+                password_hash BLOB NOT NULL
+            )""")
+        self._connection.commit()
+        self._lock = threading.RLock()
+        self._max_cached_accounts = max_cached_accounts
+        self._accounts_by_id: "OrderedDict[str, CustomerAccount]" = OrderedDict()
+        self._ids_by_username = {}
+        self._itinerary_store = itinerary_store
+
+    def add(self, customer_account: CustomerAccount):
+        with self._lock:
+            self._connection.execute(
+                "INSERT INTO customer_accounts (customer_id, username, password_hash) VALUES (?, ?, ?)",
+                (customer_account.get_customer_id(), customer_account.get_username(),
+                 customer_account.get_password_hash()))
+            self._connection.commit()
+            self._remember(customer_account)
+
+    def get_by_customer_id(self, customer_id: str) -> Optional[CustomerAccount]:
+        with self._lock:
+            customer_account = self._accounts_by_id.get(customer_id)
+            if customer_account is not None:
+                self._accounts_by_id.move_to_end(customer_id)
+                return customer_account
+
+            row = self._connection.execute(
+                "SELECT customer_id, username, password_hash FROM customer_accounts WHERE customer_id = ?",
+                (customer_id,)).fetchone()
+            return self._load(row)
+
+    def get_by_username(self, username: str) -> Optional[CustomerAccount]:
+        with self._lock:
+            customer_id = self._ids_by_username.get(username)
+            if customer_id is not None:
+                return self.get_by_customer_id(customer_id)
+
+            row = self._connection.execute(
+                "SELECT customer_id, username, password_hash FROM customer_accounts WHERE username = ?",
+                (username,)).fetchone()
+            return self._load(row)
+
+    def exists(self, username: str) -> bool:
+        return self.get_by_username(username) is not None
+
+    def __len__(self):
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM customer_accounts").fetchone()[0]
+
+    def _load(self, row) -> Optional[CustomerAccount]:
+        if row is None:
+            return None
+        customer_account = CustomerAccount.from_password_hash(row[0], row[1], row[2])
+        self._remember(customer_account)
+        return customer_account
+
+    def _remember(self, customer_account: CustomerAccount):
+        customer_id = customer_account.get_customer_id()
+        if self._itinerary_store is not None:
+            customer_account.itineraries_manager = ItineraryCollectionManager(customer_id, self._itinerary_store)
+        self._accounts_by_id[customer_id] = customer_account
+        self._accounts_by_id.move_to_end(customer_id)
+        self._ids_by_username[customer_account.get_username()] = customer_id
+
+        while len(self._accounts_by_id) > self._max_cached_accounts:
+            _, evicted = self._accounts_by_id.popitem(last=False)
+            self._ids_by_username.pop(evicted.get_username(), None)
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
@@ -18,7 +18,7 @@ class AirCanadaOnlineAPI:
         return flights
 
     @staticmethod
-    def reserve_flight(flight: AirCanadaFlight, customers_info: list):
+    def reserve_flight(flight: AirCanadaFlight, customers_info: list, idempotency_key=None):
         confirmation_id = '1234AirCanadaXXr34'  # None for failure
         return confirmation_id
         #return None     # Try None
@@ -25,7 +25,7 @@ class TurkishOnlineAPI:
         return flights
 
     @staticmethod
-    def reserve_flight(customers_info: list, flight: TurkishFlight):
+    def reserve_flight(customers_info: list, flight: TurkishFlight, idempotency_key=None):
         confirmation_id = '1234TTTTT'  # None for failure
         return confirmation_id
         # return None     # Try None '1234TTTTT'
@@ -21,7 +21,7 @@ class HiltonHotelAPI:
         return rooms
 
     @staticmethod
-    def reserve_room(room: HiltonRoom, customers_info: list):
+    def reserve_room(room: HiltonRoom, customers_info: list, idempotency_key=None):
         confirmation_id = '45544HiltonHotelAPI4545'  # None for failure
         return confirmation_id
 
@@ -21,7 +21,7 @@ class MarriottHotelAPI:
         return rooms
 
     @staticmethod
-    def do_room_reservation(room: MarriottRoom, customers_info: list):
+    def do_room_reservation(room: MarriottRoom, customers_info: list, idempotency_key=None):
         confirmation_id = '45544MarriottHotelAPI4545'
         return confirmation_id
 
@@ -1,8 +1,12 @@
+import logging
 
 # In practice, you may download their code here to contact remotely Paypal
 # This is external code. It knows NOTHING about ur project.
 # We use it. It doesn't use our code base
 
+_logger = logging.getLogger(__name__)
+
+
 class PayPalCreditCard:
     def __init__(self, name = None, address= None,
           id= None, expire_date= None, ccv= None):
@@ -17,11 +21,11 @@ class PayPalOnlinePaymentAPI:
     def __init__(self, card_info : PayPalCreditCard = None):
         self.card_info = None
 
-    def pay_money(self, money):
-        print(f'PayPalOnlinePaymentAPI pay_money')
+    def pay_money(self, money, idempotency_key=None):
+        _logger.debug("PayPalOnlinePaymentAPI pay_money %s", money)
         return True, '12345PayPal'    # Call PayPal backend
         # Switch it to False to see failures and their handling
 
-    def cancel_money(self, transaction_id):
-        print(f'PayPalOnlinePaymentAPI cancel_money')
+    def cancel_money(self, transaction_id, amount=None):   # amount=None refunds the whole transaction
+        _logger.debug("PayPalOnlinePaymentAPI cancel_money %s", transaction_id)
         return True
\ No newline at end of file
@@ -1,3 +1,6 @@
+import logging
+
+_logger = logging.getLogger(__name__)
 
 
 class StripeUserInfo:
@@ -14,11 +17,11 @@ class StripeCardInfo:
 
 class StripePaymentAPI:
     @staticmethod
-    def withdraw_money(user_info, card_info, money):
-        print(f'StripePaymentAPI request')
+    def withdraw_money(user_info, card_info, money, idempotency_key=None):
+        _logger.debug("StripePaymentAPI withdraw_money %s", money)
         return True, '12345Stripe'           # Call Stripe backend
 
 
     @staticmethod
-    def cancel_money(transaction_id):
+    def cancel_money(transaction_id, amount=None):   # amount=None refunds the whole transaction
         return True
\ No newline at end of file
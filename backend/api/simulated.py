@@ -0,0 +1,254 @@
+# Simulated stand-ins for the vendor APIs in this package, for load and latency testing.
+# Each one subclasses the real stub, so it can be handed to the matching adapter in backend.providers
+# (e.g. TurkishFlightOnlineOnlineAPI(SimulatedTurkishOnlineAPI(profile))) without other changes.
+
+import itertools
+import math
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Callable
+
+from backend.api.flights.turkish_external import TurkishOnlineAPI, TurkishFlight
+from backend.api.flights.aircanada_external import AirCanadaOnlineAPI, AirCanadaFlight
+from backend.api.hotels.hilton_external import HiltonHotelAPI, HiltonRoom
+from backend.api.hotels.marriott_external import MarriottHotelAPI, MarriottRoom
+from backend.api.payment.paypal_external import PayPalOnlinePaymentAPI, PayPalCreditCard
+from backend.api.payment.stripe_external import StripePaymentAPI
+
+ROOM_TYPES = ("Interior View", "City View", "Deluxe View", "Sea View", "Suite")
+
+
+class LatencyDistribution:
+    """Per-call latency in seconds; build one with the constant/uniform/normal/lognormal/exponential helpers."""
+
+    def __init__(self, sampler: Callable[[random.Random], float], description: str):
+        self._sampler = sampler
+        self.description = description
+
+    def sample(self, rng: random.Random) -> float:
+        return max(0.0, self._sampler(rng))
+
+    @classmethod
+    def constant(cls, seconds: float) -> "LatencyDistribution":
+        return cls(lambda rng: seconds, f"constant({seconds})")
+
+    @classmethod
+    def uniform(cls, low: float, high: float) -> "LatencyDistribution":
+        return cls(lambda rng: rng.uniform(low, high), f"uniform({low}, {high})")
+
+    @classmethod
+    def normal(cls, mean: float, stddev: float) -> "LatencyDistribution":
+        return cls(lambda rng: rng.gauss(mean, stddev), f"normal({mean}, {stddev})")
+
+    @classmethod
+    def lognormal(cls, median: float, sigma: float) -> "LatencyDistribution":
+        """Long-tailed, like most real vendor APIs: p50 is median, p99 about median * e^(2.33 sigma)."""
+        return cls(lambda rng: rng.lognormvariate(math.log(median), sigma), f"lognormal({median}, {sigma})")
+
+    @classmethod
+    def exponential(cls, mean: float) -> "LatencyDistribution":
+        return cls(lambda rng: rng.expovariate(1.0 / mean), f"exponential({mean})")
+
+    def __repr__(self):
+        return self.description
+
+
+class SimulationProfile:
+    """
+    How a simulated vendor behaves.
+
+    Every call waits a latency drawn from latency; with probability timeout_rate it instead waits timeout
+    seconds and raises TimeoutError, with probability error_rate it raises ConnectionError after the
+    latency. Searches return result_count items. With a seed, every client created from the profile gets
+    its own reproducible random stream (seed, seed + 1, ... in creation order).
+    """
+
+    def __init__(self, latency: LatencyDistribution = None, error_rate: float = 0.0, timeout_rate: float = 0.0,
+                 timeout: float = 5.0, result_count: int = 10, seed: int = None,
+                 sleep: Callable[[float], None] = time.sleep):
+        self.latency = latency or LatencyDistribution.constant(0.0)
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.timeout = timeout
+        self.result_count = result_count
+        self.seed = seed
+        self.sleep = sleep
+        self._seeds = itertools.count(seed) if seed is not None else None
+        self._lock = threading.Lock()
+
+    def new_random(self) -> random.Random:
+        if self._seeds is None:
+            return random.Random()
+        with self._lock:
+            return random.Random(next(self._seeds))
+
+
+class _SimulatedVendor:
+    def _init_simulation(self, profile: SimulationProfile, name: str):
+        self.profile = profile or SimulationProfile()
+        self.vendor_name = name
+        self._rng = self.profile.new_random()
+        self._rng_lock = threading.Lock()
+        self._results_by_key = {}
+        self.calls = 0
+
+    def _random(self, draw: Callable[[random.Random], object]):
+        with self._rng_lock:
+            return draw(self._rng)
+
+    def _simulate_call(self, operation: str):
+        with self._rng_lock:
+            self.calls += 1
+            outcome = self._rng.random()
+            latency = self.profile.latency.sample(self._rng)
+
+        if outcome < self.profile.timeout_rate:
+            self.profile.sleep(self.profile.timeout)
+            raise TimeoutError(f"{self.vendor_name} {operation} timed out after {self.profile.timeout}s.")
+
+        self.profile.sleep(latency)
+        if outcome < self.profile.timeout_rate + self.profile.error_rate:
+            raise ConnectionError(f"{self.vendor_name} {operation} failed.")
+
+    def _confirmation_id(self, prefix: str) -> str:
+        return f"{prefix}{self._random(lambda rng: rng.getrandbits(48)):012x}"
+
+    def _once(self, operation: str, prefix: str, idempotency_key) -> str:
+        """A new confirmation id, or the one already issued for idempotency_key, as real vendors do."""
+        with self._rng_lock:
+            confirmation_id = self._results_by_key.get(idempotency_key) if idempotency_key is not None else None
+        if confirmation_id is not None:
+            return confirmation_id
+
+        self._simulate_call(operation)
+        confirmation_id = self._confirmation_id(prefix)
+        if idempotency_key is not None:
+            with self._rng_lock:
+                confirmation_id = self._results_by_key.setdefault(idempotency_key, confirmation_id)
+        return confirmation_id
+
+    def _trip_dates(self, date_from, date_to):
+        """Vendor-style dd-mm-yyyy dates near the requested ones."""
+        start = date_from if isinstance(date_from, datetime) else datetime(2030, 1, 1)
+        end = date_to if isinstance(date_to, datetime) else start + timedelta(days=7)
+        shift = timedelta(days=self._random(lambda rng: rng.randint(0, 2)))
+        return (start + shift).strftime("%d-%m-%Y"), (end + shift).strftime("%d-%m-%Y")
+
+
+class SimulatedTurkishOnlineAPI(TurkishOnlineAPI, _SimulatedVendor):
+    def __init__(self, profile: SimulationProfile = None):
+        self._init_simulation(profile, "Turkish Airlines")
+        self._date_from = None
+        self._date_to = None
+
+    def set_from_to_info(self, datetime_from, from_loc, datetime_to, to_loc):
+        self._date_from = datetime_from
+        self._date_to = datetime_to
+
+    def get_available_flights(self):
+        self._simulate_call("get_available_flights")
+        flights = []
+        for _ in range(self.profile.result_count):
+            date_from, date_to = self._trip_dates(self._date_from, self._date_to)
+            flights.append(TurkishFlight(self._random(lambda rng: rng.randint(150, 900)), date_from, date_to))
+        return flights
+
+    def reserve_flight(self, customers_info: list, flight: TurkishFlight, idempotency_key=None):
+        return self._once("reserve_flight", "TK", idempotency_key)
+
+    def cancel_flight(self, confirmation_id):
+        self._simulate_call("cancel_flight")
+        return True
+
+
+class SimulatedAirCanadaOnlineAPI(AirCanadaOnlineAPI, _SimulatedVendor):
+    def __init__(self, profile: SimulationProfile = None):
+        self._init_simulation(profile, "AirCanada")
+
+    def get_flights(self, from_loc, from_date, to_loc, to_date, adults, children):
+        self._simulate_call("get_flights")
+        flights = []
+        for _ in range(self.profile.result_count):
+            date_from, date_to = self._trip_dates(from_date, to_date)
+            price = self._random(lambda rng: rng.randint(150, 900)) * max(1, adults + children)
+            flights.append(AirCanadaFlight(price, date_from, date_to))
+        return flights
+
+    def reserve_flight(self, flight: AirCanadaFlight, customers_info: list, idempotency_key=None):
+        return self._once("reserve_flight", "AC", idempotency_key)
+
+    def cancel_flight(self, confirmation_id):
+        self._simulate_call("cancel_flight")
+        return True
+
+
+class SimulatedHiltonHotelAPI(HiltonHotelAPI, _SimulatedVendor):
+    def __init__(self, profile: SimulationProfile = None):
+        self._init_simulation(profile, "Hilton")
+
+    def search_rooms(self, location, from_date, to_date, adults, children, needed_rooms):
+        self._simulate_call("search_rooms")
+        date_from, date_to = self._trip_dates(from_date, to_date)
+        return [HiltonRoom(self._random(lambda rng: rng.choice(ROOM_TYPES)),
+                           self._random(lambda rng: rng.randint(0, 12)),
+                           float(self._random(lambda rng: rng.randint(80, 600))), date_from, date_to)
+                for _ in range(self.profile.result_count)]
+
+    def reserve_room(self, room: HiltonRoom, customers_info: list, idempotency_key=None):
+        return self._once("reserve_room", "HILTON", idempotency_key)
+
+    def cancel_room(self, confirmation_id):
+        self._simulate_call("cancel_room")
+        return True
+
+
+class SimulatedMarriottHotelAPI(MarriottHotelAPI, _SimulatedVendor):
+    def __init__(self, profile: SimulationProfile = None):
+        self._init_simulation(profile, "Marriott")
+
+    def search_available_rooms(self, location, from_date, to_date, adults, children, needed_rooms):
+        self._simulate_call("search_available_rooms")
+        date_from, date_to = self._trip_dates(from_date, to_date)
+        return [MarriottRoom(self._random(lambda rng: rng.choice(ROOM_TYPES)),
+                             self._random(lambda rng: rng.randint(0, 12)),
+                             float(self._random(lambda rng: rng.randint(80, 600))), date_from, date_to)
+                for _ in range(self.profile.result_count)]
+
+    def do_room_reservation(self, room: MarriottRoom, customers_info: list, idempotency_key=None):
+        return self._once("do_room_reservation", "MARRIOTT", idempotency_key)
+
+    def cancel_room(self, confirmation_id):
+        self._simulate_call("cancel_room")
+        return True
+
+
+class _SimulatedPaymentVendor(_SimulatedVendor):
+    def _charge(self, operation: str, prefix: str, idempotency_key):
+        return True, self._once(operation, prefix, idempotency_key)
+
+
+class SimulatedPayPalOnlinePaymentAPI(PayPalOnlinePaymentAPI, _SimulatedPaymentVendor):
+    def __init__(self, card_info: PayPalCreditCard = None, profile: SimulationProfile = None):
+        super().__init__(card_info)
+        self._init_simulation(profile, "PayPal")
+
+    def pay_money(self, money, idempotency_key=None):
+        return self._charge("pay_money", "PAYPAL", idempotency_key)
+
+    def cancel_money(self, transaction_id, amount=None):
+        self._simulate_call("cancel_money")
+        return True
+
+
+class SimulatedStripePaymentAPI(StripePaymentAPI, _SimulatedPaymentVendor):
+    def __init__(self, profile: SimulationProfile = None):
+        self._init_simulation(profile, "Stripe")
+
+    def withdraw_money(self, user_info, card_info, money, idempotency_key=None):
+        return self._charge("withdraw_money", "STRIPE", idempotency_key)
+
+    def cancel_money(self, transaction_id, amount=None):
+        self._simulate_call("cancel_money")
+        return True
@@ -0,0 +1,197 @@
+# Local HTTP stand-in for the vendor APIs, for load testing with real sockets and serialization.
+#
+#   python -m backend.api.simulated_http --port 8750 --median-latency 0.08 --error-rate 0.01
+#
+# Every vendor method is served as POST /<vendor>/<method> with a JSON list of arguments.
+# HttpVendorClient("http://127.0.0.1:8750", "turkish") is a drop-in vendor object for the adapters.
+
+import argparse
+import http.client
+import json
+import threading
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from backend.api.flights.turkish_external import TurkishFlight
+from backend.api.flights.aircanada_external import AirCanadaFlight
+from backend.api.hotels.hilton_external import HiltonRoom
+from backend.api.hotels.marriott_external import MarriottRoom
+from backend.api.payment.paypal_external import PayPalCreditCard
+from backend.api.payment.stripe_external import StripeUserInfo, StripeCardInfo
+from backend.api.simulated import (LatencyDistribution, SimulationProfile, SimulatedTurkishOnlineAPI,
+                                   SimulatedAirCanadaOnlineAPI, SimulatedHiltonHotelAPI, SimulatedMarriottHotelAPI,
+                                   SimulatedPayPalOnlinePaymentAPI, SimulatedStripePaymentAPI)
+
+VENDOR_TYPES = {cls.__name__: cls for cls in (TurkishFlight, AirCanadaFlight, HiltonRoom, MarriottRoom,
+                                              PayPalCreditCard, StripeUserInfo, StripeCardInfo)}
+
+VENDORS = {
+    "turkish": SimulatedTurkishOnlineAPI,
+    "aircanada": SimulatedAirCanadaOnlineAPI,
+    "hilton": SimulatedHiltonHotelAPI,
+    "marriott": SimulatedMarriottHotelAPI,
+    "paypal": lambda profile: SimulatedPayPalOnlinePaymentAPI(profile=profile),
+    "stripe": SimulatedStripePaymentAPI,
+}
+
+
+def encode(value):
+    if isinstance(value, datetime):
+        return {"__datetime__": value.isoformat()}
+    if isinstance(value, (list, tuple)):
+        return [encode(item) for item in value]
+    if type(value).__name__ in VENDOR_TYPES:
+        return {"__type__": type(value).__name__, **{key: encode(item) for key, item in vars(value).items()}}
+    return value
+
+
+def decode(value):
+    if isinstance(value, list):
+        return [decode(item) for item in value]
+    if isinstance(value, dict):
+        if "__datetime__" in value:
+            return datetime.fromisoformat(value["__datetime__"])
+        if "__type__" in value:
+            vendor_object = VENDOR_TYPES[value["__type__"]].__new__(VENDOR_TYPES[value["__type__"]])
+            vendor_object.__dict__.update({key: decode(item) for key, item in value.items() if key != "__type__"})
+            return vendor_object
+    return value
+
+
+class SimulatedVendorServer:
+    """Serves one simulated client per vendor over HTTP from a background thread."""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, profile: SimulationProfile = None):
+        self.vendors = {name: factory(profile) for name, factory in VENDORS.items()}
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def _handler_class(self):
+        vendors = self.vendors
+
+        class VendorRequestHandler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                _, vendor_name, method_name = (self.path.split("/") + ["", ""])[:3]
+                vendor = vendors.get(vendor_name)
+                if vendor is None or method_name.startswith("_") or not hasattr(vendor, method_name):
+                    return self._reply(404, {"error": f"Unknown vendor method {self.path}."})
+
+                arguments = decode(json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"[]"))
+                try:
+                    result = getattr(vendor, method_name)(*arguments)
+                except TimeoutError as e:
+                    return self._reply(504, {"error": str(e)})
+                except Exception as e:
+                    return self._reply(503, {"error": str(e)})
+                self._reply(200, {"result": encode(result)})
+
+            def _reply(self, status: int, body: dict):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return VendorRequestHandler
+
+    def start(self) -> "SimulatedVendorServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="simulated-vendors", daemon=True)
+        self._thread.start()
+        return self
+
+    def serve_forever(self):
+        self._server.serve_forever()
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class HttpVendorClient:
+    """
+    Calls a vendor on a SimulatedVendorServer: every method of the real vendor class becomes a POST.
+    Each thread keeps its own keep-alive connection. Server-side timeouts raise TimeoutError and other
+    failures ConnectionError, as the in-process simulators do.
+    """
+
+    def __init__(self, base_url: str, vendor: str, timeout: float = 30.0):
+        parts = urlsplit(base_url)
+        self._host = parts.hostname
+        self._port = parts.port
+        self._vendor = vendor
+        self._timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self) -> http.client.HTTPConnection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            connection = self._local.connection = http.client.HTTPConnection(self._host, self._port,
+                                                                              timeout=self._timeout)
+        return connection
+
+    def call(self, method: str, *arguments):
+        body = json.dumps(encode(list(arguments))).encode()
+        connection = self._connection()
+        try:
+            connection.request("POST", f"/{self._vendor}/{method}", body, {"Content-Type": "application/json"})
+            response = connection.getresponse()
+            payload = json.loads(response.read())
+        except (OSError, http.client.HTTPException) as e:
+            connection.close()
+            self._local.connection = None
+            raise ConnectionError(f"{self._vendor} {method} request failed: {e}") from e
+
+        if response.status == 504:
+            raise TimeoutError(payload["error"])
+        if response.status != 200:
+            raise ConnectionError(payload["error"])
+        return decode(payload["result"])
+
+    def __getattr__(self, method: str):
+        if method.startswith("_"):
+            raise AttributeError(method)
+        return lambda *arguments: self.call(method, *arguments)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m backend.api.simulated_http",
+                                     description="Local HTTP stand-in for the flight, hotel and payment vendors.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8750)
+    parser.add_argument("--median-latency", type=float, default=0.05, help="lognormal median latency in seconds")
+    parser.add_argument("--latency-sigma", type=float, default=0.5)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--timeout-rate", type=float, default=0.0)
+    parser.add_argument("--timeout", type=float, default=5.0)
+    parser.add_argument("--results", type=int, default=10, help="items per search")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    profile = SimulationProfile(LatencyDistribution.lognormal(args.median_latency, args.latency_sigma),
+                                error_rate=args.error_rate, timeout_rate=args.timeout_rate, timeout=args.timeout,
+                                result_count=args.results, seed=args.seed)
+    server = SimulatedVendorServer(args.host, args.port, profile)
+    print(f"Simulated vendors on {server.url}: {', '.join(server.vendors)}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
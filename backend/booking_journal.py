@@ -0,0 +1,344 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, List
+
+from backend.structured_logging import log_context
+
+logger = logging.getLogger(__name__)
+
+STARTED = "started"
+# PAYING and BOOKING are written before the gateway or vendor call, PAID and BOOKED after it succeeds.
+PAYING = "paying"
+PAID = "paid"
+BOOKING = "booking"
+BOOKED = "booked"
+# The vendor turned the booking down, so there is nothing to cancel.
+DECLINED = "declined"
+ROLLING_BACK = "rolling_back"
+REFUNDED = "refunded"
+CANCELLED = "cancelled"
+ROLLBACK_FAILED = "rollback_failed"
+COMPLETED = "completed"
+ROLLED_BACK = "rolled_back"
+
+TERMINAL_STEPS = (COMPLETED, ROLLED_BACK)
+
+# Payment entries for a batch-paid itinerary carry this instead of a reservation key.
+ITINERARY_PAYMENT = "itinerary"
+
+
+class BookingJournal:
+    """
+    Append-only write-ahead journal of booking saga steps, one JSON object per line.
+
+    record() returns once its entry is on disk. A single writer thread writes every entry queued since its
+    last fsync and then fsyncs once (group commit), so concurrent checkouts share the fsync cost. Each batch
+    goes out in one unbuffered os.write on an O_APPEND descriptor, so processes sharing the journal, such as
+    pre-forked workers, never interleave their lines.
+    """
+
+    def __init__(self, path: str, max_batch_size: int = 512, clock: Callable[[], float] = time.time):
+        self.path = path
+        self._fd = self._open(path)
+        if os.fstat(self._fd).st_size > 0:
+            with open(path, "rb") as journal_file:
+                journal_file.seek(-1, os.SEEK_END)
+                if journal_file.read(1) != b"\n":
+                    # Terminate a line torn by a crash so the next entry starts on its own line.
+                    self._write(b"\n")
+        self._max_batch_size = max_batch_size
+        self._clock = clock
+        self._pending = deque()
+        self._pending_changed = threading.Condition()
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="booking-journal-writer", daemon=True)
+        self._writer.start()
+
+    @staticmethod
+    def _open(path: str) -> int:
+        return os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+
+    def _write(self, data: bytes):
+        # A regular file takes the whole buffer in one write unless the disk fills up.
+        written = os.write(self._fd, data)
+        while written < len(data):
+            data = data[written:]
+            written = os.write(self._fd, data)
+
+    def append(self, saga_id: str, step: str, **fields) -> Future:
+        entry = {"saga": saga_id, "step": step, "ts": self._clock()}
+        entry.update(fields)
+        line = json.dumps(entry, separators=(",", ":")).encode() + b"\n"
+
+        future = Future()
+        with self._pending_changed:
+            if self._closed:
+                raise RuntimeError("Booking journal is closed.")
+            self._pending.append((line, future))
+            self._pending_changed.notify()
+        return future
+
+    def record(self, saga_id: str, step: str, **fields):
+        """Append an entry and wait until it is durable."""
+        self.append(saga_id, step, **fields).result()
+
+    def _write_loop(self):
+        while True:
+            with self._pending_changed:
+                self._pending_changed.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                batch = [self._pending.popleft() for _ in range(min(len(self._pending), self._max_batch_size))]
+
+            try:
+                self._write(b"".join(line for line, _ in batch))
+                os.fsync(self._fd)
+            except Exception as e:
+                logger.error("Failed to write %d booking journal entries: %s", len(batch), e)
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for _, future in batch:
+                future.set_result(None)
+
+    def compact(self):
+        """
+        Rewrite the journal with only the entries of sagas still in flight, so the next replay skips finished
+        ones. Meant for startup, before other threads record into the journal.
+        """
+        sagas = replay_journal(self.path)
+        temporary_path = f"{self.path}.compact"
+        with open(temporary_path, "wb") as compacted:
+            for saga in sagas.values():
+                for entry in saga.entries:
+                    compacted.write(json.dumps(entry, separators=(",", ":")).encode() + b"\n")
+            compacted.flush()
+            os.fsync(compacted.fileno())
+
+        with self._pending_changed:
+            self._pending_changed.wait_for(lambda: not self._pending)
+            os.replace(temporary_path, self.path)
+            os.close(self._fd)
+            self._fd = self._open(self.path)
+
+    def close(self):
+        with self._pending_changed:
+            self._closed = True
+            self._pending_changed.notify()
+        self._writer.join()
+        os.close(self._fd)
+
+
+class SagaState:
+    """What the journal says happened to one itinerary's booking."""
+
+    __slots__ = ("saga_id", "customer_id", "reservations", "payment_intents", "payments", "booking_intents",
+                 "bookings", "refunded", "cancelled", "rolling_back", "entries")
+
+    def __init__(self, saga_id: str):
+        self.saga_id = saga_id
+        self.customer_id = None
+        self.reservations: Dict[str, dict] = {}
+        self.payment_intents: Dict[str, dict] = {}
+        self.payments: Dict[str, dict] = {}
+        self.booking_intents: Dict[str, dict] = {}
+        self.bookings: Dict[str, dict] = {}
+        self.refunded = set()
+        self.cancelled = set()
+        self.rolling_back = False
+        self.entries: List[dict] = []
+
+    def apply(self, entry: dict):
+        self.entries.append(entry)
+        step = entry["step"]
+        if step == STARTED:
+            self.customer_id = entry.get("customer_id")
+            self.reservations = {reservation["key"]: reservation for reservation in entry["reservations"]}
+        elif step == PAYING:
+            self.payment_intents[entry["key"]] = entry
+        elif step == PAID:
+            self.payments[entry["key"]] = entry
+        elif step == BOOKING:
+            self.booking_intents[entry["key"]] = entry
+        elif step == BOOKED:
+            self.bookings[entry["key"]] = entry
+        elif step == REFUNDED:
+            self.refunded.add(entry["key"])
+        elif step in (CANCELLED, DECLINED):
+            self.cancelled.add(entry["key"])
+        elif step in (ROLLING_BACK, ROLLBACK_FAILED):
+            self.rolling_back = True
+
+    def is_fully_booked(self) -> bool:
+        return bool(self.reservations) and all(key in self.bookings for key in self.reservations)
+
+    def unsettled_payments(self) -> Dict[str, dict]:
+        """PAID entries of charges not refunded yet."""
+        return {key: entry for key, entry in self.payments.items() if key not in self.refunded}
+
+    def unconfirmed_payments(self) -> Dict[str, dict]:
+        """PAYING intents of charges sent to the gateway whose transaction id never reached the journal."""
+        return {key: entry for key, entry in self.payment_intents.items()
+                if key not in self.payments and key not in self.refunded}
+
+    def unconfirmed_bookings(self) -> List[str]:
+        """Keys of bookings sent to a vendor whose confirmation never reached the journal."""
+        return [key for key in self.booking_intents if key not in self.bookings and key not in self.cancelled]
+
+
+_SAGA_PREFIX = b'{"saga":"'
+_STEP_SEPARATOR = b'","step":"'
+
+
+def _saga_and_step(line: bytes):
+    """Read the saga id and step from the fixed prefix append() writes, without parsing the whole entry."""
+    if line.startswith(_SAGA_PREFIX):
+        separator = line.find(_STEP_SEPARATOR, len(_SAGA_PREFIX))
+        if separator != -1:
+            step_start = separator + len(_STEP_SEPARATOR)
+            step_end = line.find(b'"', step_start)
+            if step_end != -1:
+                return line[len(_SAGA_PREFIX):separator].decode(), line[step_start:step_end].decode()
+
+    entry = json.loads(line)
+    return entry["saga"], entry["step"]
+
+
+def replay_journal(path: str) -> Dict[str, SagaState]:
+    """
+    Return the sagas in a journal that never reached a terminal step.
+
+    The first pass only reads each line's saga id and step to find the finished sagas; the second fully
+    parses just the entries of sagas still in flight, which on a day's journal are a small minority.
+    """
+    sagas: Dict[str, SagaState] = {}
+    if not os.path.exists(path):
+        return sagas
+
+    finished = set()
+    with open(path, "rb") as journal_file:
+        for line in journal_file:
+            try:
+                saga_id, step = _saga_and_step(line)
+            except ValueError:
+                # A torn line from a crash mid-write; everything before it is intact.
+                logger.error("Skipping unreadable booking journal entry: %r", line[:80])
+                continue
+            if step in TERMINAL_STEPS:
+                finished.add(saga_id)
+
+        journal_file.seek(0)
+        for line in journal_file:
+            try:
+                saga_id, _ = _saga_and_step(line)
+            except ValueError:
+                continue
+            if saga_id in finished:
+                continue
+
+            saga = sagas.get(saga_id)
+            if saga is None:
+                saga = sagas[saga_id] = SagaState(saga_id)
+            saga.apply(json.loads(line))
+    return sagas
+
+
+class SagaRecovery:
+    """
+    Finishes or compensates the sagas a crashed process left in flight.
+
+    A saga whose reservations were all booked and which had not started rolling back is finished:
+    on_finished(saga) stores the itinerary (idempotently, keyed by the saga id), then it is marked completed.
+    Any other saga is compensated: confirmed bookings are cancelled through cancel_booking(booked_entry) and
+    charges refunded through refund_payment(paid_entry), which refunds the journaled transaction id; both
+    return True on success. A booking or charge sent out without a journaled confirmation or transaction id
+    cannot be undone from here; it is logged for manual follow-up. Sagas whose compensation fails stay in
+    flight and are retried on the next start.
+    """
+
+    def __init__(self, journal: BookingJournal, cancel_booking: Callable[[dict], bool],
+                 refund_payment: Callable[[dict], bool], on_finished: Callable[[SagaState], None] = None):
+        self.journal = journal
+        self._cancel_booking = cancel_booking
+        self._refund_payment = refund_payment
+        self._on_finished = on_finished
+
+    def run(self, compact: bool = True) -> Dict[str, int]:
+        sagas = replay_journal(self.journal.path)
+        outcome = {COMPLETED: 0, ROLLED_BACK: 0, ROLLBACK_FAILED: 0}
+        for saga in sagas.values():
+            with log_context(saga_id=saga.saga_id):
+                step = self.recover(saga)
+            outcome[step] += 1
+
+        if sagas:
+            logger.info("Recovered %d interrupted bookings: %s", len(sagas), outcome)
+        if compact:
+            self.journal.compact()
+        return outcome
+
+    def recover(self, saga: SagaState) -> str:
+        if not saga.rolling_back and saga.is_fully_booked():
+            if self._on_finished is not None:
+                self._on_finished(saga)
+            self.journal.record(saga.saga_id, COMPLETED)
+            return COMPLETED
+
+        self.journal.record(saga.saga_id, ROLLING_BACK)
+        failed = False
+        for key, booked in saga.bookings.items():
+            if key not in saga.cancelled:
+                failed |= not self._compensate(saga, key, CANCELLED, self._cancel_booking, booked)
+        for key, paid in saga.unsettled_payments().items():
+            failed |= not self._compensate(saga, key, REFUNDED, self._refund_payment, paid)
+        for key, intent in saga.unconfirmed_payments().items():
+            logger.error("Saga %s may hold an unconfirmed charge of %s through %s under idempotency key %s; "
+                         "refund it with the gateway.", saga.saga_id, intent.get("amount"),
+                         intent.get("payment_method"), intent.get("payment_key"))
+            failed = True
+        for key in saga.unconfirmed_bookings():
+            intent = saga.booking_intents[key]
+            logger.error("Saga %s may hold an unconfirmed %s booking with %s under idempotency key %s; "
+                         "cancel it with the vendor.", saga.saga_id, intent.get("type"), intent.get("provider"), key)
+            failed = True
+
+        step = ROLLBACK_FAILED if failed else ROLLED_BACK
+        self.journal.record(saga.saga_id, step)
+        return step
+
+    def _compensate(self, saga: SagaState, key: str, step: str, action: Callable[[dict], bool], entry: dict) -> bool:
+        try:
+            succeeded = action(entry)
+        except Exception as e:
+            logger.error("Compensation of saga %s (%s %s) failed: %s", saga.saga_id, step, key, e)
+            return False
+        if succeeded:
+            self.journal.record(saga.saga_id, step, key=key)
+        return bool(succeeded)
+
+
+def main(argv: List[str]) -> int:
+    if len(argv) != 2:
+        print("usage: python -m backend.booking_journal <journal path>")
+        return 2
+
+    start = time.perf_counter()
+    sagas = replay_journal(argv[1])
+    elapsed = time.perf_counter() - start
+    for saga in sagas.values():
+        state = "rolling back" if saga.rolling_back else f"{len(saga.bookings)}/{len(saga.reservations)} booked"
+        print(f"{saga.saga_id}: {state}, {len(saga.payments)} payments, {len(saga.refunded)} refunded, "
+              f"{len(saga.cancelled)} cancelled")
+    print(f"{len(sagas)} sagas in flight, replayed in {elapsed:.2f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv))
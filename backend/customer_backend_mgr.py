@@ -1,17 +1,31 @@
+import contextvars
+import copy
+import heapq
+import itertools
 import logging
+import sys
+import threading
+import uuid
 from abc import ABC, abstractmethod
+from array import array
+from concurrent.futures import (Executor, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed, wait,
+                                FIRST_EXCEPTION)
+from functools import partial
 from datetime import datetime
-from typing import List, Dict, Tuple
-import bcrypt
-from backend.api.flights.turkish_external import *
-from backend.api.flights.aircanada_external import *
-from backend.api.hotels.hilton_external import *
-from backend.api.hotels.marriott_external import *
-from backend.api.payment.paypal_external import *
-from backend.api.payment.stripe_external import *
+from typing import Any, AsyncIterator, Callable, Iterator, List, Dict, Tuple, Union
+from backend.api.payment.paypal_external import PayPalOnlinePaymentAPI, PayPalCreditCard
+from backend.api.payment.stripe_external import StripePaymentAPI, StripeCardInfo, StripeUserInfo
 from backend.exceptions import *
+from backend.search_cache import FlightSearchCache, HotelAvailabilityCache
+from backend.retry import RetryPolicy, IdempotencyStore
+from backend.session_tokens import SessionTokenSigner, SessionClaims
+from backend.itinerary_store import (ItineraryStore, ItineraryIndex, ItineraryRecord, ItineraryPage, ReservationRecord,
+                                     format_travel_date)
+from backend import booking_journal
+from backend.booking_journal import BookingJournal
+from backend import metrics
+from backend.structured_logging import log_context
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 #########################################    --Customer Account Container--    #########################################
@@ -21,7 +35,7 @@ class CustomerAccount:
         self._customer_id = customer_id
         self._username = username
         self.__password_hash = self._hash_password(password)
-        self.itineraries_manager = ItineraryCollectionManager()
+        self.itineraries_manager = ItineraryCollectionManager(customer_id)
         self.payment_methods_manager = PaymentMethodsManager()
 
     def get_customer_id(self):
@@ -31,11 +45,33 @@ class CustomerAccount:
         return self._username
 
     def _hash_password(self, password: str):
+        import bcrypt  # Imported on first use to keep it off the startup path.
+        start = metrics.clock()
         salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode(), salt)
+        password_hash = bcrypt.hashpw(password.encode(), salt)
+        metrics.BCRYPT_SECONDS.labels("hash").observe(metrics.clock() - start)
+        return password_hash
 
     def verify_password(self, password: str):
-        return bcrypt.checkpw(password.encode(), self.__password_hash)
+        import bcrypt
+        start = metrics.clock()
+        verified = bcrypt.checkpw(password.encode(), self.__password_hash)
+        metrics.BCRYPT_SECONDS.labels("verify").observe(metrics.clock() - start)
+        return verified
+
+    def get_password_hash(self) -> bytes:
+        return self.__password_hash
+
+    @classmethod
+    def from_password_hash(cls, customer_id: str, username: str, password_hash: bytes) -> "CustomerAccount":
+        """Rebuild a stored account without re-hashing its password."""
+        customer_account = cls.__new__(cls)
+        customer_account._customer_id = customer_id
+        customer_account._username = username
+        customer_account.__password_hash = password_hash
+        customer_account.itineraries_manager = ItineraryCollectionManager(customer_id)
+        customer_account.payment_methods_manager = PaymentMethodsManager()
+        return customer_account
 
 ########################################################################################################################
 
@@ -62,12 +98,32 @@ class PasswordAuthenticator(AuthinticatorInterface):
 
 
 class CustomerLoginManager:
-    def __init__(self, authinticator: AuthinticatorInterface):
+    def __init__(self, authinticator: AuthinticatorInterface, token_signer: SessionTokenSigner = None,
+                 account_repository: "CustomerAccountRepository" = None):
         self.__authinticator = authinticator
+        self.__token_signer = token_signer
+        self.__account_repository = account_repository
 
     def authenticate_customer(self, username: str, password: str, customer_account: CustomerAccount) -> bool:
         return self.__authinticator.login(username, password, customer_account)
 
+    def resolve_account(self, username: str) -> CustomerAccount:
+        customer_account = self.__account_repository.get_by_username(username)
+        if customer_account is None:
+            raise LoginError()
+        return customer_account
+
+    def login(self, username: str, password: str, customer_account: CustomerAccount = None) -> str:
+        """Run the full password check once and return a signed session token for later requests."""
+        if customer_account is None:
+            customer_account = self.resolve_account(username)
+        if not self.authenticate_customer(username, password, customer_account):
+            raise LoginError()
+        return self.__token_signer.issue(customer_account.get_customer_id(), customer_account.get_username())
+
+    def validate_session(self, token: str) -> SessionClaims:
+        return self.__token_signer.verify(token)
+
 ########################################################################################################################
 
 
@@ -75,26 +131,26 @@ class CustomerLoginManager:
 
 class PaymentMethodInterface(ABC):
     @abstractmethod
-    def pay(self, amount):
+    def pay(self, amount, idempotency_key=None):
         pass
 
 
 class RefundablePaymentMethodInterface(PaymentMethodInterface):
     @abstractmethod
-    def refund(self, transaction_id):
+    def refund(self, transaction_id, amount=None):
         pass
 
 
 class PayPalPayment(RefundablePaymentMethodInterface):
-    def __init__(self, card: PayPalCreditCard):
+    def __init__(self, card: PayPalCreditCard, paypal_api: PayPalOnlinePaymentAPI = None):
         self.__card = card
-        self.paypal_api = PayPalOnlinePaymentAPI(card)
+        self.paypal_api = paypal_api or PayPalOnlinePaymentAPI(card)
 
-    def pay(self, amount):
-        return self.paypal_api.pay_money(amount)
+    def pay(self, amount, idempotency_key=None):
+        return self.paypal_api.pay_money(amount, idempotency_key)
 
-    def refund(self, transaction_id):
-        return self.paypal_api.cancel_money(transaction_id)
+    def refund(self, transaction_id, amount=None):
+        return self.paypal_api.cancel_money(transaction_id, amount)
 
     def __str__(self):
         return (f"PayPalCreditcard:- Name: {self.__card.name}, Number: {self.__card.id}, "
@@ -102,22 +158,29 @@ class PayPalPayment(RefundablePaymentMethodInterface):
 
 
 class StripePayment(RefundablePaymentMethodInterface):
-    def __init__(self, card: StripeCardInfo, user_info: StripeUserInfo):
+    def __init__(self, card: StripeCardInfo, user_info: StripeUserInfo, stripe_api: StripePaymentAPI = None):
         self.__stripe_card = card
         self.user_info = user_info
-        self.stripe_api = StripePaymentAPI()
+        self.stripe_api = stripe_api or StripePaymentAPI()
 
-    def pay(self, amount):
-        return self.stripe_api.withdraw_money(self.user_info, self.__stripe_card, amount)
+    def pay(self, amount, idempotency_key=None):
+        return self.stripe_api.withdraw_money(self.user_info, self.__stripe_card, amount, idempotency_key)
 
-    def refund(self, transaction_id):
-        return self.stripe_api.cancel_money(transaction_id)
+    def refund(self, transaction_id, amount=None):
+        return self.stripe_api.cancel_money(transaction_id, amount)
 
     def __str__(self):
         return (f"StripeCard:- Name: {self.user_info.name}, Number: {self.__stripe_card.id}, "
                 f"Expiry Date: {self.__stripe_card.expire_date}")
 
 
+def payment_method_name(payment_method: PaymentMethodInterface) -> str:
+    """Class name of a payment method, looking through wrappers that keep it as .payment_method."""
+    while hasattr(payment_method, "payment_method"):
+        payment_method = payment_method.payment_method
+    return type(payment_method).__name__
+
+
 class PaymentManager:
     def __init__(self):
         self.payment_method = None
@@ -125,19 +188,21 @@ class PaymentManager:
     def set_payment_method(self, payment_method: RefundablePaymentMethodInterface):
         self.payment_method = payment_method
 
-    def process_payment(self, amount):
+    def process_payment(self, amount, idempotency_key=None):
         if amount > 0:
-            return self.payment_method.pay(amount)
+            return self.payment_method.pay(amount, idempotency_key)
         else:
-            logger.info("\nThe should be grater than zero.")
+            logger.info("The should be grater than zero.")
 
 
-    def process_refund(self, transaction_id):
+    def process_refund(self, transaction_id, amount=None):
         if transaction_id is not None:
-            return self.payment_method.refund(transaction_id)
+            if amount is None:
+                return self.payment_method.refund(transaction_id)
+            return self.payment_method.refund(transaction_id, amount)
         else:
-            logger.info("\nThere is no transaction id.")
-            return False, None
+            logger.info("There is no transaction id.")
+            return False
 
 ########################################################################################################################
 
@@ -153,6 +218,7 @@ class ReservationInterface(ABC):
         self._booking_confirmation_id = None
         self._payment_transaction_id = None
         self._reservation_date = datetime.now()
+        self.idempotency_key = uuid.uuid4().hex
 
     def get_customer_id(self):
         return self._customer_id
@@ -178,6 +244,17 @@ class ReservationInterface(ABC):
     def get_payment_transaction_id(self):
         return self._payment_transaction_id
 
+    def renew_idempotency_key(self):
+        """Start a new booking attempt: a fresh key, without the last attempt's confirmation or charge."""
+        self._booking_confirmation_id = None
+        self._payment_transaction_id = None
+        self.idempotency_key = uuid.uuid4().hex
+
+    def to_record(self) -> ReservationRecord:
+        date_from, date_to = self.get_travel_dates()
+        return ReservationRecord(self.reservation_type, self.get_provider_name(), self.get_cost(),
+                                 format_travel_date(date_from), format_travel_date(date_to), str(self))
+
 
     @abstractmethod
     def book(self):
@@ -187,6 +264,14 @@ class ReservationInterface(ABC):
     def cancel(self):
         pass
 
+    @abstractmethod
+    def get_provider_name(self) -> str:
+        pass
+
+    @abstractmethod
+    def get_travel_dates(self) -> Tuple[datetime, datetime]:
+        pass
+
     @abstractmethod
     def __str__(self):
         pass
@@ -200,6 +285,7 @@ class Itinerary:
     def __init__(self):
         self._reservations: List[ReservationInterface] = []
         self._total_cost = 0.0
+        self.idempotency_key = uuid.uuid4().hex
 
 
     def get_reservations(self) -> List[ReservationInterface]:
@@ -212,6 +298,15 @@ class Itinerary:
         self._reservations.append(reservation)
         self._total_cost += reservation.get_cost()
 
+    def renew_idempotency_keys(self):
+        self.idempotency_key = uuid.uuid4().hex
+        for reservation in self._reservations:
+            reservation.renew_idempotency_key()
+
+    def to_record(self, customer_id: str) -> ItineraryRecord:
+        return ItineraryRecord(None, customer_id, self._total_cost,
+                               [reservation.to_record() for reservation in self._reservations], self.idempotency_key)
+
     # def remove_reservation(self, reservation: ReservationInterface):
     #     if reservation in self._reservations:
     #         self._reservations.remove(reservation)
@@ -223,14 +318,81 @@ class Itinerary:
 #######################################    --Customer's Itineraries Manager--    #######################################
 
 class ItineraryCollectionManager:
-    def __init__(self):
+    """
+    A customer's itineraries. Kept in memory by default; with an ItineraryStore they are persisted through
+    its group-committed writer and read back page by page.
+
+    The find_* queries use secondary indexes on travel date, total cost, provider and reservation type
+    (the store's SQLite indexes, or an ItineraryIndex maintained on insert) instead of scanning.
+    """
+
+    def __init__(self, customer_id: str = None, store: ItineraryStore = None):
+        self._customer_id = customer_id
+        self._store = store
         self._itineraries: List[Itinerary] = []
+        self._index = ItineraryIndex()
 
     def add_itinerary(self, itinerary: Itinerary):
+        record = itinerary.to_record(self._customer_id)
+        if self._store is not None:
+            return self._store.append(record)
+        self._index.add(len(self._itineraries), record)
         self._itineraries.append(itinerary)
 
     def get_itineraries(self):
-        return self._itineraries.copy()
+        if self._store is None:
+            return self._itineraries.copy()
+
+        itineraries = []
+        page = self.get_page()
+        itineraries.extend(page)
+        while page.next_cursor is not None:
+            page = self.get_page(page.next_cursor)
+            itineraries.extend(page)
+        return itineraries
+
+    def get_page(self, cursor: int = None, limit: int = 20) -> ItineraryPage:
+        """One page of itineraries in booking order; pass the previous page's next_cursor to continue."""
+        if limit < 1:
+            raise ValueError(f"Page limit must be at least 1, got {limit}")
+        if self._store is not None:
+            return self._store.page(self._customer_id, cursor, limit)
+
+        start = cursor or 0
+        end = start + limit
+        return ItineraryPage(self._itineraries[start:end], end if end < len(self._itineraries) else None)
+
+    def count(self) -> int:
+        if self._store is not None:
+            return self._store.count(self._customer_id)
+        return len(self._itineraries)
+
+    def find_by_travel_date(self, date_from=None, date_to=None, limit: int = None) -> list:
+        """Itineraries starting between date_from and date_to (inclusive), earliest first."""
+        if self._store is not None:
+            return self._store.find_by_travel_date(self._customer_id, date_from, date_to, limit)
+        return [self._itineraries[i] for i in self._index.find_by_travel_date(date_from, date_to, limit)]
+
+    def find_upcoming(self, limit: int = None) -> list:
+        return self.find_by_travel_date(datetime.now(), limit=limit)
+
+    def find_by_total_cost(self, min_cost: float = None, max_cost: float = None, limit: int = None) -> list:
+        """Itineraries whose total cost is between min_cost and max_cost (inclusive), cheapest first."""
+        if self._store is not None:
+            return self._store.find_by_total_cost(self._customer_id, min_cost, max_cost, limit)
+        return [self._itineraries[i] for i in self._index.find_by_total_cost(min_cost, max_cost, limit)]
+
+    def find_by_provider(self, provider: str, limit: int = None) -> list:
+        """Itineraries with a reservation from provider (airline or hotel name), in booking order."""
+        if self._store is not None:
+            return self._store.find_by_provider(self._customer_id, provider, limit)
+        return [self._itineraries[i] for i in self._index.find_by_provider(provider, limit)]
+
+    def find_by_reservation_type(self, reservation_type: str, limit: int = None) -> list:
+        """Itineraries with a reservation of reservation_type ("flight" or "hotel"), in booking order."""
+        if self._store is not None:
+            return self._store.find_by_reservation_type(self._customer_id, reservation_type, limit)
+        return [self._itineraries[i] for i in self._index.find_by_reservation_type(reservation_type, limit)]
 
 
 ########################################################################################################################
@@ -259,14 +421,80 @@ class PaymentMethodsManager:
 #############################################    --Itinerary Manager--    ##############################################
 
 class SingleItineraryManager:
-    def __init__(self, itinerary: Itinerary, payment_mgr: PaymentManager):
+    def __init__(self, itinerary: Itinerary, payment_mgr: PaymentManager, max_workers: int = None,
+                 batch_payment: bool = False, retry_policy: RetryPolicy = None,
+                 idempotency_store: IdempotencyStore = None, journal: BookingJournal = None):
         self._itinerary = itinerary
         self.payment_mgr = payment_mgr
+        # max_workers=None keeps the original one-by-one booking.
+        self._max_workers = max_workers
+        # batch_payment charges the itinerary total once instead of once per reservation.
+        self._batch_payment = batch_payment
+        self._itinerary_transaction_id = None
+        # Transient gateway errors are retried; the store makes each retried step resolve to its first result.
+        self.retry_policy = retry_policy
+        self.idempotency_store = idempotency_store
+        # Every saga step is journaled before the next one starts, so a crash can be recovered on restart.
+        self.journal = journal
+        self._rollback_failed = False
 
     def add_reservation(self, reservation: ReservationInterface):
         self._itinerary.add_reservation(reservation)
 
-    def book_all_reservations(self):
+    @property
+    def rollback_failed(self) -> bool:
+        """Whether the last failed booking left charges or bookings that could not be undone yet."""
+        return self._rollback_failed
+
+    def _journal(self, step: str, **fields):
+        if self.journal is not None:
+            self.journal.record(self._itinerary.idempotency_key, step, **fields)
+
+    def book_all_reservations(self, on_booked: Callable[[Itinerary], None] = None):
+        """
+        Book the itinerary as a saga. on_booked(itinerary) stores it once everything is booked; the saga is
+        only journaled as completed after it returns, so if it raises, recovery stores the itinerary on the
+        next start.
+        """
+        reservations = self._itinerary.get_reservations()
+        self._rollback_failed = False
+        self._journal(booking_journal.STARTED,
+                      customer_id=reservations[0].get_customer_id() if reservations else None,
+                      reservations=[{"key": reservation.idempotency_key, "type": reservation.reservation_type,
+                                     "provider": reservation.get_provider_name(), "cost": reservation.get_cost(),
+                                     "record": reservation.to_record().to_row()}
+                                    for reservation in reservations])
+
+        start = metrics.clock()
+        with log_context(saga_id=self._itinerary.idempotency_key):
+            status = self._book_all()
+        outcome = "booked" if status else "rollback_failed" if self._rollback_failed else "rolled_back"
+        metrics.SAGA_OUTCOMES.labels(outcome).inc()
+        metrics.SAGA_SECONDS.labels(outcome).observe(metrics.clock() - start)
+
+        if status:
+            if on_booked is not None:
+                on_booked(self._itinerary)
+            self._journal(booking_journal.COMPLETED)
+        else:
+            self._journal(booking_journal.ROLLBACK_FAILED if self._rollback_failed else booking_journal.ROLLED_BACK)
+            # The idempotency store keeps every step's result under these keys, so booking again with them
+            # would replay the refunded charge and the cancelled bookings. A retry is a new saga.
+            self._itinerary.renew_idempotency_keys()
+            self._itinerary_transaction_id = None
+        return status
+
+    def _book_all(self):
+        if self._batch_payment:
+            try:
+                self._process_itinerary_payment()
+            except PaymentProcessingError as e:
+                logger.error("Error occurred during booking: %s", e)
+                return False
+
+        if self._max_workers is not None and len(self._itinerary.get_reservations()) > 1:
+            return self._book_all_concurrently()
+
         booked_reservations = []
 
         try:
@@ -279,80 +507,352 @@ class SingleItineraryManager:
             return True
 
         except (PaymentProcessingError, BookingError) as e:
-            logger.error(f"\nError occurred during booking: {e}")
+            logger.error("Error occurred during booking: %s", e)
             self._handle_booking_failure(booked_reservations)
             return False
 
+    def _book_all_concurrently(self):
+        reservations = self._itinerary.get_reservations()
+        with ThreadPoolExecutor(max_workers=min(self._max_workers, len(reservations)),
+                                thread_name_prefix="itinerary-booking") as executor:
+            # Each task runs in a copy of this context, so its log records keep the saga id.
+            futures = {executor.submit(contextvars.copy_context().run, self._process_reservation, reservation):
+                       reservation for reservation in reservations}
+            done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+
+            if all(future.exception() is None for future in done) and not not_done:
+                return True
+
+            # First failure: stop reservations that have not started, let running ones settle.
+            for future in not_done:
+                future.cancel()
+            wait(not_done)
+
+            errors = [future.exception() for future in futures if not future.cancelled() and future.exception()]
+            booked_reservations = [reservation for future, reservation in futures.items()
+                                   if not future.cancelled() and future.exception() is None]
+            for error in errors:
+                logger.error("Error occurred during booking: %s", error)
+
+            self._journal(booking_journal.ROLLING_BACK)
+            self._refund_payments()
+            compensations = [executor.submit(contextvars.copy_context().run, self._compensate, reservation)
+                             for reservation in booked_reservations]
+            wait(compensations)
+
+        unexpected = [error for error in errors if not isinstance(error, (PaymentProcessingError, BookingError))]
+        if unexpected:
+            raise unexpected[0]
+        return False
+
+    def _compensate(self, reservation: ReservationInterface):
+        try:
+            self._process_cancel(reservation)
+        except (BookingError, CancellationError, PaymentProcessingError) as e:
+            self._rollback_failed = True
+            logger.error("Error occurred during cancellation: %s", e)
+
     def _process_reservation(self, reservation: ReservationInterface):
-        self._process_payment(reservation)
+        if not self._batch_payment:
+            self._process_payment(reservation)
         self._process_book(reservation)
 
 
 
     def _handle_booking_failure(self, booked_reservations: List[ReservationInterface]):
+        self._journal(booking_journal.ROLLING_BACK)
         try:
             self._rollback_booked_reservations(booked_reservations)
 
         except (BookingError, CancellationError, PaymentProcessingError) as e:
-            logger.error(f"\nError occurred during cancellation: {e}")
+            self._rollback_failed = True
+            logger.error("Error occurred during cancellation: %s", e)
 
 
 
     def _rollback_booked_reservations(self, booked_reservations: List[ReservationInterface]):
+        self._refund_payments()
         for reservation in booked_reservations:
-            self._process_refund(reservation)
             self._process_cancel(reservation)
 
 
+    def _refund_payments(self):
+        """Refund what was charged: the itinerary total in batch mode, else every paid reservation, batched."""
+        if self._batch_payment:
+            self._refund_itinerary_payment()
+            return
+
+        paid_reservations = [reservation for reservation in self._itinerary.get_reservations()
+                             if reservation.get_payment_transaction_id() is not None]
+        try:
+            self.refund_reservations(paid_reservations)
+        except PaymentProcessingError as e:
+            self._rollback_failed = True
+            logger.error("Error occurred during cancellation: %s", e)
+
+
+    def _run_step(self, key: str, step: Callable, succeeded: Callable = bool):
+        transient_errors = (NetworkError,) if self.retry_policy is None else self.retry_policy.retry_on
+        call = step if self.retry_policy is None else partial(self.retry_policy.call, step)
+        try:
+            if self.idempotency_store is None:
+                return call()
+            return self.idempotency_store.run(key, call, succeeded)
+        except transient_errors as e:
+            raise NetworkError(f"{e}") from e
+
+
     def _process_book(self, reservation: ReservationInterface):
-        status =  reservation.book()
+        # book() sends the reservation's idempotency key, so retries cannot book twice with vendors that
+        # deduplicate on it (see FlightOnlineAPIInterface.book_flight).
+        self._journal(booking_journal.BOOKING, key=reservation.idempotency_key, type=reservation.reservation_type,
+                      provider=reservation.get_provider_name())
+        try:
+            confirmation_id = self._run_step(f"{reservation.idempotency_key}:book",
+                                             lambda: reservation.get_confirmation_id() if reservation.book() else None,
+                                             succeeded=lambda result: result is not None)
+        except NetworkError as e:
+            # The vendor may still have booked it, which the rollback cannot cancel without a confirmation id:
+            # the saga stays in flight and recovery reports the unconfirmed booking.
+            self._rollback_failed = True
+            logger.error("Booking gave up after transient errors: %s", e)
+            raise BookingError(f"\nFailed to book reservation [{reservation}]: {e}") from e
 
-        if not status:
-            self._process_refund(reservation)
+        if confirmation_id is None:
+            self._journal(booking_journal.DECLINED, key=reservation.idempotency_key)
+            # The charge for this reservation is refunded with the others by the rollback.
             raise BookingError(f"\nFailed to book reservation [{reservation}]")
 
+        reservation.set_confirmation_id(confirmation_id)
+        self._journal(booking_journal.BOOKED, key=reservation.idempotency_key, confirmation_id=confirmation_id,
+                      type=reservation.reservation_type, provider=reservation.get_provider_name())
+
 
     #Rollback for cancellation not supported yet.
     def _process_cancel(self, reservation: ReservationInterface):
-        status = reservation.cancel()
+        try:
+            status = self._run_step(f"{reservation.idempotency_key}:cancel", reservation.cancel)
+        except NetworkError as e:
+            raise CancellationError(f"\nFailed to cancel reservation [{reservation}]: {e}") from e
 
         if not status:
             raise CancellationError(f"\nFailed to cancel reservation [{reservation}].")
+        self._journal(booking_journal.CANCELLED, key=reservation.idempotency_key)
 
 
     def _process_payment(self, reservation: ReservationInterface):
-        status, payment_confirmation_id = self.payment_mgr.process_payment(reservation.get_cost())
+        key = f"{reservation.idempotency_key}:payment"
+        self._journal(booking_journal.PAYING, key=reservation.idempotency_key, payment_key=key,
+                      amount=reservation.get_cost(), payment_method=payment_method_name(self.payment_mgr.payment_method))
+        try:
+            status, payment_confirmation_id = self._run_step(
+                key, lambda: self.payment_mgr.process_payment(reservation.get_cost(), key),
+                succeeded=lambda result: bool(result[0]))
+        except NetworkError as e:
+            raise PaymentProcessingError(f"\nFailed to pay for reservation [{reservation}]: {e}") from e
 
         if not status:
             raise PaymentProcessingError(f"\nFailed to pay for reservation [{reservation}].")
 
         reservation.set_payment_transaction_id(payment_confirmation_id)
+        self._journal(booking_journal.PAID, key=reservation.idempotency_key, transaction_id=payment_confirmation_id,
+                      amount=reservation.get_cost(),
+                      payment_method=payment_method_name(self.payment_mgr.payment_method))
 
 
-    #Rollback for refund money not supported yet.
-    def _process_refund(self, reservation: ReservationInterface):
-        status = self.payment_mgr.process_refund(reservation.get_payment_transaction_id())
+    def _process_itinerary_payment(self):
+        key = f"{self._itinerary.idempotency_key}:payment"
+        self._journal(booking_journal.PAYING, key=booking_journal.ITINERARY_PAYMENT, payment_key=key,
+                      amount=self._itinerary.get_total_cost(),
+                      payment_method=payment_method_name(self.payment_mgr.payment_method))
+        try:
+            status, payment_confirmation_id = self._run_step(
+                key, lambda: self.payment_mgr.process_payment(self._itinerary.get_total_cost(), key),
+                succeeded=lambda result: bool(result[0]))
+        except NetworkError as e:
+            raise PaymentProcessingError(f"\nFailed to pay for itinerary: {e}") from e
 
         if not status:
-            raise PaymentProcessingError(f"\nFailed to refund payment for reservation [{reservation}].")
+            raise PaymentProcessingError(f"\nFailed to pay for itinerary total {self._itinerary.get_total_cost()}.")
+
+        self._itinerary_transaction_id = payment_confirmation_id
+        self._journal(booking_journal.PAID, key=booking_journal.ITINERARY_PAYMENT,
+                      transaction_id=payment_confirmation_id, amount=self._itinerary.get_total_cost(),
+                      payment_method=payment_method_name(self.payment_mgr.payment_method))
+        for reservation in self._itinerary.get_reservations():
+            reservation.set_payment_transaction_id(payment_confirmation_id)
+
+
+    def _refund_itinerary_payment(self):
+        try:
+            if not self._run_step(f"{self._itinerary.idempotency_key}:refund",
+                                  lambda: self.payment_mgr.process_refund(self._itinerary_transaction_id)):
+                raise PaymentProcessingError(f"\nFailed to refund itinerary payment [{self._itinerary_transaction_id}].")
+            self._journal(booking_journal.REFUNDED, key=booking_journal.ITINERARY_PAYMENT)
+        except (PaymentProcessingError, NetworkError) as e:
+            self._rollback_failed = True
+            logger.error("Error occurred during cancellation: %s", e)
+
+
+    def refund_reservations(self, reservations: List[ReservationInterface]):
+        """
+        Refund reservations with one (partial) refund call per payment transaction for the summed costs.
+        Every transaction is tried; PaymentProcessingError names the ones that could not be refunded.
+        """
+        reservations_by_transaction: Dict[str, List[ReservationInterface]] = {}
+        for reservation in reservations:
+            reservations_by_transaction.setdefault(reservation.get_payment_transaction_id(), []).append(reservation)
+
+        failed_transactions = []
+        for transaction_id, refunded in reservations_by_transaction.items():
+            amount = sum(reservation.get_cost() for reservation in refunded)
+            try:
+                status = self._run_step(f"{self._itinerary.idempotency_key}:refund:{transaction_id}",
+                                        partial(self.payment_mgr.process_refund, transaction_id, amount))
+            except NetworkError as e:
+                logger.error("Refund of transaction %s gave up after transient errors: %s", transaction_id, e)
+                status = False
+
+            if not status:
+                failed_transactions.append(transaction_id)
+                continue
+            for reservation in refunded:
+                self._journal(booking_journal.REFUNDED, key=reservation.idempotency_key)
+
+        if failed_transactions:
+            raise PaymentProcessingError(f"\nFailed to refund payment transactions {failed_transactions}.")
 
 
     def cancel_all(self):
         if len(self._itinerary.get_reservations()) == 0:
-            logger.info("\nThere is no reservation to cancel.")
+            logger.info("There is no reservation to cancel.")
 
         else:
             self._itinerary.get_reservations().clear()
-            logger.info("\nAll reservations have been cancelled and removed.")
+            logger.info("All reservations have been cancelled and removed.")
 
         return True
 
 ########################################################################################################################
 
 
+#######################################    --Provider Fan-out Helpers--    ##########################################
+
+def _iter_provider_results(apis: list, fetch: Callable, executor: Executor, timeout: float,
+                           provider_name: Callable) -> Iterator[tuple]:
+    """
+    Yield (api, results) per provider, in provider order without an executor, else as each one responds.
+    A provider that raises is logged and skipped in both modes.
+
+    timeout bounds the whole fan-out and is counted from submission, so time a call spends queued behind
+    others on a busy executor counts against it; it only applies with an executor.
+    """
+    if executor is None:
+        for api in apis:
+            try:
+                results = fetch(api)
+            except Exception as e:
+                logger.error("%s failed to fetch results: %s", provider_name(api), e)
+                continue
+            yield api, results
+        return
+
+    futures = {executor.submit(fetch, api): api for api in apis}
+    try:
+        for future in as_completed(futures, timeout=timeout):
+            api = futures[future]
+            try:
+                results = future.result()
+            except Exception as e:
+                logger.error("%s failed to fetch results: %s", provider_name(api), e)
+                continue
+            yield api, results
+
+    except FutureTimeoutError:
+        for future, api in futures.items():
+            if not future.done():
+                logger.error("%s did not respond within %ss, skipped.", provider_name(api), timeout)
+
+    finally:
+        for future in futures:
+            future.cancel()
+
+
+async def _stream_provider_results(apis: list, fetch: Callable, buffer_size: int) -> AsyncIterator[tuple]:
+    """Yield (index, (api, item)) as providers respond; producers wait while buffer_size items are unread."""
+    import asyncio
+
+    queue = asyncio.Queue(maxsize=buffer_size)
+    provider_done = object()
+
+    async def produce(api):
+        for item in await fetch(api):
+            await queue.put((api, item))
+        await queue.put((api, provider_done))
+
+    tasks = [asyncio.create_task(produce(api)) for api in apis]
+    remaining = len(tasks)
+    index = 1
+    try:
+        while remaining:
+            api, item = await queue.get()
+            if item is provider_done:
+                remaining -= 1
+                continue
+            yield index, (api, item)
+            index += 1
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+class _TopKCollector:
+    """Thread-safe bounded max-heap keeping the k cheapest (api, item) pairs seen so far."""
+
+    def __init__(self, k: int):
+        self._k = k
+        self._heap = []  # (-cost, -sequence, api, item); the root is the current k-th cheapest
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def offer(self, api, item):
+        with self._lock:
+            entry = (-item.cost, -next(self._sequence), api, item)
+            if len(self._heap) < self._k:
+                heapq.heappush(self._heap, entry)
+            elif entry[:2] > self._heap[0][:2]:
+                heapq.heapreplace(self._heap, entry)
+
+    def can_improve(self, cost: float) -> bool:
+        with self._lock:
+            return len(self._heap) < self._k or cost < -self._heap[0][0]
+
+    def to_map(self) -> dict:
+        with self._lock:
+            ordered = sorted(self._heap, key=lambda entry: (-entry[0], -entry[1]))
+        return {index: (api, item) for index, (_, _, api, item) in enumerate(ordered, start=1)}
+
+
+def _collect_cheapest_pages(collector: _TopKCollector, api, pages) -> int:
+    """Feed cost-ordered pages into the collector until the provider can no longer beat the k-th price."""
+    pages_read = 0
+    for page in pages:
+        pages_read += 1
+        for item in page:
+            collector.offer(api, item)
+        if page and not collector.can_improve(page[-1].cost):
+            break
+    return pages_read
+
+########################################################################################################################
+
+
 ####################################    --Flight Reservation Service Classes --    #####################################
 
 class Flight:
+    __slots__ = ("_flight_fetched_object", "_airline_name", "_from_loc", "_date_from", "_to_location", "_date_to",
+                 "_num_infants", "_num_children", "_num_adults", "_cost")
+
     def __init__(self, flight_fetched_object, airline_name: str, from_loc: str, date_from: datetime,
                  to_location: str, date_to: datetime, num_infants: int, num_children: int, num_adults: int, cost: float):
         self._flight_fetched_object = flight_fetched_object
@@ -374,6 +874,38 @@ class Flight:
     def cost(self):
         return self._cost
 
+    @property
+    def airline_name(self):
+        return self._airline_name
+
+    @property
+    def from_loc(self):
+        return self._from_loc
+
+    @property
+    def date_from(self):
+        return self._date_from
+
+    @property
+    def to_location(self):
+        return self._to_location
+
+    @property
+    def date_to(self):
+        return self._date_to
+
+    @property
+    def num_infants(self):
+        return self._num_infants
+
+    @property
+    def num_children(self):
+        return self._num_children
+
+    @property
+    def num_adults(self):
+        return self._num_adults
+
     def __str__(self):
         return (f"{self._airline_name}: Cost {self._cost} - From: {self._from_loc} on {self._date_from} "
                 f"To: {self._to_location} on {self._date_to} - "
@@ -387,7 +919,14 @@ class FlightOnlineAPIInterface(ABC):
         pass
 
     @abstractmethod
-    def book_flight(self, flight: Flight, customer_info: list) -> str:
+    def book_flight(self, flight: Flight, customer_info: list, idempotency_key: str = None) -> str:
+        """
+        Book and return the confirmation id.
+
+        idempotency_key names one booking attempt and is passed on to the vendor. A vendor that deduplicates
+        on it answers a retry whose first reply was lost with the original confirmation; one that ignores
+        it may book twice.
+        """
         pass
 
     @abstractmethod
@@ -399,14 +938,31 @@ class FlightOnlineAPIInterface(ABC):
         pass
 
 
+class PaginatedFlightOnlineAPIInterface(FlightOnlineAPIInterface):
+    @abstractmethod
+    def fetch_flight_pages(self, date_from: datetime, from_location: str, date_to: datetime, to_location: str,
+                           num_infants: int, num_children: int, num_adults: int) -> Iterator[List[Flight]]:
+        """Yield pages of flights; costs must be ascending across and within pages."""
+        pass
+
+    def fetch_flights(self, date_from: datetime, from_location: str, date_to: datetime, to_location: str,
+                      num_infants: int, num_children: int, num_adults: int) -> List[Flight]:
+        return [flight for page in self.fetch_flight_pages(date_from, from_location, date_to, to_location,
+                                                           num_infants, num_children, num_adults)
+                for flight in page]
+
+
 class FlightReservation(ReservationInterface):
+    reservation_type = "flight"
+
     def __init__(self, customer_id: str, flight_api: FlightOnlineAPIInterface, flight: Flight, customer_info: list):
         super().__init__(customer_id, customer_info, flight.cost)
         self.flight = flight
         self.flight_api = flight_api
 
     def book(self):
-        confirmation_id = self.flight_api.book_flight(self.flight.flight_fetched_object, self.get_customer_info())
+        confirmation_id = self.flight_api.book_flight(self.flight.flight_fetched_object, self.get_customer_info(),
+                                                      self.idempotency_key)
 
         if confirmation_id is None:
             return False
@@ -427,100 +983,129 @@ class FlightReservation(ReservationInterface):
         self._payment_transaction_id = None
         return True
 
-    def __str__(self):
-        return f"\t{self.flight}"
-
-
-class TurkishFlightOnlineOnlineAPI(FlightOnlineAPIInterface):
-    def __init__(self):
-        self.turkish_api = TurkishOnlineAPI()
-
-    def fetch_flights(self, date_from :datetime, from_location :str, date_to :datetime, to_location: str,
-                      num_infants: int, num_children: int, num_adults: int) -> List[Flight]:
-        available_flights = []
-
-        flight_objects = self.turkish_api.get_available_flights()
-        for flight in flight_objects:
-            available_flights.append(Flight(flight_fetched_object=flight,
-                                       airline_name= self.get_company_name(),
-                                       from_loc=from_location,
-                                       date_from=flight.datetime_from,
-                                       to_location=to_location,
-                                       date_to=flight.datetime_to,
-                                       num_infants=num_infants,
-                                       num_children=num_children,
-                                       num_adults=num_adults,
-                                       cost=flight.cost))
-
-        return available_flights
-
-    def book_flight(self, flight :TurkishFlight, customer_info :list) -> str:
-        return self.turkish_api.reserve_flight(customer_info, flight)
-
-    def cancel_flight(self, confirmation_id :str) -> bool:
-        return self.turkish_api.cancel_flight(confirmation_id)
-
-    def get_company_name(self) -> str:
-        return "Turkish Airlines"
-
-
-class AirCanadaFlightOnlineOnlineAPI(FlightOnlineAPIInterface):
-    def __init__(self):
-        self.aircanada_api = AirCanadaOnlineAPI()
-
-    def fetch_flights(self, date_from :datetime, from_location :str, date_to :datetime, to_location: str,
-                      num_infants: int, num_children: int, num_adults: int) -> List[Flight]:
-        available_flights = []
-
-        flight_objects = self.aircanada_api.get_flights(from_location, date_from, to_location, date_to, num_adults, num_children)
-        for flight in flight_objects:
-            available_flights.append(Flight(flight_fetched_object=flight,
-                                       airline_name= self.get_company_name(),
-                                       from_loc=from_location,
-                                       date_from=flight.date_time_from,
-                                       to_location=to_location,
-                                       date_to=flight.date_time_to,
-                                       num_infants=num_infants,
-                                       num_children=num_children,
-                                       num_adults=num_adults,
-                                       cost=flight.price))
-
-        return available_flights
+    def get_provider_name(self) -> str:
+        return self.flight_api.get_company_name()
 
-    def book_flight(self, flight :AirCanadaFlight, customer_info :list) -> str:
-        return self.aircanada_api.reserve_flight(flight, customer_info)
+    def get_travel_dates(self) -> Tuple[datetime, datetime]:
+        return self.flight.date_from, self.flight.date_to
 
-    def cancel_flight(self, confirmation_id :str) -> bool:
-        return self.aircanada_api.cancel_flight(confirmation_id)
+    def __str__(self):
+        return f"\t{self.flight}"
 
-    def get_company_name(self) -> str:
-        return "AirCanada"
 
 # --- Flight Search Manager --- #
 class FlightSearchManager:
-    def __init__(self, flight_apis: List[FlightOnlineAPIInterface]):
+    def __init__(self, flight_apis: List[FlightOnlineAPIInterface], max_workers: int = None,
+                 provider_timeout: float = None, cache: FlightSearchCache = None):
         self.flight_apis = flight_apis
+        # max_workers=None keeps the original sequential behaviour.
+        self._max_workers = max_workers
+        self._provider_timeout = provider_timeout
+        self._executor = None
+        self.cache = cache
 
     def search_flights(self, date_from: datetime, from_location: str, date_to: datetime, to_location: str,
                        num_infants: int, num_children: int, num_adults: int) -> Dict[int, Tuple[FlightOnlineAPIInterface, Flight]]:
+        search_args = (date_from, from_location, date_to, to_location, num_infants, num_children, num_adults)
+        results = {id(api): flights for api, flights in self._iter_provider_flights(search_args)}
+
         flight_map: Dict[int, Tuple[FlightOnlineAPIInterface, Flight]] = {}
         index = 1
 
+        # Assembled in provider order so indices do not depend on response order or the cache.
         for api in self.flight_apis:
-            flights = api.fetch_flights(date_from, from_location, date_to, to_location, num_infants, num_children, num_adults)
-
-            for flight in flights:
+            for flight in results.get(id(api), []):
                 flight_map[index] = (api, flight)
                 index += 1
 
         return flight_map
 
+    def search_flight_results(self, date_from: datetime, from_location: str, date_to: datetime, to_location: str,
+                              num_infants: int, num_children: int, num_adults: int) -> "FlightResultSet":
+        search_args = (date_from, from_location, date_to, to_location, num_infants, num_children, num_adults)
+        results = {id(api): flights for api, flights in self._iter_provider_flights(search_args)}
+
+        result_set = FlightResultSet()
+        for api in self.flight_apis:
+            result_set.extend(api, results.pop(id(api), []))
+        return result_set
+
+    def search_cheapest_flights(self, k: int, date_from: datetime, from_location: str, date_to: datetime,
+                                to_location: str, num_infants: int, num_children: int,
+                                num_adults: int) -> Dict[int, Tuple[FlightOnlineAPIInterface, Flight]]:
+        search_args = (date_from, from_location, date_to, to_location, num_infants, num_children, num_adults)
+        collector = _TopKCollector(k)
+
+        def collect(api):
+            flights = None if self.cache is None else self.cache.get_flights(api.get_company_name(), *search_args)
+            if flights is not None:
+                for flight in flights:
+                    collector.offer(api, flight)
+                return 0
+            if isinstance(api, PaginatedFlightOnlineAPIInterface):
+                return _collect_cheapest_pages(collector, api, api.fetch_flight_pages(*search_args))
+
+            flights = api.fetch_flights(*search_args)
+            if self.cache is not None:
+                self.cache.put_flights(api.get_company_name(), flights, *search_args)
+            for flight in flights:
+                collector.offer(api, flight)
+            return 1
+
+        for _ in _iter_provider_results(self.flight_apis, collect, self._get_executor(), self._provider_timeout,
+                                        lambda api: api.get_company_name()):
+            pass
+
+        return collector.to_map()
+
+    def stream_flights(self, date_from: datetime, from_location: str, date_to: datetime, to_location: str,
+                       num_infants: int, num_children: int,
+                       num_adults: int) -> Iterator[Tuple[int, Tuple[FlightOnlineAPIInterface, Flight]]]:
+        search_args = (date_from, from_location, date_to, to_location, num_infants, num_children, num_adults)
+        index = 1
+
+        # Indices are handed out in arrival order and never change once yielded.
+        for api, flights in self._iter_provider_flights(search_args):
+            for flight in flights:
+                yield index, (api, flight)
+                index += 1
+
+    def _iter_provider_flights(self, search_args: tuple) -> Iterator[Tuple[FlightOnlineAPIInterface, List[Flight]]]:
+        pending_apis = []
+        for api in self.flight_apis:
+            flights = None if self.cache is None else self.cache.get_flights(api.get_company_name(), *search_args)
+            if flights is None:
+                pending_apis.append(api)
+            else:
+                yield api, flights
+
+        for api, flights in _iter_provider_results(pending_apis, lambda api: api.fetch_flights(*search_args),
+                                                   self._get_executor(), self._provider_timeout,
+                                                   lambda api: api.get_company_name()):
+            if self.cache is not None:
+                self.cache.put_flights(api.get_company_name(), flights, *search_args)
+            yield api, flights
+
+    def _get_executor(self):
+        if self._max_workers is not None and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="flight-search")
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
 ########################################################################################################################
 
 
 ####################################    --Hotel Reservation Service Classes --    #####################################
 
 class Room:
+    __slots__ = ("_room_fetched_object", "_hotel_name", "_room_type", "_rooms_available", "_num_rooms_needed",
+                 "_price_per_night", "_date_from", "_date_to", "_location", "_num_children", "_num_adults",
+                 "_num_nights", "_cost")
+
     def __init__(self, room_fetched_object, hotel_name: str, room_type: str=None, rooms_available: int=0, num_rooms_needed: int=0,
                   price_per_night: float=0.0, date_from: datetime=None, date_to: datetime=None, location: str=None, num_children: int=0, num_adults: int=0):
 
@@ -532,6 +1117,7 @@ class Room:
         self._price_per_night = price_per_night
         self._date_from = date_from
         self._date_to = date_to
+        self._location = location
         self._num_children = num_children
         self._num_adults = num_adults
         self._num_nights = (date_to - date_from).days
@@ -545,6 +1131,55 @@ class Room:
     def cost(self):
         return self._cost
 
+    @property
+    def hotel_name(self):
+        return self._hotel_name
+
+    @property
+    def room_type(self):
+        return self._room_type
+
+    @property
+    def price_per_night(self):
+        return self._price_per_night
+
+    @property
+    def num_nights(self):
+        return self._num_nights
+
+    @property
+    def num_children(self):
+        return self._num_children
+
+    @property
+    def num_adults(self):
+        return self._num_adults
+
+    @property
+    def rooms_available(self):
+        return self._rooms_available
+
+    @property
+    def num_rooms_needed(self):
+        return self._num_rooms_needed
+
+    @property
+    def date_from(self):
+        return self._date_from
+
+    @property
+    def date_to(self):
+        return self._date_to
+
+    @property
+    def location(self):
+        return self._location
+
+    def with_rooms_available(self, rooms_available: int) -> "Room":
+        room = copy.copy(self)
+        room._rooms_available = rooms_available
+        return room
+
     def __str__(self):
         return (f"{self._hotel_name}: Per night: {self._price_per_night} - Total Cost: {self._cost} - From {self._num_rooms_needed} "
                 f"on: {self._date_from} - #num_nights {self._num_nights} - "
@@ -557,7 +1192,8 @@ class HotelOnlineAPIInterface(ABC):
         pass
 
     @abstractmethod
-    def book_room(self, room: Room, customer_info: list) -> str:
+    def book_room(self, room: Room, customer_info: list, idempotency_key: str = None) -> str:
+        """Book and return the confirmation id; idempotency_key as in FlightOnlineAPIInterface.book_flight."""
         pass
 
     @abstractmethod
@@ -569,19 +1205,39 @@ class HotelOnlineAPIInterface(ABC):
         pass
 
 
+class PaginatedHotelOnlineAPIInterface(HotelOnlineAPIInterface):
+    @abstractmethod
+    def fetch_room_pages(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
+                         needed_rooms: int) -> Iterator[List[Room]]:
+        """Yield pages of rooms; total costs must be ascending across and within pages."""
+        pass
+
+    def fetch_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
+                    needed_rooms: int) -> List[Room]:
+        return [room for page in self.fetch_room_pages(location, from_date, to_date, adults, children, needed_rooms)
+                for room in page]
+
+
 class HotelReservation(ReservationInterface):
-    def __init__(self, customer_id: str, hotel_api: HotelOnlineAPIInterface, room: Room, customer_info: list):
+    reservation_type = "hotel"
+
+    def __init__(self, customer_id: str, hotel_api: HotelOnlineAPIInterface, room: Room, customer_info: list,
+                 availability_cache: HotelAvailabilityCache = None):
         super().__init__(customer_id, customer_info, room.cost)
         self.room = room
         self.hotel_api = hotel_api
+        self.availability_cache = availability_cache
 
     def book(self):
-        confirmation_id = self.hotel_api.book_room(self.room.room_fetched_object, self.get_customer_info())
+        confirmation_id = self.hotel_api.book_room(self.room.room_fetched_object, self.get_customer_info(),
+                                                   self.idempotency_key)
 
         if confirmation_id is None:
             return False
 
         self.set_confirmation_id(confirmation_id)
+        if self.availability_cache is not None:
+            self.availability_cache.record_booking(self.hotel_api.get_hotel_name(), self.room)
         return True
 
     def cancel(self):
@@ -595,101 +1251,694 @@ class HotelReservation(ReservationInterface):
 
         self._booking_confirmation_id = None
         self._payment_transaction_id = None
+        if self.availability_cache is not None:
+            self.availability_cache.record_cancellation(self.hotel_api.get_hotel_name(), self.room)
         return True
 
+    def get_provider_name(self) -> str:
+        return self.hotel_api.get_hotel_name()
+
+    def get_travel_dates(self) -> Tuple[datetime, datetime]:
+        return self.room.date_from, self.room.date_to
+
     def __str__(self):
         return f"\t{self.room}"
 
 
-class HiltonHotelOnlineOnlineAPI(HotelOnlineAPIInterface):
+class RoomSearchManager:
+    def __init__(self, hotel_apis: List[HotelOnlineAPIInterface], cache: HotelAvailabilityCache = None,
+                 max_workers: int = None, provider_timeout: float = None):
+        self.hotel_apis = hotel_apis
+        self.cache = cache
+        # max_workers=None keeps the original sequential behaviour.
+        self._max_workers = max_workers
+        self._provider_timeout = provider_timeout
+        self._executor = None
+
+    def search_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
+                     needed_rooms: int) -> Dict[int, Tuple[HotelOnlineAPIInterface, Room]]:
+        search_args = (location, from_date, to_date, adults, children, needed_rooms)
+        results = {id(api): rooms for api, rooms in self._iter_provider_rooms(search_args)}
+
+        room_map: Dict[int, Tuple[HotelOnlineAPIInterface, Room]] = {}
+        index = 1
+
+        # Assembled in provider order so indices do not depend on response order or the cache.
+        for api in self.hotel_apis:
+            for room in results.get(id(api), []):
+                room_map[index] = (api, room)
+                index += 1
+
+        return room_map
+
+    def search_room_results(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
+                            needed_rooms: int) -> "RoomResultSet":
+        search_args = (location, from_date, to_date, adults, children, needed_rooms)
+        results = {id(api): rooms for api, rooms in self._iter_provider_rooms(search_args)}
+
+        result_set = RoomResultSet()
+        for api in self.hotel_apis:
+            result_set.extend(api, results.pop(id(api), []))
+        return result_set
+
+    def search_cheapest_rooms(self, k: int, location: str, from_date: datetime, to_date: datetime, adults: int,
+                              children: int, needed_rooms: int) -> Dict[int, Tuple[HotelOnlineAPIInterface, Room]]:
+        search_args = (location, from_date, to_date, adults, children, needed_rooms)
+        collector = _TopKCollector(k)
+
+        def collect(api):
+            rooms = None
+            if self.cache is not None:
+                rooms = self.cache.get_rooms(api.get_hotel_name(), *search_args,
+                                             loader=partial(api.fetch_rooms, *search_args))
+            if rooms is not None:
+                for room in rooms:
+                    collector.offer(api, room)
+                return 0
+            if isinstance(api, PaginatedHotelOnlineAPIInterface):
+                return _collect_cheapest_pages(collector, api, api.fetch_room_pages(*search_args))
+
+            rooms = api.fetch_rooms(*search_args)
+            if self.cache is not None:
+                self.cache.put_rooms(api.get_hotel_name(), rooms, *search_args)
+            for room in rooms:
+                collector.offer(api, room)
+            return 1
+
+        for _ in _iter_provider_results(self.hotel_apis, collect, self._get_executor(), self._provider_timeout,
+                                        lambda api: api.get_hotel_name()):
+            pass
+
+        return collector.to_map()
+
+    def stream_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
+                     needed_rooms: int) -> Iterator[Tuple[int, Tuple[HotelOnlineAPIInterface, Room]]]:
+        search_args = (location, from_date, to_date, adults, children, needed_rooms)
+        index = 1
+
+        # Indices are handed out in arrival order and never change once yielded.
+        for api, rooms in self._iter_provider_rooms(search_args):
+            for room in rooms:
+                yield index, (api, room)
+                index += 1
+
+    def _iter_provider_rooms(self, search_args: tuple) -> Iterator[Tuple[HotelOnlineAPIInterface, List[Room]]]:
+        pending_apis = []
+        for api in self.hotel_apis:
+            rooms = None
+            if self.cache is not None:
+                rooms = self.cache.get_rooms(api.get_hotel_name(), *search_args,
+                                             loader=partial(api.fetch_rooms, *search_args))
+            if rooms is None:
+                pending_apis.append(api)
+            else:
+                yield api, rooms
+
+        for api, rooms in _iter_provider_results(pending_apis, lambda api: api.fetch_rooms(*search_args),
+                                                 self._get_executor(), self._provider_timeout,
+                                                 lambda api: api.get_hotel_name()):
+            if self.cache is not None:
+                self.cache.put_rooms(api.get_hotel_name(), rooms, *search_args)
+            yield api, rooms
+
+    def _get_executor(self):
+        if self._max_workers is not None and self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self._max_workers, thread_name_prefix="room-search")
+        return self._executor
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+########################################################################################################################
+
+
+#########################################    --Search Result Sets--    ##############################################
+
+class _ValueTable:
+    """Stores each distinct (hashable) value once and hands out small integer codes for it."""
+    __slots__ = ("values", "_codes")
+
     def __init__(self):
-        self.hilton_api = HiltonHotelAPI()
+        self.values: List[Any] = []
+        self._codes: Dict[Any, int] = {}
+
+    def code(self, value) -> int:
+        code = self._codes.get(value)
+        if code is None:
+            if isinstance(value, str):
+                value = sys.intern(value)
+            code = len(self.values)
+            self.values.append(value)
+            self._codes[value] = code
+        return code
+
+    def codes_of(self, values) -> set:
+        return {self._codes[value] for value in values if value in self._codes}
+
+
+def _date_sort_key(value) -> float:
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, "%d-%m-%Y").timestamp()
+        except ValueError:
+            pass
+    return float("inf")
 
-    def fetch_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
-                    needed_rooms: int) -> List[Room]:
-        available_rooms = []
 
-        room_objects = self.hilton_api.search_rooms(location, from_date, to_date, adults, children, needed_rooms)
-        for room in room_objects:
-            available_rooms.append(Room(
-                                        room_fetched_object=room,
-                                        hotel_name = self.get_hotel_name(),
-                                        room_type = room.room_type,
-                                        rooms_available = room.available,
-                                        num_rooms_needed = needed_rooms,
-                                        price_per_night = room.price_per_night,
-                                        date_from = from_date,
-                                        date_to = to_date,
-                                        num_children = children,
-                                        num_adults = adults
+_np = False  # False until the first _numpy() call, then the module or None.
 
-            ))
 
-        return available_rooms
+def _numpy():
+    """NumPy, imported on first use, or None when it is not installed (it speeds up ResultQuery on large sets)."""
+    global _np
+    if _np is False:
+        try:
+            import numpy
+        except ImportError:
+            numpy = None
+        _np = numpy
+    return _np
 
-    def book_room(self, room: HiltonRoom, customer_info :list) -> str:
-        return self.hilton_api.reserve_room(room, customer_info)
 
-    def cancel_room(self, confirmation_id :str) -> bool:
-        return self.hilton_api.cancel_room(confirmation_id)
+def _decode(codes: array, table: list) -> array:
+    """Gather table[code] for every code as a float column."""
+    np = _numpy()
+    if np is not None and len(codes):
+        return array("d", np.asarray(table, dtype="d")[np.frombuffer(codes, dtype=codes.typecode)].tobytes())
+    return array("d", [table[code] for code in codes])
 
-    def get_hotel_name(self) -> str:
-        return "Hilton"
+
+def _restore_number(value: float, is_int: int):
+    """A value read back from a float column, as an int again if it was stored from one."""
+    return int(value) if is_int else value
+
+
+def _date_keys(date_codes: array, dates: _ValueTable) -> array:
+    """Timestamps of the coded dates, as a float column; unparseable dates sort last."""
+    return _decode(date_codes, [_date_sort_key(value) for value in dates.values])
 
 
-class MarriottHotelOnlineOnlineAPI(HotelOnlineAPIInterface):
+class _ResultSet(ABC):
+    """Column store for search results; items are materialized only when accessed."""
+
     def __init__(self):
-        self.marriott_api = MarriottHotelAPI()
+        self._apis = _ValueTable()
+        self._api_codes = array("H")
+        self._fetched_objects = []
 
-    def fetch_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
-                    needed_rooms: int) -> List[Room]:
-        available_rooms = []
+    def __len__(self):
+        return len(self._api_codes)
+
+    def __iter__(self):
+        for position in range(len(self)):
+            yield self[position]
+
+    def __getitem__(self, position: int):
+        if position < 0:
+            position += len(self)
+        if not 0 <= position < len(self):
+            raise IndexError("result set index out of range")
+        return self._apis.values[self._api_codes[position]], self._build(position)
+
+    def items(self):
+        """Same (index, (api, item)) pairs as the search maps, with 1-based indices."""
+        for position in range(len(self)):
+            yield position + 1, self[position]
+
+    def to_map(self) -> dict:
+        return dict(self.items())
+
+    def query(self) -> "ResultQuery":
+        return ResultQuery(self)
+
+    @property
+    @abstractmethod
+    def costs(self) -> array:
+        pass
+
+    @abstractmethod
+    def _build(self, position: int):
+        pass
+
+    @abstractmethod
+    def _sort_column(self, field: str) -> array:
+        pass
+
+    @abstractmethod
+    def _name_column(self, field: str) -> Tuple[array, _ValueTable]:
+        pass
+
+
+class FlightResultSet(_ResultSet):
+    def __init__(self):
+        super().__init__()
+        self._strings = _ValueTable()  # airline names, locations and vendor dates
+        self._airline_names = array("I")
+        self._from_locs = array("I")
+        self._dates_from = array("I")
+        self._to_locations = array("I")
+        self._dates_to = array("I")
+        self._num_infants = array("H")
+        self._num_children = array("H")
+        self._num_adults = array("H")
+        self._costs = array("d")
+        self._cost_is_int = array("B")  # so rebuilt flights print "Cost 400", not "Cost 400.0"
+
+    def append(self, api: FlightOnlineAPIInterface, flight: Flight):
+        code = self._strings.code
+        self._api_codes.append(self._apis.code(api))
+        self._fetched_objects.append(flight.flight_fetched_object)
+        self._airline_names.append(code(flight.airline_name))
+        self._from_locs.append(code(flight.from_loc))
+        self._dates_from.append(code(flight.date_from))
+        self._to_locations.append(code(flight.to_location))
+        self._dates_to.append(code(flight.date_to))
+        self._num_infants.append(flight.num_infants)
+        self._num_children.append(flight.num_children)
+        self._num_adults.append(flight.num_adults)
+        self._costs.append(flight.cost)
+        self._cost_is_int.append(isinstance(flight.cost, int))
+
+    def extend(self, api: FlightOnlineAPIInterface, flights: List[Flight]):
+        for flight in flights:
+            self.append(api, flight)
+
+    @classmethod
+    def from_map(cls, flight_map: Dict[int, Tuple[FlightOnlineAPIInterface, Flight]]) -> "FlightResultSet":
+        result_set = cls()
+        for _, (api, flight) in sorted(flight_map.items()):
+            result_set.append(api, flight)
+        return result_set
+
+    @property
+    def costs(self) -> array:
+        return self._costs
+
+    def _sort_column(self, field: str) -> array:
+        if field == "cost":
+            return self._costs
+        if field == "departure":
+            return _date_keys(self._dates_from, self._strings)
+        if field == "nights":
+            day_keys = [_date_sort_key(value) / 86400 for value in self._strings.values]
+            return array("d", [to_day - from_day for from_day, to_day in
+                               zip(_decode(self._dates_from, day_keys), _decode(self._dates_to, day_keys))])
+        raise ValueError(f"Flights cannot be sorted by {field!r}")
+
+    def _name_column(self, field: str) -> Tuple[array, _ValueTable]:
+        if field == "provider":
+            return self._airline_names, self._strings
+        raise ValueError(f"Flights cannot be filtered by {field!r}")
+
+    def _build(self, position: int) -> Flight:
+        values = self._strings.values
+        return Flight(flight_fetched_object=self._fetched_objects[position],
+                      airline_name=values[self._airline_names[position]],
+                      from_loc=values[self._from_locs[position]],
+                      date_from=values[self._dates_from[position]],
+                      to_location=values[self._to_locations[position]],
+                      date_to=values[self._dates_to[position]],
+                      num_infants=self._num_infants[position],
+                      num_children=self._num_children[position],
+                      num_adults=self._num_adults[position],
+                      cost=_restore_number(self._costs[position], self._cost_is_int[position]))
+
+
+class RoomResultSet(_ResultSet):
+    def __init__(self):
+        super().__init__()
+        self._strings = _ValueTable()  # hotel names, room types, locations and dates
+        self._hotel_names = array("I")
+        self._room_types = array("I")
+        self._locations = array("I")
+        self._dates_from = array("I")
+        self._dates_to = array("I")
+        self._rooms_available = array("i")
+        self._num_rooms_needed = array("H")
+        self._num_children = array("H")
+        self._num_adults = array("H")
+        self._num_nights = array("i")
+        self._prices_per_night = array("d")
+        self._price_is_int = array("B")  # Room recomputes its cost from the price, so this keeps both ints
+        self._costs = array("d")
+
+    def append(self, api: HotelOnlineAPIInterface, room: Room):
+        code = self._strings.code
+        self._api_codes.append(self._apis.code(api))
+        self._fetched_objects.append(room.room_fetched_object)
+        self._hotel_names.append(code(room.hotel_name))
+        self._room_types.append(code(room.room_type))
+        self._locations.append(code(room.location))
+        self._dates_from.append(code(room.date_from))
+        self._dates_to.append(code(room.date_to))
+        self._rooms_available.append(room.rooms_available)
+        self._num_rooms_needed.append(room.num_rooms_needed)
+        self._num_children.append(room.num_children)
+        self._num_adults.append(room.num_adults)
+        self._num_nights.append(room.num_nights)
+        self._prices_per_night.append(room.price_per_night)
+        self._price_is_int.append(isinstance(room.price_per_night, int))
+        self._costs.append(room.cost)
+
+    def extend(self, api: HotelOnlineAPIInterface, rooms: List[Room]):
+        for room in rooms:
+            self.append(api, room)
+
+    @classmethod
+    def from_map(cls, room_map: Dict[int, Tuple[HotelOnlineAPIInterface, Room]]) -> "RoomResultSet":
+        result_set = cls()
+        for _, (api, room) in sorted(room_map.items()):
+            result_set.append(api, room)
+        return result_set
 
-        room_objects = self.marriott_api.search_available_rooms(location, from_date, to_date, adults, children, needed_rooms)
-        for room in room_objects:
-            available_rooms.append(Room(
-                                        room_fetched_object=room,
-                                        hotel_name = self.get_hotel_name(),
-                                        room_type = room.room_type,
-                                        rooms_available = room.available,
-                                        num_rooms_needed = needed_rooms,
-                                        price_per_night = room.price_per_night,
-                                        date_from = from_date,
-                                        date_to = to_date,
-                                        num_children = children,
-                                        num_adults = adults
+    @property
+    def costs(self) -> array:
+        return self._costs
+
+    def _sort_column(self, field: str) -> array:
+        if field == "cost":
+            return self._costs
+        if field == "price_per_night":
+            return self._prices_per_night
+        if field == "nights":
+            return self._num_nights
+        if field == "departure":
+            return _date_keys(self._dates_from, self._strings)
+        raise ValueError(f"Rooms cannot be sorted by {field!r}")
+
+    def _name_column(self, field: str) -> Tuple[array, _ValueTable]:
+        if field == "provider":
+            return self._hotel_names, self._strings
+        if field == "room_type":
+            return self._room_types, self._strings
+        raise ValueError(f"Rooms cannot be filtered by {field!r}")
+
+    def _build(self, position: int) -> Room:
+        values = self._strings.values
+        return Room(room_fetched_object=self._fetched_objects[position],
+                    hotel_name=values[self._hotel_names[position]],
+                    room_type=values[self._room_types[position]],
+                    rooms_available=self._rooms_available[position],
+                    num_rooms_needed=self._num_rooms_needed[position],
+                    price_per_night=_restore_number(self._prices_per_night[position],
+                                                    self._price_is_int[position]),
+                    date_from=values[self._dates_from[position]],
+                    date_to=values[self._dates_to[position]],
+                    location=values[self._locations[position]],
+                    num_children=self._num_children[position],
+                    num_adults=self._num_adults[position])
+
+
+
+class ResultQuery:
+    """
+    Chainable filter/sort over a FlightResultSet or RoomResultSet.
+
+    Every step works a whole column at a time on the selected row positions, with NumPy when it is
+    installed and plain typed-array loops otherwise. Rows are only materialized by items()/to_map().
+    """
+
+    def __init__(self, result_set: _ResultSet):
+        self._result_set = result_set
+        size = len(result_set)
+        np = _numpy()
+        self._positions = np.arange(size, dtype=np.intp) if np is not None else list(range(size))
+
+    def _values(self, column: array):
+        """Column values at the selected positions (NumPy array, or the column itself in pure Python)."""
+        np = _numpy()
+        if np is None:
+            return column
+        if not len(column):
+            return np.empty(0, dtype=column.typecode)
+        return np.frombuffer(column, dtype=column.typecode)[self._positions]
+
+    def where_cost(self, min_cost: float = None, max_cost: float = None) -> "ResultQuery":
+        low = float("-inf") if min_cost is None else min_cost
+        high = float("inf") if max_cost is None else max_cost
+        costs = self._values(self._result_set.costs)
+        np = _numpy()
+        if np is not None:
+            self._positions = self._positions[(costs >= low) & (costs <= high)]
+        else:
+            self._positions = [position for position in self._positions if low <= costs[position] <= high]
+        return self
+
+    def where_provider(self, *names: str) -> "ResultQuery":
+        return self._where_name("provider", names)
+
+    def where_room_type(self, *room_types: str) -> "ResultQuery":
+        return self._where_name("room_type", room_types)
+
+    def _where_name(self, field: str, names) -> "ResultQuery":
+        column, table = self._result_set._name_column(field)
+        codes = table.codes_of(names)
+        values = self._values(column)
+        np = _numpy()
+        if np is not None:
+            self._positions = self._positions[np.isin(values, list(codes))]
+        else:
+            self._positions = [position for position in self._positions if values[position] in codes]
+        return self
+
+    def where_rooms_cover_needed(self) -> "ResultQuery":
+        """Keep rooms whose rooms_available >= num_rooms_needed."""
+        if not isinstance(self._result_set, RoomResultSet):
+            raise ValueError("Only room results have availability to filter on")
+        available = self._values(self._result_set._rooms_available)
+        needed = self._values(self._result_set._num_rooms_needed)
+        np = _numpy()
+        if np is not None:
+            self._positions = self._positions[available >= needed]
+        else:
+            self._positions = [position for position in self._positions if available[position] >= needed[position]]
+        return self
+
+    def order_by(self, field: str, descending: bool = False) -> "ResultQuery":
+        keys = self._values(self._result_set._sort_column(field))
+        np = _numpy()
+        if np is not None:
+            order = np.argsort(-keys if descending else keys, kind="stable")
+            self._positions = self._positions[order]
+        else:
+            self._positions = sorted(self._positions, key=keys.__getitem__, reverse=descending)
+        return self
+
+    def limit(self, count: int) -> "ResultQuery":
+        self._positions = self._positions[:count]
+        return self
+
+    def positions(self) -> List[int]:
+        return [int(position) for position in self._positions]
+
+    def __len__(self):
+        return len(self._positions)
+
+    def items(self):
+        """Selected rows as (index, (api, item)), re-indexed from 1 in the query's order."""
+        for index, position in enumerate(self._positions, start=1):
+            yield index, self._result_set[int(position)]
+
+    def to_map(self) -> dict:
+        return dict(self.items())
+
+########################################################################################################################
+
+
+########################################    --Asyncio Search Services--    ############################################
+
+class AsyncFlightOnlineAPIInterface(ABC):
+    @abstractmethod
+    async def fetch_flights(self, date_from: datetime, from_location: str, date_to: datetime, to_location: str,
+                            num_infants: int, num_children: int, num_adults: int) -> List[Flight]:
+        pass
+
+    @abstractmethod
+    async def book_flight(self, flight: Flight, customer_info: list, idempotency_key: str = None) -> str:
+        pass
+
+    @abstractmethod
+    async def cancel_flight(self, confirmation_id: str) -> bool:
+        pass
+
+    @abstractmethod
+    def get_company_name(self) -> str:
+        pass
 
-            ))
 
-        return available_rooms
+class AsyncHotelOnlineAPIInterface(ABC):
+    @abstractmethod
+    async def fetch_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
+                          needed_rooms: int) -> List[Room]:
+        pass
 
-    def book_room(self, room: MarriottRoom, customer_info :list) -> str:
-        return self.marriott_api.do_room_reservation(room, customer_info)
+    @abstractmethod
+    async def book_room(self, room: Room, customer_info: list, idempotency_key: str = None) -> str:
+        pass
 
-    def cancel_room(self, confirmation_id :str) -> bool:
-        return self.marriott_api.cancel_room(confirmation_id)
+    @abstractmethod
+    async def cancel_room(self, confirmation_id: str) -> bool:
+        pass
 
+    @abstractmethod
     def get_hotel_name(self) -> str:
-        return "Marriott"
+        pass
 
 
-class RoomSearchManager:
-    def __init__(self, hotel_apis: List[HotelOnlineAPIInterface]):
-        self.hotel_apis = hotel_apis
+# --- Shims running blocking vendor SDKs in an executor --- #
+class ExecutorFlightOnlineAPI(AsyncFlightOnlineAPIInterface):
+    def __init__(self, flight_api: FlightOnlineAPIInterface, executor: Executor = None):
+        self.flight_api = flight_api
+        self._executor = executor  # None means the event loop's default executor.
 
-    def search_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
-                     needed_rooms: int) -> Dict[int, Tuple[HotelOnlineAPIInterface, Room]]:
-        room_map: Dict[int, Tuple[HotelOnlineAPIInterface, Room]] = {}
+    async def _run(self, func, *args):
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args))
+
+    async def fetch_flights(self, date_from: datetime, from_location: str, date_to: datetime, to_location: str,
+                            num_infants: int, num_children: int, num_adults: int) -> List[Flight]:
+        return await self._run(self.flight_api.fetch_flights, date_from, from_location, date_to, to_location,
+                               num_infants, num_children, num_adults)
+
+    async def book_flight(self, flight, customer_info: list, idempotency_key: str = None) -> str:
+        return await self._run(self.flight_api.book_flight, flight, customer_info, idempotency_key)
+
+    async def cancel_flight(self, confirmation_id: str) -> bool:
+        return await self._run(self.flight_api.cancel_flight, confirmation_id)
+
+    def get_company_name(self) -> str:
+        return self.flight_api.get_company_name()
+
+
+class ExecutorHotelOnlineAPI(AsyncHotelOnlineAPIInterface):
+    def __init__(self, hotel_api: HotelOnlineAPIInterface, executor: Executor = None):
+        self.hotel_api = hotel_api
+        self._executor = executor  # None means the event loop's default executor.
+
+    async def _run(self, func, *args):
+        import asyncio
+        return await asyncio.get_running_loop().run_in_executor(self._executor, partial(func, *args))
+
+    async def fetch_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
+                          needed_rooms: int) -> List[Room]:
+        return await self._run(self.hotel_api.fetch_rooms, location, from_date, to_date, adults, children,
+                               needed_rooms)
+
+    async def book_room(self, room, customer_info: list, idempotency_key: str = None) -> str:
+        return await self._run(self.hotel_api.book_room, room, customer_info, idempotency_key)
+
+    async def cancel_room(self, confirmation_id: str) -> bool:
+        return await self._run(self.hotel_api.cancel_room, confirmation_id)
+
+    def get_hotel_name(self) -> str:
+        return self.hotel_api.get_hotel_name()
+
+
+# --- Async Search Managers --- #
+class AsyncFlightSearchManager:
+    def __init__(self, flight_apis: List[Union[AsyncFlightOnlineAPIInterface, FlightOnlineAPIInterface]],
+                 provider_timeout: float = None, executor: Executor = None):
+        # Blocking adapters are wrapped so old and new adapters can be mixed in one search.
+        self.flight_apis = [api if isinstance(api, AsyncFlightOnlineAPIInterface)
+                            else ExecutorFlightOnlineAPI(api, executor) for api in flight_apis]
+        self._provider_timeout = provider_timeout
+
+    async def search_flights(self, date_from: datetime, from_location: str, date_to: datetime, to_location: str,
+                             num_infants: int, num_children: int,
+                             num_adults: int) -> Dict[int, Tuple[AsyncFlightOnlineAPIInterface, Flight]]:
+        import asyncio
+        results = await asyncio.gather(*(
+            self._fetch(api, date_from, from_location, date_to, to_location, num_infants, num_children, num_adults)
+            for api in self.flight_apis))
+
+        flight_map: Dict[int, Tuple[AsyncFlightOnlineAPIInterface, Flight]] = {}
         index = 1
 
-        for api in self.hotel_apis:
-            rooms = api.fetch_rooms(location, from_date, to_date, adults, children, needed_rooms)
+        for api, flights in zip(self.flight_apis, results):
+            for flight in flights:
+                flight_map[index] = (api, flight)
+                index += 1
+
+        return flight_map
+
+    def stream_flights(self, date_from: datetime, from_location: str, date_to: datetime, to_location: str,
+                       num_infants: int, num_children: int, num_adults: int,
+                       buffer_size: int = 64) -> AsyncIterator[Tuple[int, Tuple[AsyncFlightOnlineAPIInterface, Flight]]]:
+        search_args = (date_from, from_location, date_to, to_location, num_infants, num_children, num_adults)
+        return _stream_provider_results(self.flight_apis, lambda api: self._fetch(api, *search_args), buffer_size)
+
+    async def _fetch(self, api: AsyncFlightOnlineAPIInterface, *search_args) -> List[Flight]:
+        import asyncio
+        try:
+            return await asyncio.wait_for(api.fetch_flights(*search_args), self._provider_timeout)
+        except asyncio.TimeoutError:
+            logger.error("%s did not respond within %ss, skipped.", api.get_company_name(), self._provider_timeout)
+        except Exception as e:
+            logger.error("%s failed to fetch flights: %s", api.get_company_name(), e)
+        return []
+
+
+class AsyncRoomSearchManager:
+    def __init__(self, hotel_apis: List[Union[AsyncHotelOnlineAPIInterface, HotelOnlineAPIInterface]],
+                 provider_timeout: float = None, executor: Executor = None):
+        # Blocking adapters are wrapped so old and new adapters can be mixed in one search.
+        self.hotel_apis = [api if isinstance(api, AsyncHotelOnlineAPIInterface)
+                           else ExecutorHotelOnlineAPI(api, executor) for api in hotel_apis]
+        self._provider_timeout = provider_timeout
+
+    async def search_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
+                           needed_rooms: int) -> Dict[int, Tuple[AsyncHotelOnlineAPIInterface, Room]]:
+        import asyncio
+        results = await asyncio.gather(*(
+            self._fetch(api, location, from_date, to_date, adults, children, needed_rooms)
+            for api in self.hotel_apis))
+
+        room_map: Dict[int, Tuple[AsyncHotelOnlineAPIInterface, Room]] = {}
+        index = 1
 
+        for api, rooms in zip(self.hotel_apis, results):
             for room in rooms:
                 room_map[index] = (api, room)
                 index += 1
 
         return room_map
 
+    def stream_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
+                     needed_rooms: int,
+                     buffer_size: int = 64) -> AsyncIterator[Tuple[int, Tuple[AsyncHotelOnlineAPIInterface, Room]]]:
+        search_args = (location, from_date, to_date, adults, children, needed_rooms)
+        return _stream_provider_results(self.hotel_apis, lambda api: self._fetch(api, *search_args), buffer_size)
+
+    async def _fetch(self, api: AsyncHotelOnlineAPIInterface, *search_args) -> List[Room]:
+        import asyncio
+        try:
+            return await asyncio.wait_for(api.fetch_rooms(*search_args), self._provider_timeout)
+        except asyncio.TimeoutError:
+            logger.error("%s did not respond within %ss, skipped.", api.get_hotel_name(), self._provider_timeout)
+        except Exception as e:
+            logger.error("%s failed to fetch rooms: %s", api.get_hotel_name(), e)
+        return []
+
 ########################################################################################################################
 
+
+# The vendor adapters live in backend.providers and are loaded on first use (see provider_registry);
+# importing them from here still works, and imports only the adapter asked for.
+_MOVED_ADAPTERS = {
+    "TurkishFlightOnlineOnlineAPI": "backend.providers.turkish",
+    "AirCanadaFlightOnlineOnlineAPI": "backend.providers.aircanada",
+    "HiltonHotelOnlineOnlineAPI": "backend.providers.hilton",
+    "MarriottHotelOnlineOnlineAPI": "backend.providers.marriott",
+}
+
+
+def __getattr__(name: str):
+    if name in _MOVED_ADAPTERS:
+        import importlib
+
+        return getattr(importlib.import_module(_MOVED_ADAPTERS[name]), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -46,4 +46,13 @@ class LoginError(CustomBaseException):
         super().__init__(message)
 
 
+class StorageError(CustomBaseException):
+    """Exception raised when a booked itinerary could not be saved."""
+    def __init__(self, message="Itinerary could not be saved."):
+        super().__init__(message)
+
 
+class SessionError(CustomBaseException):
+    """Exception raised for a session token that is malformed, tampered with or expired."""
+    def __init__(self, message="Invalid or expired session. Please log in again."):
+        super().__init__(message)
@@ -0,0 +1,107 @@
+from datetime import datetime
+from typing import Callable, List
+
+from backend import metrics
+from backend.customer_backend_mgr import (FlightOnlineAPIInterface, HotelOnlineAPIInterface,
+                                          RefundablePaymentMethodInterface, Flight, Room)
+
+
+class _Timed:
+    def _init_timing(self, wrapped, provider_name: str, registry: metrics.MetricsRegistry,
+                     histogram: metrics.Histogram):
+        self._adapter_name = type(wrapped).__name__
+        self._provider_name = provider_name
+        self._registry = registry
+        self._histogram = histogram
+
+    def _timed(self, method: str, func: Callable, *args):
+        if not self._registry.enabled:
+            return func(*args)
+        start = metrics.clock()
+        outcome = "error"
+        try:
+            result = func(*args)
+            outcome = "ok"
+            return result
+        finally:
+            self._histogram.labels(self._adapter_name, self._provider_name, method, outcome).observe(
+                metrics.clock() - start)
+
+
+class InstrumentedFlightOnlineAPI(FlightOnlineAPIInterface, _Timed):
+    """Records the latency of every call to a flight adapter, labelled by adapter class, method and outcome."""
+
+    def __init__(self, flight_api: FlightOnlineAPIInterface, registry: metrics.MetricsRegistry = metrics.REGISTRY,
+                 histogram: metrics.Histogram = metrics.ADAPTER_CALL_SECONDS):
+        self.flight_api = flight_api
+        self._init_timing(flight_api, flight_api.get_company_name(), registry, histogram)
+
+    def fetch_flights(self, date_from: datetime, from_location: str, date_to: datetime, to_location: str,
+                      num_infants: int, num_children: int, num_adults: int) -> List[Flight]:
+        return self._timed("fetch_flights", self.flight_api.fetch_flights, date_from, from_location, date_to,
+                           to_location, num_infants, num_children, num_adults)
+
+    def book_flight(self, flight, customer_info: list, idempotency_key: str = None) -> str:
+        return self._timed("book_flight", self.flight_api.book_flight, flight, customer_info, idempotency_key)
+
+    def cancel_flight(self, confirmation_id: str) -> bool:
+        return self._timed("cancel_flight", self.flight_api.cancel_flight, confirmation_id)
+
+    def get_company_name(self) -> str:
+        return self.flight_api.get_company_name()
+
+
+class InstrumentedHotelOnlineAPI(HotelOnlineAPIInterface, _Timed):
+    """Records the latency of every call to a hotel adapter, labelled by adapter class, method and outcome."""
+
+    def __init__(self, hotel_api: HotelOnlineAPIInterface, registry: metrics.MetricsRegistry = metrics.REGISTRY,
+                 histogram: metrics.Histogram = metrics.ADAPTER_CALL_SECONDS):
+        self.hotel_api = hotel_api
+        self._init_timing(hotel_api, hotel_api.get_hotel_name(), registry, histogram)
+
+    def fetch_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
+                    needed_rooms: int) -> List[Room]:
+        return self._timed("fetch_rooms", self.hotel_api.fetch_rooms, location, from_date, to_date, adults,
+                           children, needed_rooms)
+
+    def book_room(self, room, customer_info: list, idempotency_key: str = None) -> str:
+        return self._timed("book_room", self.hotel_api.book_room, room, customer_info, idempotency_key)
+
+    def cancel_room(self, confirmation_id: str) -> bool:
+        return self._timed("cancel_room", self.hotel_api.cancel_room, confirmation_id)
+
+    def get_hotel_name(self) -> str:
+        return self.hotel_api.get_hotel_name()
+
+
+class InstrumentedPaymentMethod(RefundablePaymentMethodInterface, _Timed):
+    """
+    Records the latency of pay and refund on a payment method. The booking journal and recovery name
+    payment methods by the wrapped class (see payment_method_name), so wrapping does not change them.
+    """
+
+    def __init__(self, payment_method: RefundablePaymentMethodInterface,
+                 registry: metrics.MetricsRegistry = metrics.REGISTRY,
+                 histogram: metrics.Histogram = metrics.ADAPTER_CALL_SECONDS):
+        self.payment_method = payment_method
+        self._init_timing(payment_method, type(payment_method).__name__, registry, histogram)
+
+    def pay(self, amount, idempotency_key=None):
+        return self._timed("pay", self.payment_method.pay, amount, idempotency_key)
+
+    def refund(self, transaction_id, amount=None):
+        return self._timed("refund", self.payment_method.refund, transaction_id, amount)
+
+    def __str__(self):
+        return str(self.payment_method)
+
+
+def instrument(api, registry: metrics.MetricsRegistry = metrics.REGISTRY):
+    """Wraps a flight, hotel or payment adapter in the matching instrumented class."""
+    if isinstance(api, FlightOnlineAPIInterface):
+        return InstrumentedFlightOnlineAPI(api, registry)
+    if isinstance(api, HotelOnlineAPIInterface):
+        return InstrumentedHotelOnlineAPI(api, registry)
+    if isinstance(api, RefundablePaymentMethodInterface):
+        return InstrumentedPaymentMethod(api, registry)
+    raise TypeError(f"Cannot instrument {type(api).__name__}.")
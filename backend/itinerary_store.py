@@ -0,0 +1,346 @@
+import bisect
+import json
+import logging
+import sqlite3
+import threading
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def format_travel_date(value) -> Optional[str]:
+    """ISO 8601 text for a travel date, so stored dates sort chronologically as strings."""
+    if value is None:
+        return None
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, str):
+        try:
+            return datetime.strptime(value, "%d-%m-%Y").isoformat()
+        except ValueError:
+            return value
+    return str(value)
+
+
+class ReservationRecord:
+    """Stored, read-only view of a booked reservation."""
+
+    __slots__ = ("reservation_type", "provider", "cost", "date_from", "date_to", "description")
+
+    def __init__(self, reservation_type: str, provider: str, cost: float, date_from: str, date_to: str,
+                 description: str):
+        self.reservation_type = reservation_type
+        self.provider = provider
+        self.cost = cost
+        self.date_from = date_from
+        self.date_to = date_to
+        self.description = description
+
+    def get_cost(self) -> float:
+        return self.cost
+
+    def to_row(self) -> list:
+        return [self.reservation_type, self.provider, self.cost, self.date_from, self.date_to, self.description]
+
+    def __str__(self):
+        return self.description
+
+
+class ItineraryRecord:
+    """Stored, read-only view of an itinerary; offers the same getters the CLI uses on an Itinerary."""
+
+    __slots__ = ("itinerary_id", "customer_id", "total_cost", "reservations", "saga_id")
+
+    def __init__(self, itinerary_id: Optional[int], customer_id: str, total_cost: float,
+                 reservations: List[ReservationRecord], saga_id: str = None):
+        self.itinerary_id = itinerary_id
+        self.customer_id = customer_id
+        self.total_cost = total_cost
+        self.reservations = reservations
+        # The booking saga that produced the itinerary; the store keeps one itinerary per saga.
+        self.saga_id = saga_id
+
+    def get_total_cost(self) -> float:
+        return self.total_cost
+
+    def get_reservations(self) -> List[ReservationRecord]:
+        return self.reservations
+
+    @property
+    def travel_date(self) -> Optional[str]:
+        """Start of the earliest reservation."""
+        return min((reservation.date_from for reservation in self.reservations), default=None)
+
+
+class ItineraryPage:
+    __slots__ = ("itineraries", "next_cursor")
+
+    def __init__(self, itineraries: list, next_cursor: Optional[int]):
+        self.itineraries = itineraries
+        self.next_cursor = next_cursor
+
+    def __len__(self):
+        return len(self.itineraries)
+
+    def __iter__(self):
+        return iter(self.itineraries)
+
+
+class ItineraryIndex:
+    """
+    In-memory secondary indexes over one customer's itineraries, maintained on insert.
+
+    Travel dates (ISO text) and total costs are kept in sorted lists searched with bisect; providers and
+    reservation types map to the keys of the itineraries using them, in insertion order. Queries return
+    those keys, ordered by the indexed value.
+    """
+
+    def __init__(self):
+        self._by_travel_date: List[Tuple[str, int]] = []
+        self._by_total_cost: List[Tuple[float, int]] = []
+        self._by_provider: Dict[str, List[int]] = {}
+        self._by_reservation_type: Dict[str, List[int]] = {}
+
+    def add(self, key: int, record: ItineraryRecord):
+        if record.travel_date is not None:
+            bisect.insort(self._by_travel_date, (record.travel_date, key))
+        bisect.insort(self._by_total_cost, (record.total_cost, key))
+        for provider in dict.fromkeys(reservation.provider for reservation in record.reservations):
+            self._by_provider.setdefault(provider, []).append(key)
+        for reservation_type in dict.fromkeys(reservation.reservation_type for reservation in record.reservations):
+            self._by_reservation_type.setdefault(reservation_type, []).append(key)
+
+    @staticmethod
+    def _range(entries: list, low, high, limit: Optional[int]) -> List[int]:
+        start = 0 if low is None else bisect.bisect_left(entries, (low,))
+        end = len(entries) if high is None else bisect.bisect_right(entries, (high, float("inf")))
+        if limit is not None:
+            end = min(end, start + limit)
+        return [key for _, key in entries[start:end]]
+
+    def find_by_travel_date(self, date_from=None, date_to=None, limit: int = None) -> List[int]:
+        return self._range(self._by_travel_date, format_travel_date(date_from), format_travel_date(date_to), limit)
+
+    def find_by_total_cost(self, min_cost: float = None, max_cost: float = None, limit: int = None) -> List[int]:
+        return self._range(self._by_total_cost, min_cost, max_cost, limit)
+
+    def find_by_provider(self, provider: str, limit: int = None) -> List[int]:
+        return self._by_provider.get(provider, [])[:limit]
+
+    def find_by_reservation_type(self, reservation_type: str, limit: int = None) -> List[int]:
+        return self._by_reservation_type.get(reservation_type, [])[:limit]
+
+
+class ItineraryStore:
+    """
+    SQLite-backed (WAL mode) store of booked itineraries shared by all customers.
+
+    append() only queues the itinerary; a single writer thread commits everything queued since its last
+    commit in one transaction (group commit), so concurrent bookings share one fsync (synchronous=FULL, so a
+    commit survives power loss). The returned future resolves to the itinerary id once the row is durable.
+    Reads first wait for the customer's own queued writes, not everyone's, then use keyset pagination on
+    (customer_id, itinerary_id), so a page costs the same however many itineraries the customer already has.
+
+    Secondary indexes on travel date, total cost, provider and reservation type are written in the same
+    transaction as the itinerary, so the find_by_* queries are index range scans. Appending a record whose
+    saga_id is already stored resolves to the stored itinerary's id instead of adding a duplicate.
+    """
+
+    def __init__(self, db_path: str = ":memory:", max_batch_size: int = 256):
+        self._connection = sqlite3.connect(db_path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=FULL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS itineraries (
+                itinerary_id INTEGER PRIMARY KEY AUTOINCREMENT,
+                customer_id  TEXT NOT NULL,
+                total_cost   REAL NOT NULL,
+                reservations TEXT NOT NULL,
+                travel_date  TEXT,
+                saga_id      TEXT
+            )""")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS itinerary_tags (
+                customer_id  TEXT NOT NULL,
+                tag_kind     TEXT NOT NULL,
+                tag_value    TEXT NOT NULL,
+                itinerary_id INTEGER NOT NULL,
+                PRIMARY KEY (customer_id, tag_kind, tag_value, itinerary_id)
+            ) WITHOUT ROWID""")
+        self._migrate()
+        self._connection.execute(
+            "CREATE INDEX IF NOT EXISTS itineraries_by_customer ON itineraries (customer_id, itinerary_id)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS itineraries_by_travel_date "
+                                 "ON itineraries (customer_id, travel_date, itinerary_id)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS itineraries_by_total_cost "
+                                 "ON itineraries (customer_id, total_cost, itinerary_id)")
+        self._connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS itineraries_by_saga ON itineraries (saga_id)")
+        self._connection.commit()
+        self._db_lock = threading.Lock()
+        self._max_batch_size = max_batch_size
+        self._pending = deque()
+        self._unwritten: Dict[str, int] = {}
+        self._pending_changed = threading.Condition()
+        self._in_flight = 0
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="itinerary-store-writer", daemon=True)
+        self._writer.start()
+
+    def _migrate(self):
+        """Add the columns and backfill the secondary indexes of a store created before they existed."""
+        columns = [row[1] for row in self._connection.execute("PRAGMA table_info(itineraries)")]
+        if "saga_id" not in columns:
+            self._connection.execute("ALTER TABLE itineraries ADD COLUMN saga_id TEXT")
+        if "travel_date" in columns:
+            return
+
+        self._connection.execute("ALTER TABLE itineraries ADD COLUMN travel_date TEXT")
+        for row in self._connection.execute(
+                "SELECT itinerary_id, customer_id, total_cost, reservations FROM itineraries").fetchall():
+            record = self._to_record(row)
+            self._connection.execute("UPDATE itineraries SET travel_date = ? WHERE itinerary_id = ?",
+                                     (record.travel_date, record.itinerary_id))
+            self._insert_tags(record)
+
+    def _insert_tags(self, record: ItineraryRecord):
+        tags = {(kind, value) for reservation in record.reservations
+                for kind, value in (("provider", reservation.provider), ("type", reservation.reservation_type))}
+        self._connection.executemany(
+            "INSERT OR IGNORE INTO itinerary_tags (customer_id, tag_kind, tag_value, itinerary_id) "
+            "VALUES (?, ?, ?, ?)",
+            [(record.customer_id, kind, value, record.itinerary_id) for kind, value in tags])
+
+    def append(self, record: ItineraryRecord) -> Future:
+        future = Future()
+        with self._pending_changed:
+            if self._closed:
+                raise RuntimeError("Itinerary store is closed.")
+            self._pending.append((record, future))
+            self._unwritten[record.customer_id] = self._unwritten.get(record.customer_id, 0) + 1
+            self._pending_changed.notify_all()
+        return future
+
+    def flush(self, customer_id: str = None):
+        """Block until every itinerary queued so far, or only those of customer_id, is committed."""
+        with self._pending_changed:
+            if customer_id is None:
+                self._pending_changed.wait_for(lambda: not self._pending and not self._in_flight)
+            else:
+                self._pending_changed.wait_for(lambda: customer_id not in self._unwritten)
+
+    def _write_loop(self):
+        while True:
+            with self._pending_changed:
+                self._pending_changed.wait_for(lambda: self._pending or self._closed)
+                if not self._pending:
+                    return
+                batch = [self._pending.popleft() for _ in range(min(len(self._pending), self._max_batch_size))]
+                self._in_flight = len(batch)
+
+            try:
+                self._commit_batch(batch)
+            finally:
+                with self._pending_changed:
+                    self._in_flight = 0
+                    for record, _ in batch:
+                        self._unwritten[record.customer_id] -= 1
+                        if not self._unwritten[record.customer_id]:
+                            del self._unwritten[record.customer_id]
+                    self._pending_changed.notify_all()
+
+    def _commit_batch(self, batch: List[Tuple[ItineraryRecord, Future]]):
+        try:
+            with self._db_lock, self._connection:
+                for record, future in batch:
+                    cursor = self._connection.execute(
+                        "INSERT OR IGNORE INTO itineraries (customer_id, total_cost, reservations, travel_date, "
+                        "saga_id) VALUES (?, ?, ?, ?, ?)",
+                        (record.customer_id, record.total_cost,
+                         json.dumps([reservation.to_row() for reservation in record.reservations]),
+                         record.travel_date, record.saga_id))
+                    if cursor.rowcount == 0:
+                        record.itinerary_id = self._connection.execute(
+                            "SELECT itinerary_id FROM itineraries WHERE saga_id = ?", (record.saga_id,)).fetchone()[0]
+                        continue
+                    record.itinerary_id = cursor.lastrowid
+                    self._insert_tags(record)
+        except Exception as e:
+            logger.error("Failed to store %d itineraries: %s", len(batch), e)
+            for _, future in batch:
+                future.set_exception(e)
+            return
+
+        for record, future in batch:
+            future.set_result(record.itinerary_id)
+
+    def page(self, customer_id: str, cursor: Optional[int] = None, limit: int = 20) -> ItineraryPage:
+        """Itineraries of a customer in booking order, starting after cursor (an itinerary id)."""
+        if limit < 1:
+            raise ValueError(f"Page limit must be at least 1, got {limit}")
+        self.flush(customer_id)
+        with self._db_lock:
+            rows = self._connection.execute(
+                "SELECT itinerary_id, customer_id, total_cost, reservations FROM itineraries "
+                "WHERE customer_id = ? AND itinerary_id > ? ORDER BY itinerary_id LIMIT ?",
+                (customer_id, cursor or 0, limit + 1)).fetchall()
+
+        itineraries = [self._to_record(row) for row in rows[:limit]]
+        next_cursor = itineraries[-1].itinerary_id if len(rows) > limit else None
+        return ItineraryPage(itineraries, next_cursor)
+
+    def _select(self, where: str, order_by: str, args: tuple, limit: Optional[int]) -> List[ItineraryRecord]:
+        self.flush(args[0])  # Every query filters on the customer id first.
+        with self._db_lock:
+            rows = self._connection.execute(
+                f"SELECT itinerary_id, customer_id, total_cost, reservations FROM itineraries "
+                f"WHERE {where} ORDER BY {order_by} LIMIT ?", args + (-1 if limit is None else limit,)).fetchall()
+        return [self._to_record(row) for row in rows]
+
+    def find_by_travel_date(self, customer_id: str, date_from=None, date_to=None,
+                            limit: int = None) -> List[ItineraryRecord]:
+        """Itineraries starting within [date_from, date_to], earliest first."""
+        date_from, date_to = format_travel_date(date_from), format_travel_date(date_to)
+        return self._select("customer_id = ? AND travel_date >= ? AND travel_date <= ?",
+                            "travel_date, itinerary_id",
+                            (customer_id, date_from or "", date_to or "\uffff"), limit)
+
+    def find_by_total_cost(self, customer_id: str, min_cost: float = None, max_cost: float = None,
+                           limit: int = None) -> List[ItineraryRecord]:
+        """Itineraries costing within [min_cost, max_cost], cheapest first."""
+        return self._select("customer_id = ? AND total_cost >= ? AND total_cost <= ?",
+                            "total_cost, itinerary_id",
+                            (customer_id, float("-inf") if min_cost is None else min_cost,
+                             float("inf") if max_cost is None else max_cost), limit)
+
+    def _find_by_tag(self, customer_id: str, kind: str, value: str, limit: Optional[int]) -> List[ItineraryRecord]:
+        return self._select("itinerary_id IN (SELECT itinerary_id FROM itinerary_tags "
+                            "WHERE customer_id = ? AND tag_kind = ? AND tag_value = ?)",
+                            "itinerary_id", (customer_id, kind, value), limit)
+
+    def find_by_provider(self, customer_id: str, provider: str, limit: int = None) -> List[ItineraryRecord]:
+        return self._find_by_tag(customer_id, "provider", provider, limit)
+
+    def find_by_reservation_type(self, customer_id: str, reservation_type: str,
+                                 limit: int = None) -> List[ItineraryRecord]:
+        return self._find_by_tag(customer_id, "type", reservation_type, limit)
+
+    def count(self, customer_id: str) -> int:
+        self.flush(customer_id)
+        with self._db_lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM itineraries WHERE customer_id = ?", (customer_id,)).fetchone()[0]
+
+    def _to_record(self, row) -> ItineraryRecord:
+        reservations = [ReservationRecord(*reservation) for reservation in json.loads(row[3])]
+        return ItineraryRecord(row[0], row[1], row[2], reservations)
+
+    def close(self):
+        with self._pending_changed:
+            self._closed = True
+            self._pending_changed.notify_all()
+        self._writer.join()
+        with self._db_lock:
+            self._connection.close()
@@ -0,0 +1,303 @@
+import math
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Sequence, Tuple
+
+METRICS_ENV = "EXPEDIA_METRICS"
+
+# Upper bounds in seconds; vendor calls range from cache-fast to multi-second timeouts.
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BCRYPT_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1.0, 2.0)
+
+clock = time.perf_counter
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence, extra: Tuple[str, str] = None) -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class _CounterChild:
+    __slots__ = ("_registry", "_lock", "value")
+
+    def __init__(self, registry: "MetricsRegistry"):
+        self._registry = registry
+        self._lock = threading.Lock()
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0):
+        if not self._registry.enabled:
+            return
+        with self._lock:
+            self.value += amount
+
+
+class _HistogramChild:
+    __slots__ = ("_registry", "_lock", "_bounds", "counts", "sum", "count")
+
+    def __init__(self, registry: "MetricsRegistry", bounds: Tuple[float, ...]):
+        self._registry = registry
+        self._lock = threading.Lock()
+        self._bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)  # per bucket, not cumulative; the last one is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        if not self._registry.enabled:
+            return
+        index = bisect_left(self._bounds, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th observation; +Inf if it is past the last bound."""
+        with self._lock:
+            counts, total = list(self.counts), self.count
+        if total == 0:
+            return 0.0
+        rank, seen = q * total, 0
+        for bound, bucket_count in zip(self._bounds + (math.inf,), counts):
+            seen += bucket_count
+            if seen >= rank:
+                return bound
+        return math.inf
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str]):
+        self._registry = registry
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[tuple, object] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, *values):
+        """The series for these label values, created on first use."""
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}, got {values}.")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _labels(self, values: tuple, extra: Tuple[str, str] = None) -> str:
+        constant = self._registry.constant_labels
+        return _format_labels(tuple(name for name, _ in constant) + self.labelnames,
+                              tuple(value for _, value in constant) + values, extra)
+
+    def _series(self) -> List[Tuple[tuple, object]]:
+        with self._lock:
+            series = list(self._children.items())
+        return sorted(((tuple(str(value) for value in values), child) for values, child in series),
+                      key=lambda item: item[0])
+
+    def clear(self):
+        with self._lock:
+            self._children.clear()
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def _new_child(self):
+        return _CounterChild(self._registry)
+
+    def inc(self, amount: float = 1.0):
+        self.labels().inc(amount)
+
+    def snapshot(self) -> dict:
+        return {",".join(values): child.value for values, child in self._series()}
+
+    def render(self) -> List[str]:
+        return [f"{self.name}{self._labels(values)} {_format_value(child.value)}"
+                for values, child in self._series()]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, registry: "MetricsRegistry", name: str, documentation: str, labelnames: Sequence[str],
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(registry, name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self._registry, self.buckets)
+
+    def observe(self, value: float):
+        self.labels().observe(value)
+
+    def snapshot(self) -> dict:
+        return {",".join(values): {"count": child.count, "sum": child.sum, "p50": child.quantile(0.5),
+                                   "p95": child.quantile(0.95), "p99": child.quantile(0.99)}
+                for values, child in self._series()}
+
+    def render(self) -> List[str]:
+        lines = []
+        for values, child in self._series():
+            with child._lock:
+                counts, total, value_sum = list(child.counts), child.count, child.sum
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+                cumulative += bucket_count
+                labels = self._labels(values, ("le", _format_value(bound)))
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = self._labels(values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(value_sum)}")
+            lines.append(f"{self.name}_count{labels} {total}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Counters and histograms keyed by label values, plus gauges read from callbacks at collection time.
+
+    While disabled, inc() and observe() return after one attribute check and the instrumented wrappers
+    skip timing entirely, so instrumentation can stay in place in production. snapshot() returns plain
+    dicts for in-process use; render_prometheus() returns the Prometheus text exposition format.
+
+    The values are those of this process only. Pre-forked workers each set a constant worker_pid label,
+    which render_prometheus() adds to every sample so a scraper can tell the workers apart and sum them.
+    """
+
+    def __init__(self, enabled: bool = False):
+        self.enabled = enabled
+        self._metrics: Dict[str, _Metric] = {}
+        self._gauges: Dict[str, Tuple[str, Sequence[str], Callable[[], Iterable[Tuple[tuple, float]]]]] = {}
+        self._lock = threading.Lock()
+        self.constant_labels: Tuple[Tuple[str, str], ...] = ()
+
+    def set_constant_labels(self, **labels):
+        """Labels rendered on every sample, ahead of the metric's own."""
+        self.constant_labels = tuple((name, str(value)) for name, value in sorted(labels.items()))
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(self, name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._register(Histogram(self, name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name: str, documentation: str, labelnames: Sequence[str],
+                       collect: Callable[[], Iterable[Tuple[tuple, float]]]):
+        """Registers (or replaces) a gauge whose (label values, value) pairs are read on every collection."""
+        with self._lock:
+            self._gauges[name] = (documentation, tuple(labelnames), collect)
+
+    def _collect_gauges(self) -> List[Tuple[str, str, tuple, List[Tuple[tuple, float]]]]:
+        with self._lock:
+            gauges = list(self._gauges.items())
+        return [(name, documentation, labelnames, sorted(collect()))
+                for name, (documentation, labelnames, collect) in sorted(gauges)]
+
+    def snapshot(self) -> Dict[str, dict]:
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        snapshot = {name: metric.snapshot() for name, metric in metrics}
+        for name, _, _, samples in self._collect_gauges():
+            snapshot[name] = {",".join(str(value) for value in values): value for values, value in samples}
+        return snapshot
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.items())
+        lines = []
+        for name, metric in metrics:
+            lines.append(f"# HELP {name} {metric.documentation}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            lines.extend(metric.render())
+        for name, documentation, labelnames, samples in self._collect_gauges():
+            lines.append(f"# HELP {name} {documentation}")
+            lines.append(f"# TYPE {name} gauge")
+            constant_names = tuple(label for label, _ in self.constant_labels)
+            constant_values = tuple(value for _, value in self.constant_labels)
+            lines.extend(f"{name}{_format_labels(constant_names + labelnames, constant_values + values)} "
+                         f"{_format_value(value)}" for values, value in samples)
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            metric.clear()
+
+
+REGISTRY = MetricsRegistry(enabled=os.environ.get(METRICS_ENV, "").lower() in ("1", "true", "yes"))
+
+ADAPTER_CALL_SECONDS = REGISTRY.histogram(
+    "expedia_adapter_call_seconds", "Latency of flight, hotel and payment adapter calls.",
+    ("adapter", "provider", "method", "outcome"))
+SAGA_OUTCOMES = REGISTRY.counter(
+    "expedia_booking_sagas_total", "Booking sagas by outcome: booked, rolled_back or rollback_failed.", ("outcome",))
+SAGA_SECONDS = REGISTRY.histogram(
+    "expedia_booking_saga_seconds", "Duration of book_all_reservations by outcome.", ("outcome",))
+BCRYPT_SECONDS = REGISTRY.histogram(
+    "expedia_bcrypt_seconds", "Time spent hashing and verifying passwords.", ("operation",), BCRYPT_BUCKETS)
+
+_caches: Dict[str, object] = {}
+_caches_lock = threading.Lock()
+
+
+def register_cache(name: str, cache):
+    """Exports the hit/miss counters of anything with a stats() dict, such as the search caches."""
+    with _caches_lock:
+        _caches[name] = cache
+
+
+def _cache_samples(field: str) -> Callable[[], List[Tuple[tuple, float]]]:
+    def collect():
+        with _caches_lock:
+            caches = list(_caches.items())
+        return [((name,), cache.stats().get(field, 0)) for name, cache in caches]
+    return collect
+
+
+REGISTRY.gauge_callback("expedia_cache_hits", "Cache hits since start.", ("cache",), _cache_samples("hits"))
+REGISTRY.gauge_callback("expedia_cache_misses", "Cache misses since start.", ("cache",), _cache_samples("misses"))
+REGISTRY.gauge_callback("expedia_cache_hit_ratio", "Cache hits over lookups.", ("cache",),
+                        _cache_samples("hit_ratio"))
+
+
+def snapshot() -> Dict[str, dict]:
+    return REGISTRY.snapshot()
+
+
+def render_prometheus() -> str:
+    return REGISTRY.render_prometheus()
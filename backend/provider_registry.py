@@ -0,0 +1,268 @@
+import importlib
+import threading
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from backend.customer_backend_mgr import FlightOnlineAPIInterface, HotelOnlineAPIInterface, Flight, Room
+from backend.exceptions import NetworkError
+from backend.instrumentation import InstrumentedFlightOnlineAPI, InstrumentedHotelOnlineAPI
+
+# Adapters by provider name, as "module:attribute" targets. Nothing here is imported until a provider's
+# first client is created, so startup does not pay for vendor SDKs that a process never calls.
+BUILTIN_FLIGHT_PROVIDERS = {
+    "Turkish Airlines": "backend.providers.turkish:TurkishFlightOnlineOnlineAPI",
+    "AirCanada": "backend.providers.aircanada:AirCanadaFlightOnlineOnlineAPI",
+}
+BUILTIN_HOTEL_PROVIDERS = {
+    "Hilton": "backend.providers.hilton:HiltonHotelOnlineOnlineAPI",
+    "Marriott": "backend.providers.marriott:MarriottHotelOnlineOnlineAPI",
+}
+
+# Installed packages add providers with entry points in these groups, named by provider name, e.g.
+#   [project.entry-points."expedia.flight_providers"]
+#   "Royal Jordanian" = "rj_expedia.adapter:RoyalJordanianFlightOnlineAPI"
+FLIGHT_PROVIDERS_GROUP = "expedia.flight_providers"
+HOTEL_PROVIDERS_GROUP = "expedia.hotel_providers"
+
+
+def load_object(target: str):
+    """The object a "package.module:attribute" target names, importing the module if needed."""
+    module_name, _, attribute = target.partition(":")
+    found = importlib.import_module(module_name)
+    for name in filter(None, attribute.split(".")):
+        found = getattr(found, name)
+    return found
+
+
+def discover_providers(group: str) -> Dict[str, str]:
+    """Provider name -> target of every entry point installed in group; the modules are not imported."""
+    from importlib.metadata import entry_points
+
+    return {entry_point.name: entry_point.value for entry_point in entry_points(group=group)}
+
+
+def _plugin_factory(target: str, vendor_client: Callable[[], object] = None) -> Callable[[], object]:
+    def create():
+        adapter_class = load_object(target)
+        return adapter_class() if vendor_client is None else adapter_class(vendor_client())
+    return create
+
+
+class ProviderClientPool:
+    """Bounded pool of long-lived adapter instances; a client is used by one worker at a time."""
+
+    def __init__(self, factory: Callable[[], object], max_size: int = 8, min_size: int = 0,
+                 checkout_timeout: float = 30.0):
+        self._factory = factory
+        self._max_size = max_size
+        self._checkout_timeout = checkout_timeout
+        self._idle = deque()
+        self._created = 0
+        self._available = threading.Condition()
+        self.warm(min_size)
+
+    def warm(self, count: int):
+        """Create clients up front so the first searches do not pay the setup cost."""
+        with self._available:
+            while self._created < min(count, self._max_size):
+                self._idle.append(self._factory())
+                self._created += 1
+            self._available.notify_all()
+
+    def checkout(self, timeout: float = None):
+        timeout = self._checkout_timeout if timeout is None else timeout
+        with self._available:
+            # A discarded client frees a place, so waiters wake for either an idle client or room to create one.
+            if not self._available.wait_for(lambda: self._idle or self._created < self._max_size, timeout):
+                raise NetworkError(f"No provider client available after {timeout}s (pool size {self._max_size}).")
+            if self._idle:
+                return self._idle.popleft()
+            self._created += 1
+            try:
+                return self._factory()
+            except Exception:
+                self._created -= 1
+                raise
+
+    def checkin(self, client):
+        with self._available:
+            self._idle.append(client)
+            self._available.notify()
+
+    def discard(self, client):
+        """Drop a broken client instead of returning it; a fresh one is created on demand."""
+        with self._available:
+            self._created -= 1
+            self._available.notify()
+
+    @contextmanager
+    def lease(self):
+        client = self.checkout()
+        try:
+            yield client
+        except Exception:
+            self.discard(client)
+            raise
+        else:
+            self.checkin(client)
+
+    @property
+    def size(self) -> int:
+        return self._created
+
+    @property
+    def idle(self) -> int:
+        return len(self._idle)
+
+
+class PooledFlightOnlineAPI(FlightOnlineAPIInterface):
+    """Shareable flight adapter that leases a pooled vendor client for every call."""
+
+    def __init__(self, company_name: str, pool: ProviderClientPool):
+        self._company_name = company_name
+        self.pool = pool
+
+    def fetch_flights(self, date_from: datetime, from_location: str, date_to: datetime, to_location: str,
+                      num_infants: int, num_children: int, num_adults: int) -> List[Flight]:
+        with self.pool.lease() as client:
+            return client.fetch_flights(date_from, from_location, date_to, to_location,
+                                        num_infants, num_children, num_adults)
+
+    def book_flight(self, flight, customer_info: list, idempotency_key: str = None) -> str:
+        with self.pool.lease() as client:
+            return client.book_flight(flight, customer_info, idempotency_key)
+
+    def cancel_flight(self, confirmation_id: str) -> bool:
+        with self.pool.lease() as client:
+            return client.cancel_flight(confirmation_id)
+
+    def get_company_name(self) -> str:
+        return self._company_name
+
+
+class PooledHotelOnlineAPI(HotelOnlineAPIInterface):
+    """Shareable hotel adapter that leases a pooled vendor client for every call."""
+
+    def __init__(self, hotel_name: str, pool: ProviderClientPool):
+        self._hotel_name = hotel_name
+        self.pool = pool
+
+    def fetch_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
+                    needed_rooms: int) -> List[Room]:
+        with self.pool.lease() as client:
+            return client.fetch_rooms(location, from_date, to_date, adults, children, needed_rooms)
+
+    def book_room(self, room, customer_info: list, idempotency_key: str = None) -> str:
+        with self.pool.lease() as client:
+            return client.book_room(room, customer_info, idempotency_key)
+
+    def cancel_room(self, confirmation_id: str) -> bool:
+        with self.pool.lease() as client:
+            return client.cancel_room(confirmation_id)
+
+    def get_hotel_name(self) -> str:
+        return self._hotel_name
+
+
+class ProviderRegistry:
+    """Pooled adapters by provider name. Every pooled client is wrapped for metrics (see backend.metrics)."""
+
+    def __init__(self):
+        self._flight_apis: Dict[str, PooledFlightOnlineAPI] = {}
+        self._hotel_apis: Dict[str, PooledHotelOnlineAPI] = {}
+
+    def register_flight_provider(self, factory: Callable[[], FlightOnlineAPIInterface], max_size: int = 8,
+                                 min_size: int = 1) -> PooledFlightOnlineAPI:
+        pool = ProviderClientPool(lambda: InstrumentedFlightOnlineAPI(factory()), max_size, min_size)
+        with pool.lease() as client:
+            name = client.get_company_name()
+        self._flight_apis[name] = PooledFlightOnlineAPI(name, pool)
+        return self._flight_apis[name]
+
+    def register_hotel_provider(self, factory: Callable[[], HotelOnlineAPIInterface], max_size: int = 8,
+                                min_size: int = 1) -> PooledHotelOnlineAPI:
+        pool = ProviderClientPool(lambda: InstrumentedHotelOnlineAPI(factory()), max_size, min_size)
+        with pool.lease() as client:
+            name = client.get_hotel_name()
+        self._hotel_apis[name] = PooledHotelOnlineAPI(name, pool)
+        return self._hotel_apis[name]
+
+    def register_flight_plugin(self, name: str, target: str, max_size: int = 8, min_size: int = 0,
+                               vendor_client: Callable[[], object] = None) -> PooledFlightOnlineAPI:
+        """
+        Registers the adapter class at target under name without importing it; the module is imported when
+        the first client is created, at the first call unless min_size warms the pool. vendor_client, if
+        given, builds the vendor SDK object passed to every new adapter.
+        """
+        factory = _plugin_factory(target, vendor_client)
+        pool = ProviderClientPool(lambda: InstrumentedFlightOnlineAPI(factory()), max_size, min_size)
+        self._flight_apis[name] = PooledFlightOnlineAPI(name, pool)
+        return self._flight_apis[name]
+
+    def register_hotel_plugin(self, name: str, target: str, max_size: int = 8, min_size: int = 0,
+                              vendor_client: Callable[[], object] = None) -> PooledHotelOnlineAPI:
+        """The hotel counterpart of register_flight_plugin."""
+        factory = _plugin_factory(target, vendor_client)
+        pool = ProviderClientPool(lambda: InstrumentedHotelOnlineAPI(factory()), max_size, min_size)
+        self._hotel_apis[name] = PooledHotelOnlineAPI(name, pool)
+        return self._hotel_apis[name]
+
+    def flight_api(self, company_name: str) -> PooledFlightOnlineAPI:
+        return self._flight_apis[company_name]
+
+    def hotel_api(self, hotel_name: str) -> PooledHotelOnlineAPI:
+        return self._hotel_apis[hotel_name]
+
+    def flight_apis(self) -> List[PooledFlightOnlineAPI]:
+        return list(self._flight_apis.values())
+
+    def hotel_apis(self) -> List[PooledHotelOnlineAPI]:
+        return list(self._hotel_apis.values())
+
+    @classmethod
+    def with_default_providers(cls, max_size: int = 8, min_size: int = 0,
+                               discover: bool = True) -> "ProviderRegistry":
+        """
+        The built-in providers plus, when discover is set, the ones installed through entry points. Adapter
+        modules are imported on first use; a min_size above 0 imports them now to warm the pools.
+        """
+        flight_providers, hotel_providers = dict(BUILTIN_FLIGHT_PROVIDERS), dict(BUILTIN_HOTEL_PROVIDERS)
+        if discover:
+            flight_providers.update(discover_providers(FLIGHT_PROVIDERS_GROUP))
+            hotel_providers.update(discover_providers(HOTEL_PROVIDERS_GROUP))
+
+        registry = cls()
+        for name, target in flight_providers.items():
+            registry.register_flight_plugin(name, target, max_size, min_size)
+        for name, target in hotel_providers.items():
+            registry.register_hotel_plugin(name, target, max_size, min_size)
+        return registry
+
+    @classmethod
+    def with_simulated_providers(cls, profile=None, max_size: int = 8, min_size: int = 1,
+                                 base_url: str = None) -> "ProviderRegistry":
+        """
+        The built-in providers backed by simulated vendors: in-process ones driven by profile (a
+        backend.api.simulated.SimulationProfile), or the ones served by a SimulatedVendorServer at base_url.
+        """
+        from backend.api.simulated import (SimulatedTurkishOnlineAPI, SimulatedAirCanadaOnlineAPI,
+                                           SimulatedHiltonHotelAPI, SimulatedMarriottHotelAPI)
+        from backend.api.simulated_http import HttpVendorClient
+
+        def vendor(name: str, simulator: Callable):
+            if base_url is not None:
+                return lambda: HttpVendorClient(base_url, name)
+            return lambda: simulator(profile)
+
+        registry = cls()
+        for name, vendor_name, simulator in (("Turkish Airlines", "turkish", SimulatedTurkishOnlineAPI),
+                                             ("AirCanada", "aircanada", SimulatedAirCanadaOnlineAPI)):
+            registry.register_flight_plugin(name, BUILTIN_FLIGHT_PROVIDERS[name], max_size, min_size,
+                                            vendor(vendor_name, simulator))
+        for name, vendor_name, simulator in (("Hilton", "hilton", SimulatedHiltonHotelAPI),
+                                             ("Marriott", "marriott", SimulatedMarriottHotelAPI)):
+            registry.register_hotel_plugin(name, BUILTIN_HOTEL_PROVIDERS[name], max_size, min_size,
+                                           vendor(vendor_name, simulator))
+        return registry
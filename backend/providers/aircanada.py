@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import List
+
+from backend.api.flights.aircanada_external import AirCanadaOnlineAPI, AirCanadaFlight
+from backend.customer_backend_mgr import FlightOnlineAPIInterface, Flight
+
+
+class AirCanadaFlightOnlineOnlineAPI(FlightOnlineAPIInterface):
+    def __init__(self, aircanada_api: AirCanadaOnlineAPI = None):
+        self.aircanada_api = aircanada_api or AirCanadaOnlineAPI()
+
+    def fetch_flights(self, date_from :datetime, from_location :str, date_to :datetime, to_location: str,
+                      num_infants: int, num_children: int, num_adults: int) -> List[Flight]:
+        available_flights = []
+
+        flight_objects = self.aircanada_api.get_flights(from_location, date_from, to_location, date_to, num_adults, num_children)
+        for flight in flight_objects:
+            available_flights.append(Flight(flight_fetched_object=flight,
+                                       airline_name= self.get_company_name(),
+                                       from_loc=from_location,
+                                       date_from=flight.date_time_from,
+                                       to_location=to_location,
+                                       date_to=flight.date_time_to,
+                                       num_infants=num_infants,
+                                       num_children=num_children,
+                                       num_adults=num_adults,
+                                       cost=flight.price))
+
+        return available_flights
+
+    def book_flight(self, flight :AirCanadaFlight, customer_info :list, idempotency_key: str = None) -> str:
+        return self.aircanada_api.reserve_flight(flight, customer_info, idempotency_key)
+
+    def cancel_flight(self, confirmation_id :str) -> bool:
+        return self.aircanada_api.cancel_flight(confirmation_id)
+
+    def get_company_name(self) -> str:
+        return "AirCanada"
@@ -0,0 +1,42 @@
+from datetime import datetime
+from typing import List
+
+from backend.api.hotels.hilton_external import HiltonHotelAPI, HiltonRoom
+from backend.customer_backend_mgr import HotelOnlineAPIInterface, Room
+
+
+class HiltonHotelOnlineOnlineAPI(HotelOnlineAPIInterface):
+    def __init__(self, hilton_api: HiltonHotelAPI = None):
+        self.hilton_api = hilton_api or HiltonHotelAPI()
+
+    def fetch_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
+                    needed_rooms: int) -> List[Room]:
+        available_rooms = []
+
+        room_objects = self.hilton_api.search_rooms(location, from_date, to_date, adults, children, needed_rooms)
+        for room in room_objects:
+            available_rooms.append(Room(
+                                        room_fetched_object=room,
+                                        hotel_name = self.get_hotel_name(),
+                                        room_type = room.room_type,
+                                        rooms_available = room.available,
+                                        num_rooms_needed = needed_rooms,
+                                        price_per_night = room.price_per_night,
+                                        date_from = from_date,
+                                        date_to = to_date,
+                                        location = location,
+                                        num_children = children,
+                                        num_adults = adults
+
+            ))
+
+        return available_rooms
+
+    def book_room(self, room: HiltonRoom, customer_info :list, idempotency_key: str = None) -> str:
+        return self.hilton_api.reserve_room(room, customer_info, idempotency_key)
+
+    def cancel_room(self, confirmation_id :str) -> bool:
+        return self.hilton_api.cancel_room(confirmation_id)
+
+    def get_hotel_name(self) -> str:
+        return "Hilton"
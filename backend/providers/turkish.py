@@ -0,0 +1,38 @@
+from datetime import datetime
+from typing import List
+
+from backend.api.flights.turkish_external import TurkishOnlineAPI, TurkishFlight
+from backend.customer_backend_mgr import FlightOnlineAPIInterface, Flight
+
+
+class TurkishFlightOnlineOnlineAPI(FlightOnlineAPIInterface):
+    def __init__(self, turkish_api: TurkishOnlineAPI = None):
+        self.turkish_api = turkish_api or TurkishOnlineAPI()
+
+    def fetch_flights(self, date_from :datetime, from_location :str, date_to :datetime, to_location: str,
+                      num_infants: int, num_children: int, num_adults: int) -> List[Flight]:
+        available_flights = []
+
+        flight_objects = self.turkish_api.get_available_flights()
+        for flight in flight_objects:
+            available_flights.append(Flight(flight_fetched_object=flight,
+                                       airline_name= self.get_company_name(),
+                                       from_loc=from_location,
+                                       date_from=flight.datetime_from,
+                                       to_location=to_location,
+                                       date_to=flight.datetime_to,
+                                       num_infants=num_infants,
+                                       num_children=num_children,
+                                       num_adults=num_adults,
+                                       cost=flight.cost))
+
+        return available_flights
+
+    def book_flight(self, flight :TurkishFlight, customer_info :list, idempotency_key: str = None) -> str:
+        return self.turkish_api.reserve_flight(customer_info, flight, idempotency_key)
+
+    def cancel_flight(self, confirmation_id :str) -> bool:
+        return self.turkish_api.cancel_flight(confirmation_id)
+
+    def get_company_name(self) -> str:
+        return "Turkish Airlines"
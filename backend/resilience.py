@@ -0,0 +1,215 @@
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from datetime import datetime
+from typing import Callable, List
+
+from backend.customer_backend_mgr import FlightOnlineAPIInterface, HotelOnlineAPIInterface, Flight, Room
+from backend.exceptions import NetworkError
+
+logger = logging.getLogger(__name__)
+
+
+class CircuitBreaker:
+    """
+    Per-provider breaker over a sliding window of recent calls.
+
+    CLOSED lets calls through; once at least min_calls are recorded and the error rate or the rate of calls
+    slower than slow_call_seconds crosses its threshold it goes OPEN and rejects calls with NetworkError.
+    Errors raised by the wrapped call are re-raised as NetworkError as well.
+    After open_seconds it goes HALF_OPEN and lets half_open_calls trial calls through: if they all succeed
+    it closes again, any failure re-opens it.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, window_size: int = 20, min_calls: int = 5, failure_rate_threshold: float = 0.5,
+                 slow_call_seconds: float = 5.0, slow_call_rate_threshold: float = 0.8, open_seconds: float = 30.0,
+                 half_open_calls: int = 1, clock: Callable[[], float] = time.monotonic):
+        self.name = name
+        self._window = deque(maxlen=window_size)  # (failed, slow) per call
+        self._min_calls = min_calls
+        self._failure_rate_threshold = failure_rate_threshold
+        self._slow_call_seconds = slow_call_seconds
+        self._slow_call_rate_threshold = slow_call_rate_threshold
+        self._open_seconds = open_seconds
+        self._half_open_calls = half_open_calls
+        self._clock = clock
+        self._state = self.CLOSED
+        self._opened_at = 0.0
+        self._trial_calls = 0
+        self._trial_successes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._state == self.OPEN and self._clock() - self._opened_at >= self._open_seconds:
+                return self.HALF_OPEN
+            return self._state
+
+    def call(self, func: Callable, *args):
+        self._before_call()
+        start = self._clock()
+        try:
+            result = func(*args)
+        except NetworkError:
+            self._record(failed=True, elapsed=self._clock() - start)
+            raise
+        except Exception as e:
+            self._record(failed=True, elapsed=self._clock() - start)
+            raise NetworkError(f"{self.name} call failed: {e}") from e
+        self._record(failed=False, elapsed=self._clock() - start)
+        return result
+
+    def _before_call(self):
+        with self._lock:
+            if self._state == self.OPEN:
+                if self._clock() - self._opened_at < self._open_seconds:
+                    raise NetworkError(f"{self.name} circuit is open, call rejected.")
+                self._state = self.HALF_OPEN
+                self._trial_calls = 0
+                self._trial_successes = 0
+
+            if self._state == self.HALF_OPEN:
+                if self._trial_calls >= self._half_open_calls:
+                    raise NetworkError(f"{self.name} circuit is half-open, trial call already in flight.")
+                self._trial_calls += 1
+
+    def _record(self, failed: bool, elapsed: float):
+        slow = elapsed >= self._slow_call_seconds
+        with self._lock:
+            if self._state == self.HALF_OPEN:
+                if failed or slow:
+                    self._trip()
+                else:
+                    self._trial_successes += 1
+                    if self._trial_successes >= self._half_open_calls:
+                        self._state = self.CLOSED
+                        self._window.clear()
+                return
+
+            self._window.append((failed, slow))
+            if self._state == self.CLOSED and len(self._window) >= self._min_calls:
+                failures = sum(1 for failed_call, _ in self._window if failed_call)
+                slow_calls = sum(1 for _, slow_call in self._window if slow_call)
+                if (failures / len(self._window) >= self._failure_rate_threshold
+                        or slow_calls / len(self._window) >= self._slow_call_rate_threshold):
+                    self._trip()
+
+    def _trip(self):
+        logger.error("%s circuit opened.", self.name)
+        self._state = self.OPEN
+        self._opened_at = self._clock()
+        self._window.clear()
+
+
+class HedgedCaller:
+    """
+    Runs an idempotent call and, if it has not answered after the recent p95 latency, sends one duplicate.
+    The first successful answer wins. Until min_samples latencies are known, hedge_delay is used.
+    """
+
+    def __init__(self, name: str, max_workers: int = 8, hedge_delay: float = 1.0, min_samples: int = 20,
+                 sample_size: int = 200):
+        self.name = name
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"hedge-{name}")
+        self._default_delay = hedge_delay
+        self._min_samples = min_samples
+        self._latencies = deque(maxlen=sample_size)
+        self._lock = threading.Lock()
+        self.hedges_sent = 0
+
+    def hedge_delay(self) -> float:
+        with self._lock:
+            if len(self._latencies) < self._min_samples:
+                return self._default_delay
+            ordered = sorted(self._latencies)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+    def call(self, func: Callable, *args):
+        futures = [self._executor.submit(self._timed, func, *args)]
+        done, _ = wait(futures, timeout=self.hedge_delay())
+        if not done:
+            self.hedges_sent += 1
+            futures.append(self._executor.submit(self._timed, func, *args))
+
+        error = None
+        pending = set(futures)
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    for other in pending:
+                        other.cancel()
+                    return future.result()
+                error = future.exception()
+        raise error
+
+    def _timed(self, func: Callable, *args):
+        start = time.monotonic()
+        result = func(*args)
+        with self._lock:
+            self._latencies.append(time.monotonic() - start)
+        return result
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+class ResilientFlightOnlineAPI(FlightOnlineAPIInterface):
+    """Wraps a flight adapter in a circuit breaker; searches can optionally be hedged."""
+
+    def __init__(self, flight_api: FlightOnlineAPIInterface, breaker: CircuitBreaker = None,
+                 hedger: HedgedCaller = None):
+        self.flight_api = flight_api
+        self.breaker = breaker or CircuitBreaker(flight_api.get_company_name())
+        self.hedger = hedger
+
+    def fetch_flights(self, date_from: datetime, from_location: str, date_to: datetime, to_location: str,
+                      num_infants: int, num_children: int, num_adults: int) -> List[Flight]:
+        search_args = (date_from, from_location, date_to, to_location, num_infants, num_children, num_adults)
+        if self.hedger is None:
+            return self.breaker.call(self.flight_api.fetch_flights, *search_args)
+        return self.breaker.call(self.hedger.call, self.flight_api.fetch_flights, *search_args)
+
+    # Bookings are not hedged: a duplicate would book twice with a vendor that ignores the key.
+    def book_flight(self, flight, customer_info: list, idempotency_key: str = None) -> str:
+        return self.breaker.call(self.flight_api.book_flight, flight, customer_info, idempotency_key)
+
+    def cancel_flight(self, confirmation_id: str) -> bool:
+        return self.breaker.call(self.flight_api.cancel_flight, confirmation_id)
+
+    def get_company_name(self) -> str:
+        return self.flight_api.get_company_name()
+
+
+class ResilientHotelOnlineAPI(HotelOnlineAPIInterface):
+    """Wraps a hotel adapter in a circuit breaker; searches can optionally be hedged."""
+
+    def __init__(self, hotel_api: HotelOnlineAPIInterface, breaker: CircuitBreaker = None,
+                 hedger: HedgedCaller = None):
+        self.hotel_api = hotel_api
+        self.breaker = breaker or CircuitBreaker(hotel_api.get_hotel_name())
+        self.hedger = hedger
+
+    def fetch_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
+                    needed_rooms: int) -> List[Room]:
+        search_args = (location, from_date, to_date, adults, children, needed_rooms)
+        if self.hedger is None:
+            return self.breaker.call(self.hotel_api.fetch_rooms, *search_args)
+        return self.breaker.call(self.hedger.call, self.hotel_api.fetch_rooms, *search_args)
+
+    # Bookings are not hedged: a duplicate would book twice with a vendor that ignores the key.
+    def book_room(self, room, customer_info: list, idempotency_key: str = None) -> str:
+        return self.breaker.call(self.hotel_api.book_room, room, customer_info, idempotency_key)
+
+    def cancel_room(self, confirmation_id: str) -> bool:
+        return self.breaker.call(self.hotel_api.cancel_room, confirmation_id)
+
+    def get_hotel_name(self) -> str:
+        return self.hotel_api.get_hotel_name()
@@ -0,0 +1,84 @@
+import logging
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple, Type
+
+from backend.exceptions import NetworkError
+
+logger = logging.getLogger(__name__)
+
+
+class RetryPolicy:
+    """Retries a call on transient errors with exponential backoff and full jitter."""
+
+    def __init__(self, max_attempts: int = 3, base_delay: float = 0.1, max_delay: float = 2.0,
+                 retry_on: Tuple[Type[BaseException], ...] = (NetworkError, ConnectionError, TimeoutError),
+                 sleep: Callable[[float], None] = time.sleep, rand: Callable[[], float] = random.random):
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retry_on = retry_on
+        self._sleep = sleep
+        self._rand = rand
+
+    def backoff(self, attempt: int) -> float:
+        return self._rand() * min(self.max_delay, self.base_delay * (2 ** attempt))
+
+    def call(self, func: Callable, *args):
+        for attempt in range(self.max_attempts):
+            try:
+                return func(*args)
+            except self.retry_on as e:
+                if attempt + 1 >= self.max_attempts:
+                    raise
+                delay = self.backoff(attempt)
+                logger.warning("Transient error (%s), retry %d/%d in %.2fs.", e, attempt + 1, self.max_attempts - 1,
+                               delay)
+                self._sleep(delay)
+
+
+class IdempotencyStore:
+    """
+    Remembers the outcome of each side-effecting step under its idempotency key.
+
+    run() executes a step at most once per key until it succeeds; later calls with the same key return the
+    recorded result without calling the gateway again. Calls for the same key are serialized.
+    """
+
+    def __init__(self):
+        self._results: Dict[str, Any] = {}
+        self._key_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+
+    def _key_lock(self, key: str) -> threading.Lock:
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def run(self, key: str, func: Callable[[], Any], succeeded: Callable[[Any], bool] = bool):
+        with self._key_lock(key):
+            if key in self._results:
+                return self._results[key]
+
+            result = func()
+            if succeeded(result):
+                self._results[key] = result
+            return result
+
+    def get(self, key: str, default=None):
+        return self._results.get(key, default)
+
+    def record(self, key: str, result):
+        with self._key_lock(key):
+            self._results[key] = result
+
+    def forget(self, key: str):
+        with self._lock:
+            self._results.pop(key, None)
+            self._key_locks.pop(key, None)
+
+    def __contains__(self, key: str):
+        return key in self._results
+
+    def __len__(self):
+        return len(self._results)
@@ -0,0 +1,369 @@
+import sys
+import time
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from datetime import datetime, date
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize_location(location: str) -> str:
+    return " ".join(str(location).split()).lower()
+
+
+def _normalize_date(value) -> Any:
+    if isinstance(value, datetime):
+        return value.date()
+    return value
+
+
+def make_flight_query_key(provider_name: str, date_from, from_location: str, date_to, to_location: str,
+                          num_infants: int, num_children: int, num_adults: int) -> tuple:
+    return ("flight", provider_name, _normalize_location(from_location), _normalize_date(date_from),
+            _normalize_location(to_location), _normalize_date(date_to),
+            int(num_infants), int(num_children), int(num_adults))
+
+
+def make_room_query_key(provider_name: str, location: str, from_date, to_date, adults: int, children: int,
+                        needed_rooms: int) -> tuple:
+    return ("room", provider_name, _normalize_location(location), _normalize_date(from_date),
+            _normalize_date(to_date), int(adults), int(children), int(needed_rooms))
+
+
+def room_index_key(key: tuple) -> tuple:
+    """(provider, location) of a room query key, which is how bookings look up the searches they affect."""
+    return key[1], key[2]
+
+
+def estimate_size(value, _seen=None) -> int:
+    """Rough deep size in bytes of lists/tuples/dicts and plain objects."""
+    if _seen is None:
+        _seen = set()
+    if id(value) in _seen:
+        return 0
+    _seen.add(id(value))
+
+    size = sys.getsizeof(value)
+    if isinstance(value, (str, bytes, int, float, bool, date)) or value is None:
+        return size
+    if isinstance(value, dict):
+        return size + sum(estimate_size(k, _seen) + estimate_size(v, _seen) for k, v in value.items())
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return size + sum(estimate_size(item, _seen) for item in value)
+    if hasattr(value, "__dict__"):
+        size += estimate_size(vars(value), _seen)
+    for slot in getattr(type(value), "__slots__", ()):
+        if hasattr(value, slot):
+            size += estimate_size(getattr(value, slot), _seen)
+    return size
+
+
+class TTLLRUCache:
+    """
+    Thread-safe LRU cache with per-entry expiry, bounded by entry count and approximate bytes.
+
+    With index_key, the keys are also grouped by index_key(key), so keys(index) lists one group without
+    scanning the others.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, default_ttl: float = 300.0,
+                 size_of: Callable[[Any], int] = estimate_size, clock: Callable[[], float] = time.monotonic,
+                 index_key: Callable[[Hashable], Hashable] = None):
+        self._max_entries = max_entries
+        self._max_bytes = max_bytes
+        self._default_ttl = default_ttl
+        self._size_of = size_of
+        self._clock = clock
+        self._entries: "OrderedDict[Hashable, Tuple[Any, float, int]]" = OrderedDict()
+        self._index_key = index_key
+        self._index: Dict[Hashable, Dict[Hashable, None]] = {}
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default=None):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+
+            value, expires_at, _ = entry
+            if expires_at <= self._clock():
+                self._remove(key)
+                self.misses += 1
+                return default
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value, ttl: float = None):
+        ttl = self._default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+
+        size = self._size_of(value)
+        if size > self._max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (value, self._clock() + ttl, size)
+            if self._index_key is not None:
+                self._index.setdefault(self._index_key(key), {})[key] = None
+            self._current_bytes += size
+            self._evict()
+
+    def peek(self, key: Hashable, default=None):
+        """Like get() but without touching LRU order, expiry or the hit/miss counters."""
+        with self._lock:
+            entry = self._entries.get(key)
+            return default if entry is None else entry[0]
+
+    def replace(self, key: Hashable, value) -> bool:
+        """Swap the value of a live entry, keeping its expiry and LRU position."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return False
+            _, expires_at, old_size = entry
+            size = self._size_of(value)
+            self._entries[key] = (value, expires_at, size)
+            self._current_bytes += size - old_size
+            self._evict()
+            return True
+
+    def update(self, key: Hashable, func: Callable[[Any], Any], ttl: float = None) -> bool:
+        """
+        Replace the value of a live entry with func(value) atomically; ttl=None keeps its expiry and LRU
+        position. func returns None to leave the entry as it is. Returns whether the entry was replaced.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] <= self._clock():
+                return False
+            value, expires_at, old_size = entry
+            value = func(value)
+            if value is None:
+                return False
+            size = self._size_of(value)
+            self._entries[key] = (value, expires_at if ttl is None else self._clock() + ttl, size)
+            if ttl is not None:
+                self._entries.move_to_end(key)
+            self._current_bytes += size - old_size
+            self._evict()
+            return True
+
+    def keys(self, index: Hashable = None) -> List[Hashable]:
+        """All keys, or with an index_key and index given, only the keys in that group."""
+        with self._lock:
+            if index is not None and self._index_key is not None:
+                return list(self._index.get(index, ()))
+            return list(self._entries)
+
+    def invalidate(self, key: Hashable) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+            self._remove(key)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._index.clear()
+            self._current_bytes = 0
+
+    def _remove(self, key: Hashable):
+        _, _, size = self._entries.pop(key)
+        self._current_bytes -= size
+        if self._index_key is not None:
+            index = self._index_key(key)
+            group = self._index[index]
+            del group[key]
+            if not group:
+                del self._index[index]
+
+    def _evict(self):
+        while self._entries and (len(self._entries) > self._max_entries or self._current_bytes > self._max_bytes):
+            key = next(iter(self._entries))
+            self._remove(key)
+            self.evictions += 1
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def current_bytes(self) -> int:
+        return self._current_bytes
+
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {"hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "entries": len(self._entries), "bytes": self._current_bytes, "hit_ratio": self.hit_ratio()}
+
+
+class FlightSearchCache(TTLLRUCache):
+    """Caches each airline's fetch_flights result under a normalized query key."""
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, default_ttl: float = 300.0,
+                 provider_ttls: Optional[Dict[str, float]] = None, **kwargs):
+        super().__init__(max_entries, max_bytes, default_ttl, **kwargs)
+        self._provider_ttls = dict(provider_ttls or {})
+
+    def set_provider_ttl(self, provider_name: str, ttl: float):
+        self._provider_ttls[provider_name] = ttl
+
+    def get_provider_ttl(self, provider_name: str) -> float:
+        return self._provider_ttls.get(provider_name, self._default_ttl)
+
+    def get_flights(self, provider_name: str, *search_args):
+        return self.get(make_flight_query_key(provider_name, *search_args))
+
+    def put_flights(self, provider_name: str, flights: list, *search_args):
+        self.put(make_flight_query_key(provider_name, *search_args), flights, self.get_provider_ttl(provider_name))
+
+
+class HotelAvailabilityCache:
+    """
+    Caches each hotel's fetch_rooms result keyed by (provider, location, date range, occupancy).
+
+    Entries are fresh for fresh_ttl seconds and may then be served stale for another stale_ttl seconds
+    while a background refresh runs. Successful bookings decrement rooms_available on the matching
+    entries; cancellations invalidate them.
+
+    Entries are (rooms, fetched_at, version) and bookings update them atomically through the store's
+    update(), bumping the version. A refresh only replaces the entry it started from, so inventory loaded
+    before a booking never overwrites the decremented one.
+
+    The entries live in a TTLLRUCache unless another store with the same interface is given, such as a
+    SharedMemoryCache shared by pre-forked workers; a store indexed by room_index_key lets bookings find
+    the affected searches without listing every key.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024, fresh_ttl: float = 60.0,
+                 stale_ttl: float = 240.0, refresh_workers: int = 2, clock: Callable[[], float] = time.monotonic,
+                 store=None):
+        self._fresh_ttl = fresh_ttl
+        self._stale_ttl = stale_ttl
+        self._clock = clock
+        self._cache = store if store is not None else TTLLRUCache(max_entries, max_bytes, fresh_ttl + stale_ttl,
+                                                                  clock=clock, index_key=room_index_key)
+        self._refresh_workers = refresh_workers
+        self._refresh_executor = None
+        self._refreshing = set()
+        self._lock = threading.Lock()
+        self.stale_hits = 0
+
+    @property
+    def hits(self) -> int:
+        return self._cache.hits
+
+    @property
+    def misses(self) -> int:
+        return self._cache.misses
+
+    def get_rooms(self, provider_name: str, location: str, from_date, to_date, adults: int, children: int,
+                  needed_rooms: int, loader: Callable[[], list] = None):
+        key = make_room_query_key(provider_name, location, from_date, to_date, adults, children, needed_rooms)
+        entry = self._cache.get(key)
+        if entry is None:
+            return None
+
+        rooms, fetched_at, _ = entry
+        if self._clock() - fetched_at > self._fresh_ttl:
+            self.stale_hits += 1
+            if loader is not None:
+                self._schedule_refresh(key, loader)
+        return rooms
+
+    def put_rooms(self, provider_name: str, rooms: list, location: str, from_date, to_date, adults: int,
+                  children: int, needed_rooms: int):
+        key = make_room_query_key(provider_name, location, from_date, to_date, adults, children, needed_rooms)
+        self._cache.put(key, (rooms, self._clock(), 0), self._fresh_ttl + self._stale_ttl)
+
+    def _schedule_refresh(self, key: tuple, loader: Callable[[], list]):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+            if self._refresh_executor is None:
+                self._refresh_executor = ThreadPoolExecutor(max_workers=self._refresh_workers,
+                                                            thread_name_prefix="hotel-cache-refresh")
+        self._refresh_executor.submit(self._refresh, key, loader)
+
+    def _refresh(self, key: tuple, loader: Callable[[], list]):
+        try:
+            started = self._cache.peek(key)
+            refreshed = (loader(), self._clock(), 0)
+            if started is None:
+                self._cache.put(key, refreshed, self._fresh_ttl + self._stale_ttl)
+            else:
+                # Dropped if a booking changed the entry meanwhile; the next stale hit refreshes again.
+                self._cache.update(key, lambda current: refreshed if current[1:] == started[1:] else None,
+                                   self._fresh_ttl + self._stale_ttl)
+        except Exception as e:
+            logger.error("Background refresh failed for %s: %s", key, e)
+        finally:
+            with self._lock:
+                self._refreshing.discard(key)
+
+    def _matching_keys(self, provider_name: str, room) -> List[tuple]:
+        location = _normalize_location(room.location) if room.location is not None else None
+        date_from, date_to = _normalize_date(room.date_from), _normalize_date(room.date_to)
+        matches = []
+        keys = self._cache.keys(index=(provider_name, location)) if location is not None else self._cache.keys()
+        for key in keys:
+            _, key_provider, key_location, key_from, key_to = key[:5]
+            if key_provider != provider_name:
+                continue
+            if location is not None and key_location != location:
+                continue
+            if key_from < date_to and date_from < key_to:  # overlapping stay
+                matches.append(key)
+        return matches
+
+    def record_booking(self, provider_name: str, room):
+        """Take the booked rooms out of every overlapping cached search of the same hotel."""
+        def take_booked_rooms(entry, needed_rooms):
+            rooms, fetched_at, version = entry
+            updated = []
+            for cached_room in rooms:
+                if cached_room.room_type == room.room_type:
+                    available = cached_room.rooms_available - room.num_rooms_needed
+                    if available < needed_rooms:
+                        continue
+                    cached_room = cached_room.with_rooms_available(available)
+                updated.append(cached_room)
+            return updated, fetched_at, version + 1
+
+        for key in self._matching_keys(provider_name, room):
+            self._cache.update(key, partial(take_booked_rooms, needed_rooms=key[-1]))
+
+    def record_cancellation(self, provider_name: str, room):
+        for key in self._matching_keys(provider_name, room):
+            self._cache.invalidate(key)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self) -> Dict[str, float]:
+        stats = self._cache.stats()
+        stats["stale_hits"] = self.stale_hits
+        return stats
+
+    def close(self):
+        if self._refresh_executor is not None:
+            self._refresh_executor.shutdown(wait=False)
+            self._refresh_executor = None
@@ -0,0 +1,80 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import time
+from typing import Callable, List, Union
+
+from backend.exceptions import SessionError
+
+SESSION_SECRET_ENV = "EXPEDIA_SESSION_SECRETS"
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+class SessionClaims:
+    __slots__ = ("customer_id", "username", "issued_at", "expires_at")
+
+    def __init__(self, customer_id: str, username: str, issued_at: int, expires_at: int):
+        self.customer_id = customer_id
+        self.username = username
+        self.issued_at = issued_at
+        self.expires_at = expires_at
+
+
+class SessionTokenSigner:
+    """
+    Issues and verifies compact HMAC-SHA256 signed session tokens: "<base64 payload>.<base64 signature>".
+
+    Verification needs only the shared secret, so any node holding it can validate a token without a
+    password check or shared session state. New tokens are signed with the first secret; all secrets are
+    accepted when verifying, which allows key rotation. Secrets come from the EXPEDIA_SESSION_SECRETS
+    environment variable (comma separated) when none are passed.
+    """
+
+    def __init__(self, keys: Union[bytes, List[bytes]] = None, ttl_seconds: int = 3600,
+                 clock: Callable[[], float] = time.time):
+        if keys is None:
+            configured = os.environ.get(SESSION_SECRET_ENV)
+            # Without a configured secret, tokens are only valid within this process.
+            keys = [key.encode() for key in configured.split(",")] if configured else [secrets.token_bytes(32)]
+        elif isinstance(keys, bytes):
+            keys = [keys]
+
+        self._secrets = list(keys)
+        self._ttl_seconds = ttl_seconds
+        self._clock = clock
+
+    def _sign(self, payload: bytes, secret: bytes) -> bytes:
+        return hmac.new(secret, payload, hashlib.sha256).digest()
+
+    def issue(self, customer_id: str, username: str) -> str:
+        now = int(self._clock())
+        payload = json.dumps({"sub": customer_id, "usr": username, "iat": now, "exp": now + self._ttl_seconds},
+                             separators=(",", ":")).encode()
+        return f"{_b64encode(payload)}.{_b64encode(self._sign(payload, self._secrets[0]))}"
+
+    def verify(self, token: str) -> SessionClaims:
+        try:
+            encoded_payload, encoded_signature = token.split(".")
+            payload = _b64decode(encoded_payload)
+            signature = _b64decode(encoded_signature)
+        except (AttributeError, ValueError):
+            raise SessionError("Malformed session token.")
+
+        if not any(hmac.compare_digest(signature, self._sign(payload, secret)) for secret in self._secrets):
+            raise SessionError("Session token signature mismatch.")
+
+        claims = json.loads(payload)
+        if claims["exp"] <= self._clock():
+            raise SessionError("Session expired. Please log in again.")
+
+        return SessionClaims(claims["sub"], claims["usr"], claims["iat"], claims["exp"])
@@ -0,0 +1,337 @@
+import hashlib
+import logging
+import multiprocessing
+import os
+import pickle
+import struct
+import time
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Hashable, Iterator, List, Optional
+
+from backend.search_cache import make_flight_query_key
+
+logger = logging.getLogger(__name__)
+
+# Slot header: sequence number (odd while being written), key hash, index hash, expiry (wall clock), pickled
+# key and pickled value lengths.
+_HEADER = struct.Struct("<QQQdII")
+# Pid of the process holding each lock stripe, 0 when free; kept after the slots.
+_OWNER = struct.Struct("<q")
+_WAYS = 4
+_READ_ATTEMPTS = 3
+
+
+def _key_hash(key: Hashable) -> int:
+    # Stable across processes, unlike hash() of strings.
+    return int.from_bytes(hashlib.blake2b(pickle.dumps(key, protocol=4), digest_size=8).digest(), "little") or 1
+
+
+def _process_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SharedMemoryCache:
+    """
+    TTL cache in a shared memory block, readable and writable by every process forked after it was created.
+
+    The block is a table of fixed-size slots grouped in 4-way buckets; an entry is the pickled key followed
+    by the pickled value, so values larger than slot_size minus a small header are not cached. A write takes the lock of its
+    bucket stripe and evicts the entry expiring first when the bucket is full. Reads take no lock: each slot
+    carries a sequence number that is odd while it is being written, and a read that sees it change retries.
+
+    Each stripe records the pid holding it. A writer that waits longer than lock_timeout checks that pid:
+    if the process died holding the lock, the stripe is released and the slots it left half-written are
+    emptied; if it is alive, the write is skipped, as a cache may drop writes.
+
+    With index_key, every slot header also carries a hash of index_key(key), so keys(index) only unpickles
+    the keys of that group.
+
+    It offers the same get/put/peek/replace/update/keys/invalidate/clear/stats calls as TTLLRUCache; hit
+    and miss counters are per process.
+    """
+
+    def __init__(self, slots: int = 4096, slot_size: int = 16 * 1024, default_ttl: float = 300.0,
+                 lock_stripes: int = 64, clock: Callable[[], float] = time.time,
+                 index_key: Callable[[Hashable], Hashable] = None, lock_timeout: float = 2.0):
+        self._buckets = max(1, slots // _WAYS)
+        self._slot_size = slot_size
+        self._default_ttl = default_ttl
+        self._clock = clock
+        self._index_key = index_key
+        self._lock_timeout = lock_timeout
+        self._owners_offset = self._buckets * _WAYS * slot_size
+        self._memory = shared_memory.SharedMemory(create=True, size=self._owners_offset + lock_stripes * _OWNER.size)
+        self._locks = [multiprocessing.Lock() for _ in range(lock_stripes)]
+        self._recovery_lock = multiprocessing.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _bucket_slots(self, key_hash: int) -> range:
+        first = (key_hash % self._buckets) * _WAYS
+        return range(first, first + _WAYS)
+
+    def _stripe_for(self, key_hash: int) -> int:
+        return (key_hash % self._buckets) % len(self._locks)
+
+    def _stripe_slots(self, stripe: int) -> Iterator[int]:
+        for bucket in range(stripe, self._buckets, len(self._locks)):
+            yield from range(bucket * _WAYS, (bucket + 1) * _WAYS)
+
+    def _owner(self, stripe: int) -> int:
+        return _OWNER.unpack_from(self._memory.buf, self._owners_offset + stripe * _OWNER.size)[0]
+
+    def _set_owner(self, stripe: int, pid: int):
+        _OWNER.pack_into(self._memory.buf, self._owners_offset + stripe * _OWNER.size, pid)
+
+    @contextmanager
+    def _locked(self, stripe: int) -> Iterator[bool]:
+        """Hold the lock of a stripe; yields False when it could not be taken."""
+        acquired = self._acquire(stripe)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self._set_owner(stripe, 0)
+                self._locks[stripe].release()
+
+    def _acquire(self, stripe: int) -> bool:
+        lock = self._locks[stripe]
+        acquired = lock.acquire(timeout=self._lock_timeout)
+        if not acquired and self._recover(stripe):
+            acquired = lock.acquire(timeout=self._lock_timeout)
+        if acquired:
+            self._set_owner(stripe, os.getpid())
+            return True
+        logger.warning("Shared cache stripe %d is held by process %d; skipping the write.", stripe,
+                       self._owner(stripe))
+        return False
+
+    def _recover(self, stripe: int) -> bool:
+        """Release a stripe whose holder died, emptying the slots it was writing."""
+        if not self._recovery_lock.acquire(timeout=self._lock_timeout):
+            return False
+        try:
+            owner = self._owner(stripe)
+            if not owner or _process_alive(owner):
+                return False
+            buf = self._memory.buf
+            for slot in self._stripe_slots(stripe):
+                sequence = _HEADER.unpack_from(buf, slot * self._slot_size)[0]
+                if sequence & 1:
+                    _HEADER.pack_into(buf, slot * self._slot_size, sequence + 1, 0, 0, 0.0, 0, 0)
+            self._set_owner(stripe, 0)
+            self._locks[stripe].release()
+            logger.warning("Released shared cache stripe %d held by dead process %d.", stripe, owner)
+            return True
+        finally:
+            self._recovery_lock.release()
+
+    def _read_slot(self, slot: int, with_value: bool = True):
+        """(key_hash, expires_at, key, value) of a consistent slot, or None when empty or being written."""
+        buf = self._memory.buf
+        offset = slot * self._slot_size
+        for _ in range(_READ_ATTEMPTS):
+            sequence, key_hash, _, expires_at, key_length, value_length = _HEADER.unpack_from(buf, offset)
+            if sequence & 1:
+                continue
+            if key_hash == 0:
+                return None
+            start = offset + _HEADER.size
+            payload = bytes(buf[start:start + key_length + (value_length if with_value else 0)])
+            if _HEADER.unpack_from(buf, offset)[0] != sequence:
+                continue
+            key = pickle.loads(payload[:key_length])
+            return key_hash, expires_at, key, pickle.loads(payload[key_length:]) if with_value else None
+        return None
+
+    def _write_slot(self, slot: int, key_hash: int, index_hash: int, expires_at: float, key_data: bytes,
+                    value_data: bytes):
+        buf = self._memory.buf
+        offset = slot * self._slot_size
+        start = offset + _HEADER.size
+        sequence = _HEADER.unpack_from(buf, offset)[0]
+        _HEADER.pack_into(buf, offset, sequence + 1, 0, 0, 0.0, 0, 0)
+        buf[start:start + len(key_data)] = key_data
+        buf[start + len(key_data):start + len(key_data) + len(value_data)] = value_data
+        _HEADER.pack_into(buf, offset, sequence + 1, key_hash, index_hash, expires_at, len(key_data), len(value_data))
+        struct.pack_into("<Q", buf, offset, sequence + 2)
+
+    def _clear_slot(self, slot: int):
+        buf = self._memory.buf
+        offset = slot * self._slot_size
+        sequence = _HEADER.unpack_from(buf, offset)[0]
+        _HEADER.pack_into(buf, offset, sequence + 2, 0, 0, 0.0, 0, 0)
+
+    def _find(self, key: Hashable, key_hash: int) -> Optional[tuple]:
+        for slot in self._bucket_slots(key_hash):
+            if _HEADER.unpack_from(self._memory.buf, slot * self._slot_size)[1] != key_hash:
+                continue
+            entry = self._read_slot(slot)
+            if entry is not None and entry[0] == key_hash and entry[2] == key:
+                return (slot,) + entry
+        return None
+
+    def get(self, key: Hashable, default=None):
+        found = self._find(key, _key_hash(key))
+        if found is None or found[2] <= self._clock():
+            self.misses += 1
+            return default
+        self.hits += 1
+        return found[4]
+
+    def peek(self, key: Hashable, default=None):
+        found = self._find(key, _key_hash(key))
+        return default if found is None else found[4]
+
+    def put(self, key: Hashable, value, ttl: float = None):
+        ttl = self._default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        self._store(key, value, self._clock() + ttl)
+
+    def _store(self, key: Hashable, value, expires_at: float) -> bool:
+        key_data, value_data = self._encode(key, value)
+        if value_data is None:
+            return False
+
+        key_hash = _key_hash(key)
+        now = self._clock()
+        with self._locked(self._stripe_for(key_hash)) as acquired:
+            if not acquired:
+                return False
+            found = self._find(key, key_hash)
+            if found is not None:
+                target = found[0]
+            else:
+                # An empty or expired slot if there is one, else the live entry closest to expiring.
+                candidates = []
+                for slot in self._bucket_slots(key_hash):
+                    _, slot_hash, _, slot_expiry, _, _ = _HEADER.unpack_from(self._memory.buf, slot * self._slot_size)
+                    candidates.append((slot_expiry if slot_hash and slot_expiry > now else float("-inf"), slot))
+                oldest_expiry, target = min(candidates)
+                if oldest_expiry > float("-inf"):
+                    self.evictions += 1
+            self._write_slot(target, key_hash, self._index_hash(key), expires_at, key_data, value_data)
+        return True
+
+    def _encode(self, key: Hashable, value) -> tuple:
+        """Pickled key and value; the value is None when the entry would not fit in a slot."""
+        key_data = pickle.dumps(key, pickle.HIGHEST_PROTOCOL)
+        value_data = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+        if _HEADER.size + len(key_data) + len(value_data) > self._slot_size:
+            return key_data, None
+        return key_data, value_data
+
+    def _index_hash(self, key: Hashable) -> int:
+        return _key_hash(self._index_key(key)) if self._index_key is not None else 0
+
+    def replace(self, key: Hashable, value) -> bool:
+        """Swap the value of a live entry, keeping its expiry."""
+        return self.update(key, lambda _: value)
+
+    def update(self, key: Hashable, func: Callable[[Any], Any], ttl: float = None) -> bool:
+        """
+        Replace the value of a live entry with func(value) under its stripe lock, so concurrent updates from
+        any process are not lost; ttl=None keeps its expiry. func returns None to leave the entry as it is.
+        An entry whose new value does not fit is dropped.
+        """
+        key_hash = _key_hash(key)
+        with self._locked(self._stripe_for(key_hash)) as acquired:
+            found = self._find(key, key_hash) if acquired else None
+            if found is None or found[2] <= self._clock():
+                return False
+            slot, _, expires_at, _, value = found
+            value = func(value)
+            if value is None:
+                return False
+            key_data, value_data = self._encode(key, value)
+            if value_data is None:
+                self._clear_slot(slot)
+                return False
+            expires_at = expires_at if ttl is None else self._clock() + ttl
+            self._write_slot(slot, key_hash, self._index_hash(key), expires_at, key_data, value_data)
+            return True
+
+    def keys(self, index: Hashable = None) -> List[Hashable]:
+        """Live keys, or with an index_key and index given, only those with index_key(key) == index."""
+        now = self._clock()
+        index_hash = _key_hash(index) if index is not None and self._index_key is not None else None
+        buf = self._memory.buf
+        keys = []
+        for slot in range(self._buckets * _WAYS):
+            if index_hash is not None and _HEADER.unpack_from(buf, slot * self._slot_size)[2] != index_hash:
+                continue
+            entry = self._read_slot(slot, with_value=False)
+            if entry is None or entry[1] <= now:
+                continue
+            if index_hash is None or self._index_key(entry[2]) == index:
+                keys.append(entry[2])
+        return keys
+
+    def invalidate(self, key: Hashable) -> bool:
+        key_hash = _key_hash(key)
+        with self._locked(self._stripe_for(key_hash)) as acquired:
+            found = self._find(key, key_hash) if acquired else None
+            if found is None:
+                return False
+            self._clear_slot(found[0])
+            return True
+
+    def clear(self):
+        for stripe in range(len(self._locks)):
+            with self._locked(stripe) as acquired:
+                if acquired:
+                    for slot in self._stripe_slots(stripe):
+                        self._clear_slot(slot)
+
+    def __len__(self):
+        """Live entries, counted from the slot headers without unpickling anything."""
+        now = self._clock()
+        buf = self._memory.buf
+        headers = (_HEADER.unpack_from(buf, slot * self._slot_size) for slot in range(self._buckets * _WAYS))
+        return sum(1 for header in headers if header[1] and header[3] > now)
+
+    def stats(self) -> Dict[str, float]:
+        lookups = self.hits + self.misses
+        return {"entries": len(self), "hits": self.hits, "misses": self.misses, "evictions": self.evictions,
+                "hit_ratio": self.hits / lookups if lookups else 0.0}
+
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def close(self):
+        self._memory.close()
+
+    def unlink(self):
+        """Free the block; call once, from the process that created it, after the workers exit."""
+        self._memory.unlink()
+
+
+class SharedFlightSearchCache(SharedMemoryCache):
+    """FlightSearchCache's get_flights/put_flights over shared memory, for pre-forked workers."""
+
+    def __init__(self, slots: int = 4096, slot_size: int = 16 * 1024, default_ttl: float = 300.0,
+                 provider_ttls: Optional[Dict[str, float]] = None, **kwargs):
+        super().__init__(slots, slot_size, default_ttl, **kwargs)
+        self._provider_ttls = dict(provider_ttls or {})
+
+    def set_provider_ttl(self, provider_name: str, ttl: float):
+        self._provider_ttls[provider_name] = ttl
+
+    def get_provider_ttl(self, provider_name: str) -> float:
+        return self._provider_ttls.get(provider_name, self._default_ttl)
+
+    def get_flights(self, provider_name: str, *search_args) -> Any:
+        return self.get(make_flight_query_key(provider_name, *search_args))
+
+    def put_flights(self, provider_name: str, flights: list, *search_args):
+        self.put(make_flight_query_key(provider_name, *search_args), flights, self.get_provider_ttl(provider_name))
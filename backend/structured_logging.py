@@ -0,0 +1,128 @@
+import atexit
+import contextvars
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Optional, TextIO
+
+REQUEST_ID = contextvars.ContextVar("request_id", default=None)
+SAGA_ID = contextvars.ContextVar("saga_id", default=None)
+
+TEXT_FORMAT = "%(levelname)s:%(name)s: %(message)s"
+
+_handler: Optional["DeferredQueueHandler"] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+@contextmanager
+def log_context(request_id: str = None, saga_id: str = None):
+    """Tags the records logged in this context with the given ids; pass copy_context().run to other threads."""
+    tokens = []
+    if request_id is not None:
+        tokens.append((REQUEST_ID, REQUEST_ID.set(request_id)))
+    if saga_id is not None:
+        tokens.append((SAGA_ID, SAGA_ID.set(saga_id)))
+    try:
+        yield
+    finally:
+        for variable, token in reversed(tokens):
+            variable.reset(token)
+
+
+class ContextFilter(logging.Filter):
+    """Copies the request and saga ids of the logging thread's context onto the record."""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = REQUEST_ID.get()
+        record.saga_id = SAGA_ID.get()
+        return True
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on the queue and leaves the formatting (JSON, timestamps) and I/O to the listener thread.
+    msg % args is applied here, because args may be mutable objects the caller changes before the
+    listener gets to the record. Exceptions are rendered here too, since the traceback frames may be gone
+    by then.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with request_id, saga_id and exception only when set."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName,
+        }
+        for field in ("request_id", "saga_id"):
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str)
+
+
+def configure_logging(level: int = logging.INFO, json_format: bool = True, stream: TextIO = None):
+    """
+    Routes every logger through one queue to a background thread that writes to stream (stderr by default).
+
+    Replaces the root handlers, so call it once from an entry point rather than at import. Forked children
+    get a fresh queue and writer thread automatically. Pending records are flushed at exit.
+    """
+    global _handler, _listener
+    shutdown_logging()
+
+    output = logging.StreamHandler(stream or sys.stderr)
+    output.setFormatter(JsonFormatter() if json_format else logging.Formatter(TEXT_FORMAT))
+
+    _handler = DeferredQueueHandler(queue.SimpleQueue())
+    _handler.addFilter(ContextFilter())
+    _listener = logging.handlers.QueueListener(_handler.queue, output)
+    _listener.start()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(_handler)
+    root.setLevel(level)
+
+
+def shutdown_logging():
+    """Writes out the records still queued and stops the writer thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def _restart_in_child():
+    # The writer thread does not survive fork(); records queued before it belong to the parent.
+    global _listener
+    if _listener is not None:
+        _handler.queue = queue.SimpleQueue()
+        _listener = logging.handlers.QueueListener(_handler.queue, *_listener.handlers)
+        _listener.start()
+
+
+atexit.register(shutdown_logging)
+os.register_at_fork(after_in_child=_restart_in_child)
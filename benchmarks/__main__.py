@@ -0,0 +1,44 @@
+import argparse
+import sys
+
+from benchmarks import scenarios  # registers the scenarios
+from benchmarks.runner import SCENARIOS, run, format_result, compare, save_baseline, load_baseline
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks",
+                                     description="Benchmarks for the search, booking and auth hot paths.")
+    parser.add_argument("-k", "--filter", default="", help="only run scenarios whose name contains this text")
+    parser.add_argument("--quick", action="store_true", help="run the small parameter set of every scenario")
+    parser.add_argument("--repeat", type=int, help="override the number of timed runs per scenario")
+    parser.add_argument("--list", action="store_true", help="list scenarios and exit")
+    parser.add_argument("--save-baseline", metavar="PATH", help="write the results as a baseline JSON file")
+    parser.add_argument("--compare", metavar="PATH", help="compare against a baseline JSON file")
+    parser.add_argument("--threshold", type=float, default=0.10,
+                        help="p50 slowdown counted as a regression when comparing (default 0.10)")
+    args = parser.parse_args(argv)
+
+    selected = [bench for bench in SCENARIOS if args.filter in bench.name]
+    if args.list:
+        for bench in selected:
+            print(f"{bench.name}: {bench.params}")
+        return 0
+
+    baseline = load_baseline(args.compare) if args.compare else None
+    results = run(selected, quick=args.quick, repeat=args.repeat,
+                  on_result=lambda result: print(format_result(result, baseline, args.threshold), flush=True))
+
+    if args.save_baseline:
+        save_baseline(results, args.save_baseline)
+        print(f"Baseline saved to {args.save_baseline}")
+
+    if baseline is not None:
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regressions: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,69 @@
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+# What the CLI and the service import before serving their first request.
+DEFAULT_MODULES = ["driver", "frontend.customer_frontend_mgr"]
+DEFAULT_BUDGET_MS = 120.0
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure(module: str) -> Tuple[float, Dict[str, float]]:
+    """
+    Imports module in a fresh interpreter under -X importtime and returns its cumulative import time and
+    the self time of every module it pulled in, in milliseconds.
+    """
+    completed = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"], cwd=REPO_ROOT,
+                               capture_output=True, text=True, check=True)
+    total, self_times = 0.0, {}
+    for line in completed.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        self_times[name.strip()] = int(self_us) / 1000
+        if name.strip() == module:
+            total = int(cumulative_us) / 1000
+    return total, self_times
+
+
+def report(module: str, runs: int, top: int) -> Tuple[float, List[str]]:
+    """Median cumulative time of module over runs, and the lines of its report."""
+    measure(module)  # Compiles stale .pyc files so they are not counted.
+    samples = [measure(module) for _ in range(runs)]
+    total = statistics.median(sample[0] for sample in samples)
+    self_times = {name: statistics.median(sample[1].get(name, 0.0) for sample in samples) for name in samples[0][1]}
+    lines = [f"{module}: {total:.1f} ms (median of {runs})"]
+    for name, self_time in sorted(self_times.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"    {self_time:8.1f} ms  {name}")
+    return total, lines
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.import_budget",
+                                     description="Import time of the entry points, with the slowest modules.")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES, help="modules to import (default: %(default)s)")
+    parser.add_argument("--budget-ms", type=float, default=DEFAULT_BUDGET_MS,
+                        help="exit status 1 if a module takes longer than this to import (default %(default)s)")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per module (default %(default)s)")
+    parser.add_argument("--top", type=int, default=10, help="slowest modules to list by self time")
+    args = parser.parse_args(argv)
+
+    over_budget = []
+    for module in args.modules:
+        total, lines = report(module, max(1, args.runs), args.top)
+        print("\n".join(lines), flush=True)
+        if total > args.budget_ms:
+            over_budget.append(f"{module} ({total:.1f} ms)")
+
+    if over_budget:
+        print(f"Over the {args.budget_ms:g} ms budget: {', '.join(over_budget)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
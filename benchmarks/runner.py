@@ -0,0 +1,156 @@
+import gc
+import json
+import platform
+import time
+from typing import Callable, Dict, List, Optional
+
+
+class Scenario:
+    """
+    One benchmark, run once per parameter value.
+
+    setup(param) prepares everything that should not be timed and returns (operation, ops_per_call):
+    operation() is timed repeatedly and ops_per_call is how many logical operations one call performs,
+    so that ops/s means rows/s for the construction benchmarks and searches/s for the search ones.
+    If operation has a close() attribute it is called after the run.
+    """
+
+    def __init__(self, name: str, params: list, setup: Callable, repeat: int = 20, quick_params: list = None):
+        self.name = name
+        self.params = params
+        self.quick_params = quick_params if quick_params is not None else params[:2]
+        self.setup = setup
+        self.repeat = repeat
+
+
+SCENARIOS: List[Scenario] = []
+
+
+def scenario(name: str, params: list, repeat: int = 20, quick_params: list = None):
+    """Register the decorated setup function as a benchmark scenario."""
+    def register(setup: Callable):
+        SCENARIOS.append(Scenario(name, params, setup, repeat, quick_params))
+        return setup
+    return register
+
+
+def percentile(ordered: List[float], fraction: float) -> float:
+    """Linear-interpolated percentile of already sorted samples."""
+    if not ordered:
+        return 0.0
+    position = (len(ordered) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (position - lower)
+
+
+class BenchmarkResult:
+    def __init__(self, name: str, param, samples: List[float], ops_per_call: int):
+        self.name = name
+        self.param = param
+        self.samples = samples
+        self.ops_per_call = ops_per_call
+
+    @property
+    def key(self) -> str:
+        label = "-".join(str(part) for part in self.param) if isinstance(self.param, tuple) else self.param
+        return f"{self.name}[{label}]"
+
+    def stats(self) -> Dict[str, float]:
+        ordered = sorted(self.samples)
+        total = sum(ordered)
+        return {
+            "p50": percentile(ordered, 0.50),
+            "p95": percentile(ordered, 0.95),
+            "p99": percentile(ordered, 0.99),
+            "mean": total / len(ordered),
+            "ops_per_sec": self.ops_per_call * len(ordered) / total if total > 0 else float("inf"),
+            "samples": len(ordered),
+        }
+
+
+def run_scenario(bench: Scenario, param, repeat: int = None, warmup: int = 1) -> BenchmarkResult:
+    operation, ops_per_call = bench.setup(param)
+    repeat = repeat or bench.repeat
+    try:
+        for _ in range(warmup):
+            operation()
+
+        samples = []
+        gc_was_enabled = gc.isenabled()
+        gc.collect()
+        gc.disable()
+        try:
+            for _ in range(repeat):
+                start = time.perf_counter()
+                operation()
+                samples.append(time.perf_counter() - start)
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+    finally:
+        close = getattr(operation, "close", None)
+        if close is not None:
+            close()
+    return BenchmarkResult(bench.name, param, samples, ops_per_call)
+
+
+def run(scenarios: List[Scenario], quick: bool = False, repeat: int = None,
+        on_result: Callable[[BenchmarkResult], None] = None) -> List[BenchmarkResult]:
+    results = []
+    for bench in scenarios:
+        for param in (bench.quick_params if quick else bench.params):
+            result = run_scenario(bench, param, repeat)
+            results.append(result)
+            if on_result is not None:
+                on_result(result)
+    return results
+
+
+def _format_seconds(seconds: float) -> str:
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 1e-3:
+        return f"{seconds * 1e3:.2f}ms"
+    return f"{seconds * 1e6:.1f}us"
+
+
+def format_result(result: BenchmarkResult, baseline: Optional[dict] = None, threshold: float = 0.10) -> str:
+    stats = result.stats()
+    line = (f"{result.key:<48} p50 {_format_seconds(stats['p50']):>9}  p95 {_format_seconds(stats['p95']):>9}  "
+            f"p99 {_format_seconds(stats['p99']):>9}  {stats['ops_per_sec']:>14,.1f} ops/s")
+    if baseline is None:
+        return line
+
+    previous = baseline.get("results", {}).get(result.key)
+    if previous is None:
+        return f"{line}  (new)"
+    change = (stats["p50"] - previous["p50"]) / previous["p50"] if previous["p50"] else 0.0
+    verdict = "regressed" if change > threshold else "improved" if change < -threshold else "unchanged"
+    return f"{line}  p50 {change:+.1%} {verdict}"
+
+
+def compare(results: List[BenchmarkResult], baseline: dict, threshold: float = 0.10) -> List[str]:
+    """Keys whose p50 got slower than the baseline by more than threshold."""
+    regressions = []
+    for result in results:
+        previous = baseline.get("results", {}).get(result.key)
+        if previous and previous["p50"] and (result.stats()["p50"] - previous["p50"]) / previous["p50"] > threshold:
+            regressions.append(result.key)
+    return regressions
+
+
+def save_baseline(results: List[BenchmarkResult], path: str):
+    baseline = {
+        "created_at": time.time(),
+        "python": platform.python_version(),
+        "machine": platform.platform(),
+        "results": {result.key: result.stats() for result in results},
+    }
+    with open(path, "w") as baseline_file:
+        json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+
+
+def load_baseline(path: str) -> dict:
+    with open(path) as baseline_file:
+        return json.load(baseline_file)
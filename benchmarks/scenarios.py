@@ -0,0 +1,248 @@
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+import bcrypt
+
+from backend.customer_backend_mgr import (FlightOnlineAPIInterface, HotelOnlineAPIInterface, Flight, Room,
+                                          FlightSearchManager, RoomSearchManager, FlightReservation, HotelReservation,
+                                          Itinerary, ItineraryCollectionManager, SingleItineraryManager,
+                                          PaymentManager, RefundablePaymentMethodInterface, CustomerAccount,
+                                          PasswordAuthenticator)
+from backend.itinerary_store import ItineraryStore
+from benchmarks.runner import scenario
+
+# Simulated round trip of one provider call; small enough to keep the suite short, large enough that
+# running providers one after another shows up next to running them concurrently.
+PROVIDER_LATENCY = 0.002
+RESULTS_PER_PROVIDER = 20
+
+DATE_FROM = datetime(2030, 1, 10)
+DATE_TO = datetime(2030, 1, 14)
+
+
+class BenchFlightAPI(FlightOnlineAPIInterface):
+    def __init__(self, name: str, latency: float = PROVIDER_LATENCY, results: int = RESULTS_PER_PROVIDER):
+        self._name = name
+        self._latency = latency
+        self._flights = [Flight(None, name, "cairo", DATE_FROM, "paris", DATE_TO, 0, 0, 1, 100.0 + i)
+                         for i in range(results)]
+
+    def fetch_flights(self, date_from: datetime, from_location: str, date_to: datetime, to_location: str,
+                      num_infants: int, num_children: int, num_adults: int) -> List[Flight]:
+        time.sleep(self._latency)
+        return self._flights
+
+    def book_flight(self, flight, customer_info: list, idempotency_key: str = None) -> str:
+        time.sleep(self._latency)
+        return f"{self._name}-confirmation"
+
+    def cancel_flight(self, confirmation_id: str) -> bool:
+        return True
+
+    def get_company_name(self) -> str:
+        return self._name
+
+
+class BenchHotelAPI(HotelOnlineAPIInterface):
+    def __init__(self, name: str, latency: float = PROVIDER_LATENCY, results: int = RESULTS_PER_PROVIDER):
+        self._name = name
+        self._latency = latency
+        self._rooms = [Room(None, name, "Double", 10, 1, 80.0 + i, DATE_FROM, DATE_TO, "paris", 0, 1)
+                       for i in range(results)]
+
+    def fetch_rooms(self, location: str, from_date: datetime, to_date: datetime, adults: int, children: int,
+                    needed_rooms: int) -> List[Room]:
+        time.sleep(self._latency)
+        return self._rooms
+
+    def book_room(self, room, customer_info: list, idempotency_key: str = None) -> str:
+        time.sleep(self._latency)
+        return f"{self._name}-confirmation"
+
+    def cancel_room(self, confirmation_id: str) -> bool:
+        return True
+
+    def get_hotel_name(self) -> str:
+        return self._name
+
+
+class BenchPaymentMethod(RefundablePaymentMethodInterface):
+    def pay(self, amount, idempotency_key=None):
+        time.sleep(PROVIDER_LATENCY)
+        return True, "bench-transaction"
+
+    def refund(self, transaction_id, amount=None):
+        return True
+
+
+def _closing(operation, *resources):
+    operation.close = lambda: [resource.close() for resource in resources]
+    return operation
+
+
+####################################################  search fan-out  #################################################
+
+def _search_params() -> List[tuple]:
+    return [(providers, mode) for providers in (2, 5, 10, 25, 50) for mode in ("sequential", "concurrent")]
+
+
+@scenario("search.flights", _search_params(), quick_params=[(2, "sequential"), (10, "concurrent")])
+def flight_search(param):
+    providers, mode = param
+    apis = [BenchFlightAPI(f"airline-{i}") for i in range(providers)]
+    manager = FlightSearchManager(apis, max_workers=providers if mode == "concurrent" else None)
+
+    def search():
+        manager.search_flights(DATE_FROM, "cairo", DATE_TO, "paris", 0, 0, 1)
+
+    return _closing(search, manager), 1
+
+
+@scenario("search.rooms", _search_params(), quick_params=[(2, "sequential"), (10, "concurrent")])
+def room_search(param):
+    providers, mode = param
+    apis = [BenchHotelAPI(f"hotel-{i}") for i in range(providers)]
+    manager = RoomSearchManager(apis, max_workers=providers if mode == "concurrent" else None)
+
+    def search():
+        manager.search_rooms("paris", DATE_FROM, DATE_TO, 1, 0, 1)
+
+    return _closing(search, manager), 1
+
+
+####################################################  booking saga  ###################################################
+
+@scenario("booking.book_all_reservations",
+          [(reservations, mode) for reservations in (1, 5, 10, 20) for mode in ("sequential", "concurrent")],
+          quick_params=[(1, "sequential"), (5, "concurrent")])
+def book_all_reservations(param):
+    reservations, mode = param
+    flight_api = BenchFlightAPI("airline")
+    hotel_api = BenchHotelAPI("hotel")
+    flight = flight_api.fetch_flights(DATE_FROM, "cairo", DATE_TO, "paris", 0, 0, 1)[0]
+    room = hotel_api.fetch_rooms("paris", DATE_FROM, DATE_TO, 1, 0, 1)[0]
+    payment_mgr = PaymentManager()
+    payment_mgr.set_payment_method(BenchPaymentMethod())
+
+    def book():
+        itinerary = Itinerary()
+        for i in range(reservations):
+            if i % 2:
+                itinerary.add_reservation(HotelReservation("bench", hotel_api, room, []))
+            else:
+                itinerary.add_reservation(FlightReservation("bench", flight_api, flight, []))
+        itinerary_mgr = SingleItineraryManager(itinerary, payment_mgr,
+                                               max_workers=8 if mode == "concurrent" else None)
+        if not itinerary_mgr.book_all_reservations():
+            raise RuntimeError("Benchmark booking failed.")
+
+    return book, 1
+
+
+##################################################  result construction  ##############################################
+
+@scenario("construct.flights", [10_000, 100_000, 1_000_000], repeat=5, quick_params=[10_000])
+def construct_flights(rows):
+    def construct():
+        [Flight(None, "airline", "cairo", DATE_FROM, "paris", DATE_TO, 0, 0, 1, 100.0 + i) for i in range(rows)]
+
+    return construct, rows
+
+
+@scenario("construct.rooms", [10_000, 100_000, 1_000_000], repeat=5, quick_params=[10_000])
+def construct_rooms(rows):
+    def construct():
+        [Room(None, "hotel", "Double", 10, 1, 80.0 + i, DATE_FROM, DATE_TO, "paris", 0, 1) for i in range(rows)]
+
+    return construct, rows
+
+
+####################################################  authentication  #################################################
+
+# bcrypt cost factors; 12 is what CustomerAccount uses.
+@scenario("auth.password_login", [4, 8, 12], repeat=10, quick_params=[4])
+def password_login(rounds):
+    account = CustomerAccount.from_password_hash("1", "user", bcrypt.hashpw(b"secret", bcrypt.gensalt(rounds)))
+    authenticator = PasswordAuthenticator()
+
+    def login():
+        if not authenticator.login("user", "secret", account):
+            raise RuntimeError("Benchmark login failed.")
+
+    return login, 1
+
+
+#####################################################  itineraries  ###################################################
+
+def _itinerary(i: int, flight_api: BenchFlightAPI, hotel_api: BenchHotelAPI, flight: Flight, room: Room):
+    itinerary = Itinerary()
+    itinerary.add_reservation(FlightReservation("bench", flight_api, flight, []))
+    if i % 2:
+        itinerary.add_reservation(HotelReservation("bench", hotel_api, room, []))
+    return itinerary
+
+
+def _filled_manager(size: int, backend: str) -> ItineraryCollectionManager:
+    flight_api = BenchFlightAPI("airline", latency=0)
+    hotel_api = BenchHotelAPI("hotel", latency=0)
+    flights = flight_api.fetch_flights(DATE_FROM, "cairo", DATE_TO, "paris", 0, 0, 1)
+    room = hotel_api.fetch_rooms("paris", DATE_FROM, DATE_TO, 1, 0, 1)[0]
+    store = ItineraryStore() if backend == "store" else None
+    manager = ItineraryCollectionManager("bench", store)
+    for i in range(size):
+        flight = Flight(None, "airline", "cairo", DATE_FROM + timedelta(days=i % 365), "paris",
+                        DATE_TO + timedelta(days=i % 365), 0, 0, 1, flights[i % len(flights)].cost + i % 97)
+        manager.add_itinerary(_itinerary(i, flight_api, hotel_api, flight, room))
+    return manager, store
+
+
+def _itinerary_params() -> List[tuple]:
+    return [(size, backend) for size in (1_000, 10_000, 100_000) for backend in ("memory", "store")]
+
+
+@scenario("itineraries.add", _itinerary_params(), repeat=3, quick_params=[(1_000, "memory"), (1_000, "store")])
+def itineraries_add(param):
+    size, backend = param
+
+    def add():
+        manager, store = _filled_manager(size, backend)
+        manager.count()
+        if store is not None:
+            store.close()
+
+    return add, size
+
+
+@scenario("itineraries.first_page", _itinerary_params(), quick_params=[(1_000, "memory"), (1_000, "store")])
+def itineraries_first_page(param):
+    size, backend = param
+    manager, store = _filled_manager(size, backend)
+
+    def first_page():
+        manager.get_page(limit=20)
+
+    return _closing(first_page, store) if store is not None else first_page, 1
+
+
+@scenario("itineraries.find_by_total_cost", _itinerary_params(),
+          quick_params=[(1_000, "memory"), (1_000, "store")])
+def itineraries_find_by_total_cost(param):
+    size, backend = param
+    manager, store = _filled_manager(size, backend)
+
+    def find():
+        manager.find_by_total_cost(150.0, 155.0, limit=20)
+
+    return _closing(find, store) if store is not None else find, 1
+
+
+@scenario("itineraries.find_upcoming", _itinerary_params(), quick_params=[(1_000, "memory"), (1_000, "store")])
+def itineraries_find_upcoming(param):
+    size, backend = param
+    manager, store = _filled_manager(size, backend)
+
+    def find():
+        manager.find_by_travel_date(DATE_FROM + timedelta(days=180), limit=20)
+
+    return _closing(find, store) if store is not None else find, 1
@@ -0,0 +1 @@
+# Makes the repository root importable (backend, frontend, benchmarks) when running pytest from here.
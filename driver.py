@@ -1,9 +1,143 @@
-
+# Interactive CLI by default. With --serve, pre-forks worker processes running the HTTP service:
+#
+#   python driver.py --serve --workers 4 --port 8080
+#
+# The parent binds the listening socket and creates the shared-memory search caches before forking, so
+# every worker accepts on the same socket and reads the searches any other worker cached. Each worker
+# opens its own database connections, journal handle and thread pools after the fork.
+#
+# asyncio, multiprocessing and the HTTP service are imported only by --serve, so the CLI starts without them.
+import argparse
+import os
+import secrets
+import signal
+import socket
+from typing import TYPE_CHECKING
 
 from frontend.customer_frontend_mgr import *
+from backend.session_tokens import SESSION_SECRET_ENV
+from backend.structured_logging import configure_logging, shutdown_logging
+
+if TYPE_CHECKING:
+    from backend.shared_cache import SharedMemoryCache, SharedFlightSearchCache
+
+
+def _worker(sock: socket.socket, flight_cache: "SharedFlightSearchCache", room_store: "SharedMemoryCache",
+            search_results: "SharedMemoryCache") -> int:
+    import asyncio
+    from backend import metrics
+    from frontend.http_service import ExpediaHttpService
+
+    # Each worker serves only its own counters on /metrics; the label tells a scraper which worker it reached.
+    metrics.REGISTRY.set_constant_labels(worker_pid=os.getpid())
+    signal.signal(signal.SIGTERM, signal.default_int_handler)
+    signal.signal(signal.SIGINT, signal.default_int_handler)
+    front_end = FrontEndManager(flight_search_cache=flight_cache,
+                                hotel_availability_cache=HotelAvailabilityCache(fresh_ttl=60.0, stale_ttl=240.0,
+                                                                                store=room_store))
+    service = ExpediaHttpService(front_end, search_results=search_results)
+    try:
+        asyncio.run(service.serve(sock=sock))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        signal.signal(signal.SIGTERM, signal.SIG_IGN)
+        signal.signal(signal.SIGINT, signal.SIG_IGN)
+        service.close()
+        front_end.close()
+    return 0
+
+
+def _fork(target, *args) -> int:
+    pid = os.fork()
+    if pid == 0:
+        code = 1
+        try:
+            code = target(*args)
+        except BaseException:
+            logger.exception("Process %d crashed.", os.getpid())
+        finally:
+            shutdown_logging()  # os._exit skips atexit, which would flush the queued records
+            os._exit(code)
+    return pid
+
+
+def _prepare() -> int:
+    front_end = FrontEndManager()
+    try:
+        front_end.prepare()
+    finally:
+        front_end.close()
+    return 0
+
+
+def serve_prefork(host: str, port: int, workers: int):
+    from backend.shared_cache import SharedMemoryCache, SharedFlightSearchCache
+    from backend.search_cache import room_index_key
+
+    # Workers must share the token secret, or a token issued by one worker is rejected by the others.
+    os.environ.setdefault(SESSION_SECRET_ENV, secrets.token_hex(32))
+    # Seeding and saga recovery run once, in a child, so the parent forks workers with no connections or threads.
+    _, status = os.waitpid(_fork(_prepare), 0)
+    if os.waitstatus_to_exitcode(status) != 0:
+        raise SystemExit("Startup recovery failed.")
+
+    sock = socket.create_server((host, port), backlog=1024)
+    sock.setblocking(False)
+    flight_cache = SharedFlightSearchCache(slots=4096, slot_size=16 * 1024, default_ttl=300.0)
+    room_store = SharedMemoryCache(slots=4096, slot_size=16 * 1024, index_key=room_index_key)
+    search_results = SharedMemoryCache(slots=65536, slot_size=2 * 1024, default_ttl=900.0)
+    worker_args = (sock, flight_cache, room_store, search_results)
+
+    children = {}
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            os.kill(pid, signal.SIGTERM)
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    for index in range(workers):
+        children[_fork(_worker, *worker_args)] = index
+    logger.info("Serving on %s with %d workers.", sock.getsockname(), workers)
+    try:
+        while children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            index = children.pop(pid, None)
+            if index is not None and not stopping:
+                logger.error("Worker %d exited with %d; restarting it.", pid, os.waitstatus_to_exitcode(status))
+                children[_fork(_worker, *worker_args)] = index
+    finally:
+        sock.close()
+        for cache in (flight_cache, room_store, search_results):
+            cache.close()
+            cache.unlink()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python driver.py", description="Expedia reservation system.")
+    parser.add_argument("--serve", action="store_true", help="run the HTTP service instead of the interactive CLI")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes for --serve")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    # JSON records for the service; plain text for the CLI, where log messages are read by a person.
+    configure_logging(json_format=args.serve)
+    if args.serve:
+        serve_prefork(args.host, args.port, max(1, args.workers))
+    else:
+        FrontEndManager().run()
+
+
 if __name__ == "__main__":
-    front_mgr = FrontEndManager()
-    front_mgr.run()
+    main()
 
 
 # from abc import ABC, abstractmethod
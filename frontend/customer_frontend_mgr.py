@@ -1,30 +1,94 @@
 
 from backend.customer_backend_mgr import *
-from backend.exceptions import InvalidInputError
+from backend.exceptions import InvalidInputError, StorageError
+from backend.provider_registry import ProviderRegistry
+from backend.account_repository import CustomerAccountRepository
+from backend.itinerary_store import ItineraryStore
+from backend.booking_journal import SagaRecovery, SagaState
+from backend.resilience import ResilientFlightOnlineAPI, ResilientHotelOnlineAPI, HedgedCaller
+from backend.instrumentation import InstrumentedPaymentMethod
 from backend.api.payment.paypal_external import PayPalCreditCard
 from backend.api.payment.stripe_external import StripeCardInfo, StripeUserInfo
 
-logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
 class FrontEndManager:
-    def __init__(self):
+    def __init__(self, accounts_db_path: str = "expedia.sqlite3", journal_path: str = "bookings.journal",
+                 flight_search_cache: FlightSearchCache = None,
+                 hotel_availability_cache: HotelAvailabilityCache = None):
         self.customer = None
+        self.booking_journal = BookingJournal(journal_path)
+        self.itinerary_store = ItineraryStore(accounts_db_path)
+        self.account_repository = CustomerAccountRepository(accounts_db_path, itinerary_store=self.itinerary_store)
+        self.flight_search_cache = flight_search_cache or FlightSearchCache(max_entries=512, default_ttl=300.0)
+        self.hotel_availability_cache = hotel_availability_cache or HotelAvailabilityCache(
+            max_entries=512, fresh_ttl=60.0, stale_ttl=240.0)
+        metrics.register_cache("flight_search", self.flight_search_cache)
+        metrics.register_cache("hotel_availability", self.hotel_availability_cache)
+        self.provider_registry = ProviderRegistry.with_default_providers(max_size=4)
+        self.flight_apis = [ResilientFlightOnlineAPI(api, hedger=HedgedCaller(api.get_company_name()))
+                            for api in self.provider_registry.flight_apis()]
+        self.hotel_apis = [ResilientHotelOnlineAPI(api, hedger=HedgedCaller(api.get_hotel_name()))
+                           for api in self.provider_registry.hotel_apis()]
+        self.payment_idempotency_store = IdempotencyStore()
+        self.session_token_signer = SessionTokenSigner(ttl_seconds=1800)
+        self.session_token = None
 
     def run(self):
-        self.customer = CustomerAccount('1304', 'user', '1234')
+        self.prepare()
+        print("\nWelcome to the Flight Reservation System!")
+
+        self.base_ui()
+
+
+    def prepare(self):
+        if not self.account_repository.exists('user'):
+            self.account_repository.add(CustomerAccount('1304', 'user', '1234'))
+        self.recover_interrupted_bookings()
+
+
+    @staticmethod
+    def default_payment_methods():
         paypal_creditcard = PayPalCreditCard("user", "gaza", "23232", "20-02", "###")
         paypal_method = PayPalPayment(paypal_creditcard)
         stripe_user_info = StripeUserInfo('user', 'gaza')
         stripe_card_info = StripeCardInfo('32434', '30-03')
         stripe_method = StripePayment(stripe_card_info, stripe_user_info)
+        return [InstrumentedPaymentMethod(paypal_method), InstrumentedPaymentMethod(stripe_method)]
 
-        self.customer.payment_methods_manager.add_payment_method(paypal_method)
-        self.customer.payment_methods_manager.add_payment_method(stripe_method)
-        print("\nWelcome to the Flight Reservation System!")
 
-        self.base_ui()
+    def add_default_payment_methods(self):
+        for payment_method in self.default_payment_methods():
+            self.customer.payment_methods_manager.add_payment_method(payment_method)
+
+
+    def recover_interrupted_bookings(self):
+        recovery = SagaRecovery(self.booking_journal, self.cancel_recovered_booking, self.refund_recovered_payment,
+                                self.store_recovered_itinerary)
+        recovery.run()
+
+
+    def cancel_recovered_booking(self, booked_entry: dict):
+        if booked_entry["type"] == FlightReservation.reservation_type:
+            return self.provider_registry.flight_api(booked_entry["provider"]).cancel_flight(booked_entry["confirmation_id"])
+        return self.provider_registry.hotel_api(booked_entry["provider"]).cancel_room(booked_entry["confirmation_id"])
+
+
+    def refund_recovered_payment(self, paid_entry: dict):
+        payment_mgr = PaymentManager()
+        for payment_method in self.default_payment_methods():
+            if payment_method_name(payment_method) == paid_entry["payment_method"]:
+                payment_mgr.set_payment_method(payment_method)
+                return payment_mgr.process_refund(paid_entry["transaction_id"])
+        return False
+
+
+    def store_recovered_itinerary(self, saga: SagaState):
+        reservations = [ReservationRecord(*reservation["record"]) for reservation in saga.reservations.values()]
+        total_cost = sum(reservation.get_cost() for reservation in reservations)
+        self.itinerary_store.append(ItineraryRecord(None, saga.customer_id, total_cost, reservations,
+                                                    saga.saga_id)).result()
 
 
     def base_ui(self):
@@ -36,31 +100,52 @@ class FrontEndManager:
                 self.login()
             elif choice == 2:
                 # self.signup()  # Currently not implemented
-                logger.info("\nNot supported yet.")
+                logger.info("Not supported yet.")
             elif choice == 3:
-                logger.info("\nExiting system.")
+                logger.info("Exiting system.")
+                self.close()
                 exit()
 
 
+    def close(self):
+        for api in self.flight_apis + self.hotel_apis:
+            if api.hedger is not None:
+                api.hedger.close()
+        self.itinerary_store.close()
+        self.account_repository.close()
+        self.booking_journal.close()
+        self.hotel_availability_cache.close()
+
+
     def login(self):
         """Login Interface"""
         username = input("Enter Username: ")
         password = input("Enter Password: ")
         pass_auth: PasswordAuthenticator = PasswordAuthenticator()
-        customer_account_mgr: CustomerLoginManager = CustomerLoginManager(pass_auth)
+        customer_account_mgr: CustomerLoginManager = CustomerLoginManager(pass_auth, self.session_token_signer,
+                                                                          self.account_repository)
         try:
-            if not customer_account_mgr.authenticate_customer(username, password, self.customer):
-                raise LoginError("\nLogin failed")
+            self.session_token = customer_account_mgr.login(username, password)
+            self.customer = customer_account_mgr.resolve_account(username)
+            if not self.customer.payment_methods_manager.get_payment_methods():
+                self.add_default_payment_methods()
 
-            logger.info("\nlogged successfully")
-            self.customer_processing_page()
+            logger.info("logged successfully")
+            self.customer_processing_page(customer_account_mgr)
         except LoginError as e:
-            logger.error(f"\nLogin failed for user {username}: {e}")
+            logger.error("Login failed for user %s: %s", username, e)
 
 
-    def customer_processing_page(self):
+    def customer_processing_page(self, customer_account_mgr: CustomerLoginManager):
         """Customer-specific operations once logged in"""
         while True:
+            try:
+                customer_account_mgr.validate_session(self.session_token)
+            except SessionError as e:
+                logger.error("%s", e)
+                self.session_token = None
+                break
+
             choice = self.get_user_choice(f"\nWelcome {self.customer.get_username().capitalize()} | Customer:\n"
                                           "1) View Profile \n2) Make itinerary\n3) List my itineraries\n4) Logout\nEnter your choice (from 1 to 4): ",
                                           4)
@@ -71,8 +156,9 @@ class FrontEndManager:
             elif choice == 3:
                 self.list_itineraries()
             elif choice == 4:
-                logger.info("\nLogging out...")
+                logger.info("Logging out...")
                 self.customer = None
+                self.session_token = None
                 break
 
 
@@ -84,23 +170,38 @@ class FrontEndManager:
     def create_itinerary(self):
         itinerary = Itinerary()
         payment_mgr = PaymentManager()
-        itinerary_mgr: SingleItineraryManager = SingleItineraryManager(itinerary, payment_mgr)
+        itinerary_mgr: SingleItineraryManager = SingleItineraryManager(itinerary, payment_mgr, max_workers=4,
+                                                                        batch_payment=True,
+                                                                        retry_policy=RetryPolicy(),
+                                                                        idempotency_store=self.payment_idempotency_store,
+                                                                        journal=self.booking_journal)
+
+        try:
+            created = self.make_reservations(itinerary_mgr)
+        except StorageError as e:
+            logger.error("%s", e)
+            return
 
-        if self.make_reservations(itinerary_mgr):
-            self.customer.itineraries_manager.add_itinerary(itinerary)
-            logger.info("\nItinerary created.")
+        if created:
+            logger.info("Itinerary created.")
         else:
             del itinerary
-            logger.info("\nItinerary canceled.")
+            logger.info("Itinerary canceled.")
 
 
 
-    def list_itineraries(self):
-        itineraries = self.customer.itineraries_manager.get_itineraries()
-        if len(itineraries) > 0:
-            self.display_itineraries(itineraries)
-        else:
-            logger.info("\nThere are no itineraries to present.")
+    def list_itineraries(self, page_size: int = 10):
+        page = self.customer.itineraries_manager.get_page(limit=page_size)
+        if len(page) == 0:
+            logger.info("There are no itineraries to present.")
+            return
+
+        self.display_itineraries(page)
+        while page.next_cursor is not None:
+            if self.get_user_choice("\n1) Next page\n2) Back\nEnter your choice (from 1 to 2): ", 2) == 2:
+                break
+            page = self.customer.itineraries_manager.get_page(page.next_cursor, page_size)
+            self.display_itineraries(page)
 
 
     def display_itineraries(self, itineraries):
@@ -119,38 +220,56 @@ class FrontEndManager:
                 "\nCreate your itinerary:\n1) Add flight\n2) Add Hotel\n3) Reserve itinerary\n4) Cancel itinerary\nEnter your choice (from 1 to 4): ",
                 4)
             if choice == 1:
-                selected_api, selected_flight = self.select_flight()
+                selection = self.select_flight()
+                if selection is None:
+                    continue
+                selected_api, selected_flight = selection
                 flight_reservation: ReservationInterface = FlightReservation(self.customer.get_customer_id(),
                                                                              selected_api, selected_flight, [])
                 itinerary_mgr.add_reservation(flight_reservation)
                 num_reservations += 1
-                logger.info("\nFlight selected successfully.")
+                logger.info("Flight selected successfully.")
 
             elif choice == 2:
-                selected_api, selected_room = self.select_room()
+                selection = self.select_room()
+                if selection is None:
+                    continue
+                selected_api, selected_room = selection
                 hotel_reservation: ReservationInterface = HotelReservation(self.customer.get_customer_id(),
-                                                                             selected_api, selected_room, [])
+                                                                             selected_api, selected_room, [],
+                                                                             self.hotel_availability_cache)
                 itinerary_mgr.add_reservation(hotel_reservation)
                 num_reservations += 1
-                logger.info("\nHotel selected successfully.")
+                logger.info("Hotel selected successfully.")
 
             elif choice == 3:
                 if num_reservations > 0:
                     payment_method: RefundablePaymentMethodInterface = self.select_payment_method()
                     itinerary_mgr.payment_mgr.set_payment_method(payment_method)
 
-                    if itinerary_mgr.book_all_reservations():
-                        logger.info("\nAll reservations successfully booked.")
+                    if itinerary_mgr.book_all_reservations(self.save_itinerary):
+                        logger.info("All reservations successfully booked.")
                         return True
 
                 else:
-                    logger.info("\nThere is no reservations to book.")
+                    logger.info("There is no reservations to book.")
 
             elif choice == 4:
                 if itinerary_mgr.cancel_all():
                     return False
 
 
+    def save_itinerary(self, itinerary: Itinerary):
+        """Store a booked itinerary and wait until the write is durable."""
+        stored = self.customer.itineraries_manager.add_itinerary(itinerary)
+        try:
+            if stored is not None:
+                stored.result()
+        except Exception as e:
+            raise StorageError(f"Itinerary was booked but could not be saved ({e}); "
+                               f"it will be saved on the next start.") from e
+
+
     def select_payment_method(self):
         print("\nWhich Payment card:")
         payment_methods = self.customer.payment_methods_manager.get_payment_methods()
@@ -168,18 +287,26 @@ class FrontEndManager:
 
     def select_flight(self):
         flight_data = self.get_customer_flight_info()
-        turkish_flight_api: FlightOnlineAPIInterface = TurkishFlightOnlineOnlineAPI()
-        aircanada_flight_api: FlightOnlineAPIInterface = AirCanadaFlightOnlineOnlineAPI()
-        flight_research_mgr = FlightSearchManager([turkish_flight_api, aircanada_flight_api])
-        flight_map = flight_research_mgr.search_flights(
-            flight_data["date_from"], flight_data["from_location"],
-            flight_data["date_to"], flight_data["to_location"],
-            flight_data["num_infants"], flight_data["num_children"],
-            flight_data["num_adults"])
-
+        flight_research_mgr = FlightSearchManager(self.flight_apis,
+                                                  max_workers=2, provider_timeout=10.0,
+                                                  cache=self.flight_search_cache)
+        flight_map = {}
         print("Select a flight:")
-        for idx, (api, flight) in flight_map.items():
-            print(f"{idx}) {flight}")
+        try:
+            for idx, (api, flight) in flight_research_mgr.stream_flights(
+                    flight_data["date_from"], flight_data["from_location"],
+                    flight_data["date_to"], flight_data["to_location"],
+                    flight_data["num_infants"], flight_data["num_children"],
+                    flight_data["num_adults"]):
+                flight_map[idx] = (api, flight)
+                print(f"{idx}) {flight}")
+        finally:
+            flight_research_mgr.close()
+
+        # Every provider may have failed, timed out or had its circuit open.
+        if not flight_map:
+            logger.info("No flights found.")
+            return None
 
         selected_index = self.get_user_choice(f"Enter a number (from 1 to {len(flight_map)}): ", len(flight_map))
         return flight_map[selected_index]
@@ -199,19 +326,25 @@ class FrontEndManager:
 
     def select_room(self):
         room_data = self.get_customer_room_info()
-        hilton_hotel_api: HotelOnlineAPIInterface = HiltonHotelOnlineOnlineAPI()
-        marriott_hotel_api: HotelOnlineAPIInterface = MarriottHotelOnlineOnlineAPI()
-        room_research_mgr = RoomSearchManager([hilton_hotel_api, marriott_hotel_api])
-        room_map = room_research_mgr.search_rooms(room_data["location"],
-                                                    room_data["date_from"],
-                                                    room_data["date_to"],
-                                                    room_data["num_adults"],
-                                                    room_data["num_children"],
-                                                    room_data["num_rooms"]
-                                                    )
+        room_research_mgr = RoomSearchManager(self.hotel_apis, self.hotel_availability_cache,
+                                              max_workers=2, provider_timeout=10.0)
+        room_map = {}
         print("Select a hotel:")
-        for idx, (api, hotel) in room_map.items():
-            print(f"{idx}) {hotel}")
+        try:
+            for idx, (api, hotel) in room_research_mgr.stream_rooms(room_data["location"],
+                                                                     room_data["date_from"],
+                                                                     room_data["date_to"],
+                                                                     room_data["num_adults"],
+                                                                     room_data["num_children"],
+                                                                     room_data["num_rooms"]):
+                room_map[idx] = (api, hotel)
+                print(f"{idx}) {hotel}")
+        finally:
+            room_research_mgr.close()
+
+        if not room_map:
+            logger.info("No rooms found.")
+            return None
 
         selected_index = self.get_user_choice(f"Enter your choice (from 1 to {len(room_map)}): ", len(room_map))
         return room_map[selected_index]
@@ -237,7 +370,7 @@ class FrontEndManager:
                     raise InvalidInputError(f"Invalid input, please enter a number (from 1 to {num_of_choices}).")
                 return choice
             except InvalidInputError as e:
-                logger.error(f"\n{e}")
+                logger.error("%s", e)
 
 
     def get_input_string(self, prompt):
@@ -249,7 +382,7 @@ class FrontEndManager:
             try:
                 return datetime.strptime(input(prompt), "%d-%m-%Y")
             except ValueError:
-                logger.error("\nInvalid date format. Please enter in DD-MM-YYYY format.")
+                logger.error("Invalid date format. Please enter in DD-MM-YYYY format.")
 
 
     def get_input_integer(self, prompt):
@@ -257,7 +390,7 @@ class FrontEndManager:
             try:
                 return int(input(prompt))
             except ValueError:
-                logger.error("\nInvalid input. Please enter a valid number.")
+                logger.error("Invalid input. Please enter a valid number.")
 
 
 
@@ -0,0 +1,372 @@
+import argparse
+import asyncio
+import contextvars
+import json
+import logging
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, Tuple, Union
+from urllib.parse import parse_qsl, urlsplit
+
+from backend.customer_backend_mgr import (CustomerLoginManager, PasswordAuthenticator, FlightSearchManager,
+                                          RoomSearchManager, SingleItineraryManager, Itinerary, FlightReservation,
+                                          HotelReservation, PaymentManager, CustomerAccount)
+from backend.exceptions import InvalidInputError, LoginError, SessionError
+from backend.retry import RetryPolicy
+from backend import metrics
+from backend.structured_logging import REQUEST_ID, configure_logging
+from backend.search_cache import TTLLRUCache
+from frontend.customer_frontend_mgr import FrontEndManager
+
+logger = logging.getLogger(__name__)
+
+MAX_BODY_BYTES = 1024 * 1024
+MAX_PAGE_SIZE = 100
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+class HttpRequest:
+    __slots__ = ("method", "path", "query", "headers", "body")
+
+    def __init__(self, method: str, target: str, headers: Dict[str, str], body: bytes):
+        parts = urlsplit(target)
+        self.method = method
+        self.path = parts.path.rstrip("/") or "/"
+        self.query = dict(parse_qsl(parts.query))
+        self.headers = headers
+        self.body = body
+
+    def json(self) -> dict:
+        try:
+            payload = json.loads(self.body or b"{}")
+        except ValueError:
+            raise HttpError(400, "Request body is not valid JSON.")
+        if not isinstance(payload, dict):
+            raise HttpError(400, "Request body must be a JSON object.")
+        return payload
+
+
+def _date(value: str, name: str) -> datetime:
+    try:
+        return datetime.strptime(value, "%d-%m-%Y")
+    except (TypeError, ValueError):
+        raise InvalidInputError(f"{name} must be a date in DD-MM-YYYY format.")
+
+
+def _integer(value, name: str) -> int:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise InvalidInputError(f"{name} must be an integer.")
+
+
+def _string(payload: dict, name: str) -> str:
+    value = payload.get(name)
+    if not isinstance(value, str) or not value:
+        raise InvalidInputError(f"{name} must be a non-empty string.")
+    return value
+
+
+def _string_list(payload: dict, name: str) -> list:
+    values = payload.get(name, [])
+    if not isinstance(values, list) or not all(isinstance(value, str) for value in values):
+        raise InvalidInputError(f"{name} must be a list of result ids.")
+    return values
+
+
+def _vendor_date(value) -> str:
+    return value.strftime("%d-%m-%Y") if isinstance(value, datetime) else str(value)
+
+
+class ExpediaHttpService:
+    """
+    JSON-over-HTTP front end on asyncio, sharing the CLI's components (accounts, itinerary store, booking
+    journal, providers and caches) through a FrontEndManager.
+
+    The event loop only parses requests and writes responses; password checks, provider searches and
+    bookings block, so they run on a thread pool. Search results are kept for a while under opaque ids,
+    which itinerary requests use to pick the flights and rooms to book.
+
+        POST /login          {"username", "password"}                     -> {"token"}
+        GET  /flights        ?from&to&date_from&date_to&adults[&children&infants]
+        GET  /rooms          ?location&date_from&date_to&adults[&children&rooms]
+        POST /itineraries    {"flights": [id], "rooms": [id], "payment_method": n}   (Bearer token)
+        GET  /itineraries    [?cursor&limit]                                         (Bearer token)
+        GET  /metrics        [?format=json]            -> Prometheus text, or the metrics snapshot as JSON
+                                                          (this worker's only when pre-forked)
+    """
+
+    def __init__(self, front_end: FrontEndManager = None, max_workers: int = 32, result_ttl: float = 900.0,
+                 search_results=None):
+        self.front_end = front_end or FrontEndManager()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="http-service")
+        self.login_mgr = CustomerLoginManager(PasswordAuthenticator(), self.front_end.session_token_signer,
+                                              self.front_end.account_repository)
+        self.flight_search_mgr = FlightSearchManager(self.front_end.flight_apis, max_workers=8, provider_timeout=10.0,
+                                                     cache=self.front_end.flight_search_cache)
+        self.room_search_mgr = RoomSearchManager(self.front_end.hotel_apis, self.front_end.hotel_availability_cache,
+                                                 max_workers=8, provider_timeout=10.0)
+        self.flight_apis = {api.get_company_name(): api for api in self.front_end.flight_apis}
+        self.hotel_apis = {api.get_hotel_name(): api for api in self.front_end.hotel_apis}
+        # (provider name, flight or room) per result id; sized by count, the entries share objects with the
+        # search caches. Pre-forked workers pass a shared store so any worker can book any worker's results.
+        self.result_ttl = result_ttl
+        self.search_results = search_results if search_results is not None else TTLLRUCache(
+            max_entries=200_000, default_ttl=result_ttl, size_of=lambda value: 1)
+        self.routes: Dict[Tuple[str, str], Callable[[HttpRequest], Awaitable[Tuple[int, dict]]]] = {
+            ("POST", "/login"): self.login,
+            ("GET", "/flights"): self.search_flights,
+            ("GET", "/rooms"): self.search_rooms,
+            ("POST", "/itineraries"): self.create_itinerary,
+            ("GET", "/itineraries"): self.list_itineraries,
+            ("GET", "/metrics"): self.metrics,
+        }
+
+    def _run_blocking(self, func: Callable, *args) -> Awaitable:
+        # run_in_executor does not carry context variables over; copy them so logs keep the request id.
+        return asyncio.get_running_loop().run_in_executor(self.executor, contextvars.copy_context().run, func, *args)
+
+    ####################################################  handlers  ###############################################
+
+    async def login(self, request: HttpRequest):
+        payload = request.json()
+        token = await self._run_blocking(self.login_mgr.login, _string(payload, "username"),
+                                         _string(payload, "password"))
+        return 200, {"token": token}
+
+    async def _authenticated_account(self, request: HttpRequest) -> CustomerAccount:
+        scheme, _, token = request.headers.get("authorization", "").partition(" ")
+        if scheme.lower() != "bearer" or not token:
+            raise SessionError("Missing bearer token.")
+        claims = self.login_mgr.validate_session(token)
+        return await self._run_blocking(self.login_mgr.resolve_account, claims.username)
+
+    def _remember_results(self, results: Dict[int, tuple], provider_name: Callable, describe: Callable) -> list:
+        described = []
+        for api, item in results.values():
+            result_id = uuid.uuid4().hex
+            self.search_results.put(result_id, (provider_name(api), item), self.result_ttl)
+            described.append({"id": result_id, **describe(item)})
+        return described
+
+    async def search_flights(self, request: HttpRequest):
+        query = request.query
+        results = await self._run_blocking(
+            self.flight_search_mgr.search_flights,
+            _date(query.get("date_from"), "date_from"), query.get("from", ""),
+            _date(query.get("date_to"), "date_to"), query.get("to", ""),
+            _integer(query.get("infants", 0), "infants"), _integer(query.get("children", 0), "children"),
+            _integer(query.get("adults", 1), "adults"))
+
+        return 200, {"results": self._remember_results(results, lambda api: api.get_company_name(), lambda flight: {
+            "airline": flight.airline_name, "cost": flight.cost, "from": flight.from_loc, "to": flight.to_location,
+            "date_from": _vendor_date(flight.date_from), "date_to": _vendor_date(flight.date_to)})}
+
+    async def search_rooms(self, request: HttpRequest):
+        query = request.query
+        results = await self._run_blocking(
+            self.room_search_mgr.search_rooms, query.get("location", ""),
+            _date(query.get("date_from"), "date_from"), _date(query.get("date_to"), "date_to"),
+            _integer(query.get("adults", 1), "adults"), _integer(query.get("children", 0), "children"),
+            _integer(query.get("rooms", 1), "rooms"))
+
+        return 200, {"results": self._remember_results(results, lambda api: api.get_hotel_name(), lambda room: {
+            "hotel": room.hotel_name, "room_type": room.room_type, "cost": room.cost,
+            "price_per_night": room.price_per_night, "rooms_available": room.rooms_available,
+            "date_from": _vendor_date(room.date_from), "date_to": _vendor_date(room.date_to)})}
+
+    def _selected(self, result_id: str, kind: str, apis: Dict[str, object]) -> tuple:
+        selected = self.search_results.get(result_id)
+        if selected is None or selected[0] not in apis:
+            raise InvalidInputError(f"Unknown or expired {kind} result id {result_id!r}; search again.")
+        provider_name, item = selected
+        return apis[provider_name], item
+
+    async def create_itinerary(self, request: HttpRequest):
+        customer = await self._authenticated_account(request)
+        payload = request.json()
+
+        itinerary = Itinerary()
+        for result_id in _string_list(payload, "flights"):
+            flight_api, flight = self._selected(result_id, "flight", self.flight_apis)
+            itinerary.add_reservation(FlightReservation(customer.get_customer_id(), flight_api, flight, []))
+        for result_id in _string_list(payload, "rooms"):
+            hotel_api, room = self._selected(result_id, "room", self.hotel_apis)
+            itinerary.add_reservation(HotelReservation(customer.get_customer_id(), hotel_api, room, [],
+                                                       self.front_end.hotel_availability_cache))
+        if not itinerary.get_reservations():
+            raise InvalidInputError("An itinerary needs at least one flight or room.")
+
+        if not customer.payment_methods_manager.get_payment_methods():
+            for payment_method in FrontEndManager.default_payment_methods():
+                customer.payment_methods_manager.add_payment_method(payment_method)
+        try:
+            payment_method = customer.payment_methods_manager.get_payment_method(
+                _integer(payload.get("payment_method", 1), "payment_method"))
+        except KeyError:
+            raise InvalidInputError("Unknown payment method.")
+
+        payment_mgr = PaymentManager()
+        payment_mgr.set_payment_method(payment_method)
+        itinerary_mgr = SingleItineraryManager(itinerary, payment_mgr, max_workers=4, batch_payment=True,
+                                               retry_policy=RetryPolicy(),
+                                               idempotency_store=self.front_end.payment_idempotency_store,
+                                               journal=self.front_end.booking_journal)
+        # The itinerary is stored before the saga is journaled as completed.
+        itinerary_ids = []
+        if not await self._run_blocking(itinerary_mgr.book_all_reservations, lambda booked: itinerary_ids.append(
+                customer.itineraries_manager.add_itinerary(booked).result())):
+            if itinerary_mgr.rollback_failed:
+                return 502, {"error": "Booking failed and some charges or bookings could not be undone yet; "
+                                      "the refund is pending and will be retried."}
+            return 409, {"error": "Booking failed; nothing was charged or all charges were refunded."}
+
+        return 201, {"itinerary_id": itinerary_ids[0], "total_cost": itinerary.get_total_cost(),
+                     "reservations": [str(reservation).strip() for reservation in itinerary.get_reservations()]}
+
+    async def list_itineraries(self, request: HttpRequest):
+        customer = await self._authenticated_account(request)
+        cursor = request.query.get("cursor")
+        limit = _integer(request.query.get("limit", 20), "limit")
+        if not 1 <= limit <= MAX_PAGE_SIZE:
+            raise InvalidInputError(f"limit must be between 1 and {MAX_PAGE_SIZE}.")
+        page = await self._run_blocking(customer.itineraries_manager.get_page,
+                                        None if cursor is None else _integer(cursor, "cursor"), limit)
+        return 200, {
+            "itineraries": [{"itinerary_id": itinerary.itinerary_id, "total_cost": itinerary.get_total_cost(),
+                             "travel_date": itinerary.travel_date,
+                             "reservations": [str(reservation).strip() for reservation in itinerary.get_reservations()]}
+                            for itinerary in page],
+            "next_cursor": page.next_cursor,
+        }
+
+    async def metrics(self, request: HttpRequest):
+        if request.query.get("format") == "json":
+            return 200, metrics.snapshot()
+        return 200, metrics.render_prometheus()
+
+    ##################################################  HTTP plumbing  ############################################
+
+    async def dispatch(self, request: HttpRequest) -> Tuple[int, Union[dict, str]]:
+        handler = self.routes.get((request.method, request.path))
+        if handler is None:
+            known_path = any(path == request.path for _, path in self.routes)
+            return (405, {"error": "Method not allowed."}) if known_path else (404, {"error": "Not found."})
+        try:
+            return await handler(request)
+        except HttpError as e:
+            return e.status, {"error": str(e)}
+        except InvalidInputError as e:
+            return 400, {"error": str(e)}
+        except (LoginError, SessionError) as e:
+            return 401, {"error": str(e)}
+        except Exception as e:
+            logger.exception("%s %s failed: %s", request.method, request.path, e)
+            return 500, {"error": "Internal server error."}
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                request = await self._read_request(reader)
+                if request is None:
+                    break
+                if isinstance(request, HttpError):
+                    status, body, keep_alive = request.status, {"error": str(request)}, False
+                else:
+                    REQUEST_ID.set(request.headers.get("x-request-id") or uuid.uuid4().hex)
+                    status, body = await self.dispatch(request)
+                    keep_alive = request.headers.get("connection", "").lower() != "close"
+
+                if isinstance(body, str):
+                    payload, content_type = body.encode(), PROMETHEUS_CONTENT_TYPE
+                else:
+                    payload, content_type = json.dumps(body).encode(), "application/json"
+                writer.write(f"HTTP/1.1 {status} {_REASONS.get(status, 'Unknown')}\r\n"
+                             f"Content-Type: {content_type}\r\nContent-Length: {len(payload)}\r\n"
+                             f"X-Request-ID: {REQUEST_ID.get() or ''}\r\n"
+                             f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode() + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def _read_request(self, reader: asyncio.StreamReader):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except asyncio.IncompleteReadError:
+            return None
+        except asyncio.LimitOverrunError:
+            return HttpError(431, "Request headers too large.")
+
+        request_line, *header_lines = head.decode("latin-1").split("\r\n")
+        try:
+            method, target, _ = request_line.split(" ", 2)
+        except ValueError:
+            return HttpError(400, "Malformed request line.")
+
+        headers = {}
+        for line in header_lines:
+            name, separator, value = line.partition(":")
+            if separator:
+                headers[name.strip().lower()] = value.strip()
+
+        try:
+            length = int(headers.get("content-length", 0) or 0)
+        except ValueError:
+            return HttpError(400, "Content-Length must be an integer.")
+        if length < 0:
+            return HttpError(400, "Content-Length must not be negative.")
+        if length > MAX_BODY_BYTES:
+            return HttpError(413, "Request body too large.")
+        body = await reader.readexactly(length) if length else b""
+        return HttpRequest(method.upper(), target, headers, body)
+
+    async def serve(self, host: str = "127.0.0.1", port: int = 8080, sock=None):
+        if sock is not None:
+            server = await asyncio.start_server(self.handle_connection, sock=sock)
+        else:
+            server = await asyncio.start_server(self.handle_connection, host, port)
+        logger.info("Serving on %s", ", ".join(str(s.getsockname()) for s in server.sockets))
+        async with server:
+            await server.serve_forever()
+
+    def close(self):
+        self.flight_search_mgr.close()
+        self.room_search_mgr.close()
+        self.executor.shutdown(wait=True)
+
+
+_REASONS = {200: "OK", 201: "Created", 400: "Bad Request", 401: "Unauthorized", 404: "Not Found",
+            405: "Method Not Allowed", 409: "Conflict", 413: "Payload Too Large",
+            431: "Request Header Fields Too Large", 500: "Internal Server Error", 502: "Bad Gateway"}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m frontend.http_service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    configure_logging()
+    service = ExpediaHttpService()
+    service.front_end.prepare()
+    try:
+        asyncio.run(service.serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import json
+
+import pytest
+
+from backend.booking_journal import (BOOKED, BOOKING, CANCELLED, COMPLETED, ITINERARY_PAYMENT, PAID, PAYING,
+                                     REFUNDED, ROLLBACK_FAILED, ROLLED_BACK, STARTED, BookingJournal, SagaRecovery,
+                                     replay_journal)
+
+
+@pytest.fixture
+def journal(tmp_path):
+    journal = BookingJournal(str(tmp_path / "bookings.journal"))
+    yield journal
+    journal.close()
+
+
+def start(journal, saga_id, *keys):
+    journal.record(saga_id, STARTED, customer_id="1304",
+                   reservations=[{"key": key, "type": "flight", "provider": "Fake Air", "cost": 100,
+                                  "record": ["flight", "Fake Air", 100, None, None, key]} for key in keys])
+
+
+def book(journal, saga_id, key):
+    journal.record(saga_id, BOOKING, key=key, type="flight", provider="Fake Air")
+    journal.record(saga_id, BOOKED, key=key, confirmation_id=f"CONF-{key}", type="flight", provider="Fake Air")
+
+
+def pay(journal, saga_id, key=ITINERARY_PAYMENT):
+    journal.record(saga_id, PAYING, key=key, payment_key=f"{saga_id}:payment", amount=100,
+                   payment_method="FakePayment")
+    journal.record(saga_id, PAID, key=key, transaction_id=f"TX-{saga_id}", amount=100,
+                   payment_method="FakePayment")
+
+
+class Compensations:
+    def __init__(self, cancel_ok=True, refund_ok=True):
+        self.cancel_ok = cancel_ok
+        self.refund_ok = refund_ok
+        self.cancelled = []
+        self.refunded = []
+        self.finished = []
+
+    def recovery(self, journal):
+        return SagaRecovery(journal, self.cancel, self.refund, self.finished.append)
+
+    def cancel(self, entry):
+        self.cancelled.append(entry["confirmation_id"])
+        return self.cancel_ok
+
+    def refund(self, entry):
+        self.refunded.append(entry)
+        return self.refund_ok
+
+
+def test_replay_returns_only_sagas_in_flight(journal):
+    start(journal, "done", "a")
+    book(journal, "done", "a")
+    journal.record("done", COMPLETED)
+    start(journal, "open", "b", "c")
+    pay(journal, "open")
+    book(journal, "open", "b")
+
+    sagas = replay_journal(journal.path)
+
+    assert list(sagas) == ["open"]
+    saga = sagas["open"]
+    assert saga.customer_id == "1304"
+    assert set(saga.reservations) == {"b", "c"}
+    assert set(saga.bookings) == {"b"}
+    assert saga.payments[ITINERARY_PAYMENT]["transaction_id"] == "TX-open"
+    assert not saga.is_fully_booked()
+
+
+def test_replay_skips_a_torn_last_line(journal):
+    start(journal, "open", "a")
+    with open(journal.path, "ab") as journal_file:
+        journal_file.write(b'{"saga":"open","step":"boo')
+
+    sagas = replay_journal(journal.path)
+
+    assert [entry["step"] for entry in sagas["open"].entries] == [STARTED]
+
+
+def test_reopening_terminates_a_torn_line(tmp_path):
+    path = tmp_path / "bookings.journal"
+    path.write_bytes(b'{"saga":"a","step":"started","reservations":[]}\n{"saga":"a","st')
+
+    reopened = BookingJournal(str(path))
+    reopened.record("b", STARTED, reservations=[])
+    reopened.close()
+
+    lines = path.read_bytes().splitlines()
+    assert json.loads(lines[-1])["saga"] == "b"
+    assert set(replay_journal(str(path))) == {"a", "b"}
+
+
+def test_recovery_finishes_a_fully_booked_saga(journal):
+    start(journal, "saga", "a", "b")
+    pay(journal, "saga")
+    book(journal, "saga", "a")
+    book(journal, "saga", "b")
+    compensations = Compensations()
+
+    outcome = compensations.recovery(journal).run(compact=False)
+
+    assert outcome[COMPLETED] == 1
+    assert [saga.saga_id for saga in compensations.finished] == ["saga"]
+    assert compensations.cancelled == [] and compensations.refunded == []
+    assert replay_journal(journal.path) == {}
+
+
+def test_recovery_compensates_a_partially_booked_saga(journal):
+    start(journal, "saga", "a", "b")
+    pay(journal, "saga")
+    book(journal, "saga", "a")
+    compensations = Compensations()
+
+    outcome = compensations.recovery(journal).run(compact=False)
+
+    assert outcome[ROLLED_BACK] == 1
+    assert compensations.cancelled == ["CONF-a"]
+    assert [entry["transaction_id"] for entry in compensations.refunded] == ["TX-saga"]
+    assert compensations.finished == []
+    assert replay_journal(journal.path) == {}
+
+
+def test_charge_journaled_only_as_intent_is_left_for_manual_refund(journal):
+    start(journal, "saga", "a")
+    journal.record("saga", PAYING, key=ITINERARY_PAYMENT, payment_key="saga:payment", amount=100,
+                   payment_method="FakePayment")
+    compensations = Compensations()
+
+    outcome = compensations.recovery(journal).run(compact=False)
+
+    assert outcome[ROLLBACK_FAILED] == 1
+    assert compensations.refunded == []
+    assert list(replay_journal(journal.path)) == ["saga"]
+
+
+def test_unconfirmed_booking_keeps_the_saga_in_flight(journal):
+    start(journal, "saga", "a")
+    pay(journal, "saga")
+    journal.record("saga", BOOKING, key="a", type="flight", provider="Fake Air")
+    compensations = Compensations()
+
+    outcome = compensations.recovery(journal).run(compact=False)
+
+    assert outcome[ROLLBACK_FAILED] == 1
+    assert len(compensations.refunded) == 1
+    assert list(replay_journal(journal.path)) == ["saga"]
+
+
+def test_failed_compensation_is_retried_without_repeating_finished_steps(journal):
+    start(journal, "saga", "a", "b")
+    pay(journal, "saga")
+    book(journal, "saga", "a")
+    failing = Compensations(refund_ok=False)
+
+    assert failing.recovery(journal).run(compact=False)[ROLLBACK_FAILED] == 1
+
+    retry = Compensations()
+    assert retry.recovery(journal).run(compact=False)[ROLLED_BACK] == 1
+    assert retry.cancelled == []  # cancelled by the first attempt
+    assert len(retry.refunded) == 1
+
+
+def test_compaction_keeps_only_sagas_in_flight(journal):
+    start(journal, "done", "a")
+    journal.record("done", REFUNDED, key=ITINERARY_PAYMENT)
+    journal.record("done", ROLLED_BACK)
+    start(journal, "open", "b")
+    journal.record("open", CANCELLED, key="b")
+    with open(journal.path, "ab") as journal_file:
+        journal_file.write(b'{"saga":"open","st')
+
+    journal.compact()
+    journal.record("open", ROLLBACK_FAILED)
+
+    entries = [json.loads(line) for line in open(journal.path, "rb")]
+    assert {entry["saga"] for entry in entries} == {"open"}
+    assert [entry["step"] for entry in entries] == [STARTED, CANCELLED, ROLLBACK_FAILED]
@@ -0,0 +1,203 @@
+from datetime import datetime
+
+import pytest
+
+from backend import booking_journal
+from backend.booking_journal import BookingJournal, replay_journal
+from backend.customer_backend_mgr import (Itinerary, PaymentManager, RefundablePaymentMethodInterface,
+                                          ReservationInterface, SingleItineraryManager)
+from backend.retry import IdempotencyStore
+
+
+class FakeReservation(ReservationInterface):
+    reservation_type = "flight"
+
+    def __init__(self, cost: float, book_ok: bool = True):
+        super().__init__("1304", [], cost)
+        self.book_ok = book_ok
+        self.book_calls = 0
+        self.cancelled = False
+
+    def book(self):
+        self.book_calls += 1
+        if not self.book_ok:
+            return False
+        self.set_confirmation_id(f"CONF-{self.idempotency_key}")
+        return True
+
+    def cancel(self):
+        self.cancelled = True
+        return True
+
+    def get_provider_name(self) -> str:
+        return "Fake Air"
+
+    def get_travel_dates(self):
+        return datetime(2030, 1, 1), datetime(2030, 1, 8)
+
+    def __str__(self):
+        return f"Fake flight costing {self.get_cost()}"
+
+
+class FakePayment(RefundablePaymentMethodInterface):
+    def __init__(self, refund_ok: bool = True):
+        self.refund_ok = refund_ok
+        self.charges = []
+        self.refunds = []
+
+    def pay(self, amount, idempotency_key=None):
+        self.charges.append(amount)
+        return True, f"TX{len(self.charges)}"
+
+    def refund(self, transaction_id, amount=None):
+        self.refunds.append((transaction_id, amount))
+        return self.refund_ok
+
+
+def make_manager(reservations, payment, batch_payment=False, max_workers=None, journal=None,
+                 idempotency_store=None):
+    itinerary = Itinerary()
+    for reservation in reservations:
+        itinerary.add_reservation(reservation)
+    payment_mgr = PaymentManager()
+    payment_mgr.set_payment_method(payment)
+    return SingleItineraryManager(itinerary, payment_mgr, max_workers=max_workers, batch_payment=batch_payment,
+                                  idempotency_store=idempotency_store, journal=journal)
+
+
+@pytest.mark.parametrize("max_workers", [None, 4])
+def test_per_reservation_rollback_refunds_every_charge_and_cancels_bookings(max_workers):
+    booked = [FakeReservation(100), FakeReservation(200)]
+    failing = FakeReservation(50, book_ok=False)
+    payment = FakePayment()
+    manager = make_manager(booked + [failing], payment, max_workers=max_workers)
+
+    assert manager.book_all_reservations() is False
+
+    assert sorted(payment.charges) == [50, 100, 200]
+    assert sorted(amount for _, amount in payment.refunds) == [50, 100, 200]
+    assert all(reservation.cancelled for reservation in booked)
+    assert not failing.cancelled
+    assert manager.rollback_failed is False
+
+
+@pytest.mark.parametrize("max_workers", [None, 4])
+def test_batch_rollback_refunds_the_single_itinerary_charge(max_workers):
+    booked = FakeReservation(100)
+    payment = FakePayment()
+    manager = make_manager([booked, FakeReservation(200, book_ok=False)], payment, batch_payment=True,
+                           max_workers=max_workers)
+
+    assert manager.book_all_reservations() is False
+
+    assert payment.charges == [300]
+    assert payment.refunds == [("TX1", None)]
+    assert booked.cancelled
+    assert manager.rollback_failed is False
+
+
+def test_batch_success_charges_once_and_confirms_every_reservation():
+    reservations = [FakeReservation(100), FakeReservation(200)]
+    payment = FakePayment()
+    manager = make_manager(reservations, payment, batch_payment=True, max_workers=4)
+
+    assert manager.book_all_reservations() is True
+
+    assert payment.charges == [300]
+    assert payment.refunds == []
+    assert all(reservation.get_confirmation_id() is not None for reservation in reservations)
+    assert all(reservation.get_payment_transaction_id() == "TX1" for reservation in reservations)
+
+
+@pytest.mark.parametrize("batch_payment", [False, True])
+def test_booking_again_after_a_rollback_charges_and_books_anew(batch_payment):
+    good = FakeReservation(100)
+    failing = FakeReservation(200, book_ok=False)
+    payment = FakePayment()
+    manager = make_manager([good, failing], payment, batch_payment=batch_payment,
+                           idempotency_store=IdempotencyStore())
+    cancelled_confirmation = f"CONF-{good.idempotency_key}"
+    assert manager.book_all_reservations() is False
+    charges = len(payment.charges)
+
+    failing.book_ok = True
+    assert manager.book_all_reservations() is True
+
+    assert len(payment.charges) == 2 * charges
+    assert good.book_calls == 2
+    assert good.get_confirmation_id() != cancelled_confirmation
+    assert good.get_payment_transaction_id() not in {transaction_id for transaction_id, _ in payment.refunds}
+
+
+def test_failed_refund_marks_the_rollback_as_failed():
+    manager = make_manager([FakeReservation(100), FakeReservation(200, book_ok=False)],
+                           FakePayment(refund_ok=False), batch_payment=True)
+
+    assert manager.book_all_reservations() is False
+    assert manager.rollback_failed is True
+
+
+def test_rollback_is_journaled(tmp_path):
+    journal = BookingJournal(str(tmp_path / "bookings.journal"))
+    manager = make_manager([FakeReservation(100), FakeReservation(200, book_ok=False)], FakePayment(),
+                           journal=journal)
+    manager.book_all_reservations()
+    journal.close()
+
+    lines = (tmp_path / "bookings.journal").read_text().splitlines()
+    assert any('"step":"declined"' in line for line in lines)
+    assert '"step":"rolled_back"' in lines[-1]
+    assert replay_journal(journal.path) == {}
+
+
+def test_completed_is_journaled_only_after_the_itinerary_is_stored(tmp_path):
+    journal = BookingJournal(str(tmp_path / "bookings.journal"))
+    manager = make_manager([FakeReservation(100)], FakePayment(), journal=journal)
+    in_flight_while_storing = []
+
+    def on_booked(itinerary):
+        in_flight_while_storing.extend(replay_journal(journal.path))
+
+    assert manager.book_all_reservations(on_booked) is True
+    assert in_flight_while_storing == [manager._itinerary.idempotency_key]
+    assert replay_journal(journal.path) == {}
+    journal.close()
+
+
+def test_failed_store_leaves_the_saga_for_recovery(tmp_path):
+    journal = BookingJournal(str(tmp_path / "bookings.journal"))
+    manager = make_manager([FakeReservation(100)], FakePayment(), journal=journal)
+
+    def on_booked(itinerary):
+        raise OSError("disk full")
+
+    with pytest.raises(OSError):
+        manager.book_all_reservations(on_booked)
+    sagas = replay_journal(journal.path)
+    journal.close()
+
+    saga = sagas[manager._itinerary.idempotency_key]
+    assert saga.is_fully_booked() and not saga.rolling_back
+    assert booking_journal.COMPLETED not in [entry["step"] for entry in saga.entries]
+
+
+def test_booking_again_after_a_rollback_is_a_new_saga(tmp_path):
+    journal = BookingJournal(str(tmp_path / "bookings.journal"))
+    failing = FakeReservation(200, book_ok=False)
+    manager = make_manager([FakeReservation(100), failing], FakePayment(), journal=journal)
+    rolled_back_saga = manager._itinerary.idempotency_key
+    assert manager.book_all_reservations() is False
+
+    failing.book_ok = True
+
+    def on_booked(itinerary):
+        raise OSError("crashed before storing")
+
+    with pytest.raises(OSError):
+        manager.book_all_reservations(on_booked)
+    sagas = replay_journal(journal.path)
+    journal.close()
+
+    assert rolled_back_saga not in sagas
+    assert list(sagas) == [manager._itinerary.idempotency_key]
+    assert sagas[manager._itinerary.idempotency_key].is_fully_booked()
@@ -0,0 +1,145 @@
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from backend.customer_backend_mgr import Room
+from backend.search_cache import HotelAvailabilityCache
+
+SEARCH = ("Cairo", datetime(2030, 1, 1), datetime(2030, 1, 8), 2, 0, 1)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def room(room_type="Double", rooms_available=3, num_rooms_needed=1, date_from=datetime(2030, 1, 1),
+         date_to=datetime(2030, 1, 8), location="Cairo"):
+    return Room(None, "Hilton", room_type, rooms_available, num_rooms_needed, 100.0, date_from, date_to, location)
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+@pytest.fixture
+def cache(clock):
+    cache = HotelAvailabilityCache(fresh_ttl=60.0, stale_ttl=240.0, clock=clock)
+    yield cache
+    cache.close()
+
+
+def test_fresh_entries_are_served_without_refreshing(cache, clock):
+    cache.put_rooms("Hilton", [room()], *SEARCH)
+    clock.now += 30
+
+    rooms = cache.get_rooms("Hilton", *SEARCH, loader=lambda: pytest.fail("refreshed a fresh entry"))
+
+    assert [r.room_type for r in rooms] == ["Double"]
+    assert cache.stale_hits == 0
+
+
+def test_stale_entries_are_served_while_a_refresh_runs(cache, clock):
+    cache.put_rooms("Hilton", [room()], *SEARCH)
+    clock.now += 120
+    refreshed = threading.Event()
+
+    def loader():
+        refreshed.set()
+        return [room("Suite")]
+
+    stale = cache.get_rooms("Hilton", *SEARCH, loader=loader)
+
+    assert [r.room_type for r in stale] == ["Double"]
+    assert cache.stale_hits == 1
+    assert refreshed.wait(5)
+    for _ in range(500):
+        if [r.room_type for r in cache.get_rooms("Hilton", *SEARCH)] == ["Suite"]:
+            break
+        time.sleep(0.01)
+    else:
+        pytest.fail("the refreshed rooms were never stored")
+
+
+def test_entries_expire_after_the_stale_window(cache, clock):
+    cache.put_rooms("Hilton", [room()], *SEARCH)
+    clock.now += 301
+
+    assert cache.get_rooms("Hilton", *SEARCH) is None
+
+
+def test_booking_takes_rooms_out_of_overlapping_searches(cache):
+    cache.put_rooms("Hilton", [room(rooms_available=3), room("Suite")], *SEARCH)
+    later = ("Cairo", datetime(2030, 2, 1), datetime(2030, 2, 5), 2, 0, 1)
+    cache.put_rooms("Hilton", [room(rooms_available=3)], *later)
+    cache.put_rooms("Hilton", [room(rooms_available=3)], "Gaza", *SEARCH[1:])
+
+    cache.record_booking("Hilton", room(num_rooms_needed=2, date_from=datetime(2030, 1, 5),
+                                        date_to=datetime(2030, 1, 10)))
+
+    overlapping = cache.get_rooms("Hilton", *SEARCH)
+    assert [(r.room_type, r.rooms_available) for r in overlapping] == [("Double", 1), ("Suite", 3)]
+    assert cache.get_rooms("Hilton", *later)[0].rooms_available == 3
+    assert cache.get_rooms("Hilton", "Gaza", *SEARCH[1:])[0].rooms_available == 3
+
+
+def test_concurrent_bookings_are_all_taken_out(cache):
+    cache.put_rooms("Hilton", [room(rooms_available=401)], *SEARCH)
+
+    def book():
+        for _ in range(50):
+            cache.record_booking("Hilton", room(num_rooms_needed=1))
+
+    threads = [threading.Thread(target=book) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert cache.get_rooms("Hilton", *SEARCH)[0].rooms_available == 1
+
+
+def test_refresh_loaded_before_a_booking_does_not_overwrite_it(cache, clock):
+    cache.put_rooms("Hilton", [room(rooms_available=3)], *SEARCH)
+    clock.now += 120
+    loading, release = threading.Event(), threading.Event()
+
+    def loader():
+        loading.set()
+        release.wait(5)
+        return [room(rooms_available=3)]
+
+    cache.get_rooms("Hilton", *SEARCH, loader=loader)
+    assert loading.wait(5)
+    cache.record_booking("Hilton", room(num_rooms_needed=2))
+    release.set()
+    for _ in range(500):
+        if not cache._refreshing:
+            break
+        time.sleep(0.01)
+
+    assert cache.get_rooms("Hilton", *SEARCH)[0].rooms_available == 1
+
+
+def test_booking_drops_rooms_that_no_longer_fit_the_search(cache):
+    cache.put_rooms("Hilton", [room(rooms_available=2)], "Cairo", datetime(2030, 1, 1), datetime(2030, 1, 8), 2, 0, 2)
+
+    cache.record_booking("Hilton", room(num_rooms_needed=1))
+
+    assert cache.get_rooms("Hilton", "Cairo", datetime(2030, 1, 1), datetime(2030, 1, 8), 2, 0, 2) == []
+
+
+def test_cancellation_invalidates_overlapping_searches(cache):
+    cache.put_rooms("Hilton", [room()], *SEARCH)
+    cache.put_rooms("Marriott", [room()], *SEARCH)
+
+    cache.record_cancellation("Hilton", room())
+
+    assert cache.get_rooms("Hilton", *SEARCH) is None
+    assert cache.get_rooms("Marriott", *SEARCH) is not None
@@ -0,0 +1,118 @@
+import asyncio
+import json
+from collections import namedtuple
+
+import pytest
+
+from frontend import http_service
+from frontend.customer_frontend_mgr import FrontEndManager
+from frontend.http_service import MAX_BODY_BYTES, ExpediaHttpService, HttpRequest
+
+Flight = namedtuple("Flight", "cost flight_fetched_object")
+
+
+@pytest.fixture
+def service(tmp_path):
+    front_end = FrontEndManager(str(tmp_path / "expedia.sqlite3"), str(tmp_path / "bookings.journal"))
+    front_end.prepare()
+    service = ExpediaHttpService(front_end, max_workers=4)
+    yield service
+    service.close()
+    front_end.close()
+
+
+def call(service, method, target, body=None, token=None):
+    headers = {"authorization": f"Bearer {token}"} if token else {}
+    payload = b"" if body is None else json.dumps(body).encode()
+    return asyncio.run(service.dispatch(HttpRequest(method, target, headers, payload)))
+
+
+def raw_status(service, data: bytes) -> int:
+    async def exchange():
+        server = await asyncio.start_server(service.handle_connection, "127.0.0.1", 0)
+        async with server:
+            reader, writer = await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(data)
+            await writer.drain()
+            response = await reader.read()
+            writer.close()
+        return int(response.split(b" ", 2)[1])
+
+    return asyncio.run(exchange())
+
+
+def login(service):
+    status, body = call(service, "POST", "/login", {"username": "user", "password": "1234"})
+    assert status == 200
+    return body["token"]
+
+
+@pytest.mark.parametrize("length, status", [("abc", 400), ("-5", 400), (str(MAX_BODY_BYTES + 1), 413)])
+def test_bad_content_length_is_rejected_before_reading_the_body(service, length, status):
+    assert raw_status(service, f"POST /login HTTP/1.1\r\nContent-Length: {length}\r\n\r\n".encode()) == status
+
+
+def test_malformed_request_line_is_rejected(service):
+    assert raw_status(service, b"GARBAGE\r\n\r\n") == 400
+
+
+@pytest.mark.parametrize("body", [
+    {"username": "user"},
+    {"username": "user", "password": 1234},
+    {"username": "", "password": "1234"},
+])
+def test_login_requires_string_credentials(service, body):
+    assert call(service, "POST", "/login", body)[0] == 400
+
+
+def test_login_rejects_wrong_passwords_and_non_object_bodies(service):
+    assert call(service, "POST", "/login", {"username": "user", "password": "wrong"})[0] == 401
+    assert call(service, "POST", "/login", ["user", "1234"])[0] == 400
+
+
+def test_itineraries_need_a_valid_token(service):
+    assert call(service, "GET", "/itineraries")[0] == 401
+    assert call(service, "GET", "/itineraries", token="forged")[0] == 401
+
+
+@pytest.mark.parametrize("body", [
+    {"flights": "f1"},
+    {"flights": [{"id": "f1"}]},
+    {"rooms": [1]},
+    {"flights": ["unknown"]},
+    {},
+])
+def test_itinerary_payload_is_validated(service, body):
+    status, response = call(service, "POST", "/itineraries", body, login(service))
+    assert status == 400, response
+
+
+@pytest.mark.parametrize("limit", ["0", "-1", "-2", "101", "ten"])
+def test_itinerary_page_limit_is_validated(service, limit):
+    assert call(service, "GET", f"/itineraries?limit={limit}", token=login(service))[0] == 400
+
+
+def test_itinerary_pages_accept_limits_up_to_the_maximum(service):
+    status, body = call(service, "GET", "/itineraries?limit=100", token=login(service))
+    assert status == 200 and body["next_cursor"] is None
+
+
+def test_unknown_routes_and_methods(service):
+    assert call(service, "GET", "/nowhere")[0] == 404
+    assert call(service, "DELETE", "/itineraries")[0] == 405
+
+
+@pytest.mark.parametrize("rollback_failed, status", [(False, 409), (True, 502)])
+def test_failed_booking_reports_whether_the_rollback_finished(service, monkeypatch, rollback_failed, status):
+    class FailingManager:
+        def __init__(self, itinerary, payment_mgr, **kwargs):
+            self.rollback_failed = rollback_failed
+
+        def book_all_reservations(self, on_booked=None):
+            return False
+
+    monkeypatch.setattr(http_service, "SingleItineraryManager", FailingManager)
+    provider_name = next(iter(service.flight_apis))
+    service.search_results.put("f1", (provider_name, Flight(100.0, object())))
+
+    assert call(service, "POST", "/itineraries", {"flights": ["f1"]}, login(service))[0] == status
@@ -0,0 +1,41 @@
+import pytest
+
+from backend.itinerary_store import ItineraryRecord, ItineraryStore, ReservationRecord
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ItineraryStore(str(tmp_path / "expedia.sqlite3"))
+    yield store
+    store.close()
+
+
+def add(store, customer_id, cost, saga_id=None):
+    reservation = ReservationRecord("flight", "Fake Air", cost, "01-01-2030", "08-01-2030", "Fake flight")
+    return store.append(ItineraryRecord(None, customer_id, cost, [reservation], saga_id)).result()
+
+
+def test_pages_follow_the_cursor_through_one_customers_itineraries(store):
+    for cost in range(5):
+        add(store, "1304", cost)
+        add(store, "other", cost)
+
+    first = store.page("1304", limit=2)
+    second = store.page("1304", first.next_cursor, limit=2)
+    last = store.page("1304", second.next_cursor, limit=2)
+
+    assert [itinerary.get_total_cost() for page in (first, second, last) for itinerary in page] == [0, 1, 2, 3, 4]
+    assert last.next_cursor is None
+
+
+@pytest.mark.parametrize("limit", [0, -1, -2])
+def test_page_limit_must_be_positive(store, limit):
+    add(store, "1304", 100)
+    with pytest.raises(ValueError):
+        store.page("1304", limit=limit)
+
+
+def test_appending_a_stored_saga_again_returns_its_itinerary(store):
+    first = add(store, "1304", 100, saga_id="saga")
+    assert add(store, "1304", 100, saga_id="saga") == first
+    assert store.count("1304") == 1
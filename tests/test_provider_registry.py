@@ -0,0 +1,101 @@
+import threading
+
+import pytest
+
+from backend.exceptions import NetworkError
+from backend.provider_registry import ProviderClientPool
+
+
+class Factory:
+    def __init__(self):
+        self.created = 0
+
+    def __call__(self):
+        self.created += 1
+        return f"client{self.created}"
+
+
+def test_pool_reuses_idle_clients():
+    factory = Factory()
+    pool = ProviderClientPool(factory, max_size=2)
+
+    with pool.lease() as first:
+        pass
+    with pool.lease() as second:
+        pass
+
+    assert first == second
+    assert factory.created == 1
+    assert (pool.size, pool.idle) == (1, 1)
+
+
+def test_warm_creates_up_to_min_size_but_never_past_max_size():
+    assert ProviderClientPool(Factory(), max_size=4, min_size=2).idle == 2
+    assert ProviderClientPool(Factory(), max_size=2, min_size=5).size == 2
+
+
+def test_checkout_times_out_when_every_client_is_leased():
+    pool = ProviderClientPool(Factory(), max_size=1)
+    pool.checkout()
+
+    with pytest.raises(NetworkError):
+        pool.checkout(timeout=0.05)
+    assert pool.size == 1
+
+
+def test_waiter_gets_the_client_checked_in():
+    pool = ProviderClientPool(Factory(), max_size=1)
+    client = pool.checkout()
+    leased = []
+    waiter = threading.Thread(target=lambda: leased.append(pool.checkout(timeout=5)))
+    waiter.start()
+
+    pool.checkin(client)
+    waiter.join(5)
+
+    assert leased == [client]
+
+
+def test_discarded_client_frees_its_place_for_a_waiter():
+    factory = Factory()
+    pool = ProviderClientPool(factory, max_size=1)
+    broken = pool.checkout()
+    leased = []
+    waiter = threading.Thread(target=lambda: leased.append(pool.checkout(timeout=5)))
+    waiter.start()
+
+    pool.discard(broken)
+    waiter.join(5)
+
+    assert leased == ["client2"]
+    assert pool.size == 1
+
+
+def test_lease_discards_a_client_that_raised():
+    factory = Factory()
+    pool = ProviderClientPool(factory, max_size=1)
+
+    with pytest.raises(ConnectionError):
+        with pool.lease():
+            raise ConnectionError("reset")
+    with pool.lease() as client:
+        pass
+
+    assert client == "client2"
+    assert (pool.size, pool.idle) == (1, 1)
+
+
+def test_failed_creation_does_not_use_up_the_pool():
+    calls = []
+
+    def factory():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ConnectionError("vendor down")
+        return "client"
+
+    pool = ProviderClientPool(factory, max_size=1)
+    with pytest.raises(ConnectionError):
+        pool.checkout()
+
+    assert pool.checkout(timeout=0.05) == "client"
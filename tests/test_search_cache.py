@@ -0,0 +1,118 @@
+from datetime import datetime
+
+from backend.search_cache import FlightSearchCache, TTLLRUCache, make_flight_query_key
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_their_ttl():
+    clock = FakeClock()
+    cache = TTLLRUCache(default_ttl=10.0, clock=clock)
+    cache.put("short", 1, ttl=5.0)
+    cache.put("default", 2)
+
+    clock.now += 6
+    assert cache.get("short") is None
+    assert cache.get("default") == 2
+
+    clock.now += 5
+    assert cache.get("default") is None
+    assert (cache.hits, cache.misses) == (1, 2)
+    assert len(cache) == 0
+
+
+def test_non_positive_ttl_is_not_cached():
+    cache = TTLLRUCache()
+    cache.put("key", 1, ttl=0)
+    assert cache.get("key") is None
+
+
+def test_least_recently_used_entry_is_evicted_first():
+    cache = TTLLRUCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    assert cache.keys() == ["a", "c"]
+    assert cache.evictions == 1
+
+
+def test_byte_bound_evicts_until_the_cache_fits():
+    cache = TTLLRUCache(max_bytes=100, size_of=lambda value: value)
+    cache.put("a", 40)
+    cache.put("b", 40)
+    cache.put("c", 40)
+    cache.put("too big", 101)
+
+    assert cache.keys() == ["b", "c"]
+    assert cache.current_bytes == 80
+
+
+def test_peek_and_replace_keep_expiry_and_order():
+    clock = FakeClock()
+    cache = TTLLRUCache(max_entries=2, default_ttl=10.0, clock=clock)
+    cache.put("a", 1)
+    cache.put("b", 2)
+
+    assert cache.peek("a") == 1
+    assert cache.replace("a", 10)
+    cache.put("c", 3)
+    assert cache.keys() == ["b", "c"]  # neither peek nor replace refreshed "a"
+
+    clock.now += 11
+    assert not cache.replace("missing", 1)
+    assert cache.get("b") is None
+
+
+def test_index_groups_keys_and_follows_evictions():
+    cache = TTLLRUCache(max_entries=3, index_key=lambda key: key[0])
+    for key in [("x", 1), ("y", 1), ("x", 2), ("x", 3)]:
+        cache.put(key, 0)
+
+    assert cache.keys(index="x") == [("x", 2), ("x", 3)]
+    assert cache.keys(index="y") == [("y", 1)]
+    cache.invalidate(("y", 1))
+    assert cache.keys(index="y") == []
+
+
+def test_flight_keys_normalize_locations_and_dates():
+    first = make_flight_query_key("Turkish Airlines", datetime(2030, 1, 1, 9), "  New   York ", datetime(2030, 1, 8),
+                                  "Paris", 0, 0, 1)
+    second = make_flight_query_key("Turkish Airlines", datetime(2030, 1, 1, 18), "new york", datetime(2030, 1, 8, 7),
+                                   "PARIS", 0, 0, 1)
+    assert first == second
+
+
+def test_flight_cache_uses_provider_ttls():
+    clock = FakeClock()
+    cache = FlightSearchCache(default_ttl=300.0, provider_ttls={"AirCanada": 30.0}, clock=clock)
+    search_args = (datetime(2030, 1, 1), "Cairo", datetime(2030, 1, 8), "Paris", 0, 0, 1)
+    cache.put_flights("AirCanada", ["ac"], *search_args)
+    cache.put_flights("Turkish Airlines", ["tk"], *search_args)
+
+    clock.now += 60
+    assert cache.get_flights("AirCanada", *search_args) is None
+    assert cache.get_flights("Turkish Airlines", *search_args) == ["tk"]
+
+
+def test_update_applies_a_function_to_live_entries_only():
+    clock = FakeClock()
+    cache = TTLLRUCache(default_ttl=10.0, clock=clock)
+    cache.put("key", 1)
+
+    assert cache.update("key", lambda value: value + 1)
+    assert not cache.update("key", lambda value: None)
+    assert cache.update("key", lambda value: value, ttl=60.0)
+    clock.now += 30
+    assert cache.get("key") == 2
+
+    clock.now += 31
+    assert not cache.update("key", lambda value: value + 1)
+    assert not cache.update("missing", lambda value: value)
@@ -0,0 +1,107 @@
+import multiprocessing
+import os
+
+import pytest
+
+from backend.search_cache import room_index_key
+from backend.shared_cache import _HEADER, SharedMemoryCache, _key_hash
+
+fork = multiprocessing.get_context("fork")
+
+
+@pytest.fixture
+def cache():
+    cache = SharedMemoryCache(slots=64, slot_size=1024, lock_stripes=4, index_key=room_index_key,
+                              lock_timeout=0.2)
+    yield cache
+    cache.close()
+    cache.unlink()
+
+
+def key(provider, location, day):
+    return ("rooms", provider, location, day)
+
+
+def run_in_child(target):
+    child = fork.Process(target=target)
+    child.start()
+    child.join(10)
+    assert child.exitcode == 0
+
+
+def test_entries_written_by_a_child_are_visible_to_the_parent(cache):
+    run_in_child(lambda: cache.put(key("Hilton", "Cairo", 1), ["room"]))
+
+    assert cache.get(key("Hilton", "Cairo", 1)) == ["room"]
+    assert len(cache) == 1
+
+
+def test_keys_can_be_filtered_by_index(cache):
+    for entry in [key("Hilton", "Cairo", 1), key("Hilton", "Cairo", 2), key("Hilton", "Paris", 1),
+                  key("Marriott", "Cairo", 1)]:
+        cache.put(entry, [])
+
+    assert sorted(cache.keys(index=("Hilton", "Cairo"))) == [key("Hilton", "Cairo", 1), key("Hilton", "Cairo", 2)]
+    assert len(cache.keys()) == 4
+
+
+def test_stripe_held_by_a_dead_process_is_recovered(cache):
+    entry = key("Hilton", "Cairo", 1)
+    cache.put(entry, ["old"])
+    slot = cache._find(entry, _key_hash(entry))[0]
+
+    def die_mid_write():
+        cache._acquire(cache._stripe_for(_key_hash(entry)))
+        sequence = _HEADER.unpack_from(cache._memory.buf, slot * cache._slot_size)[0]
+        _HEADER.pack_into(cache._memory.buf, slot * cache._slot_size, sequence + 1, 0, 0, 0.0, 0, 0)
+        os._exit(0)
+
+    run_in_child(die_mid_write)
+    assert cache.get(entry) is None
+
+    cache.put(entry, ["new"])
+    assert cache.get(entry) == ["new"]
+    assert _HEADER.unpack_from(cache._memory.buf, slot * cache._slot_size)[0] % 2 == 0
+
+
+def test_write_is_skipped_while_a_live_process_holds_the_stripe(cache):
+    entry = key("Hilton", "Cairo", 1)
+    stripe = cache._stripe_for(_key_hash(entry))
+
+    with cache._locked(stripe) as acquired:
+        assert acquired
+        assert not cache._store(entry, ["room"], float("inf"))
+    assert cache.get(entry) is None
+
+
+
+def test_concurrent_updates_from_several_processes_are_not_lost():
+    cache = SharedMemoryCache(slots=64, slot_size=1024, lock_stripes=4)
+    entry = key("Hilton", "Cairo", 1)
+    cache.put(entry, 0)
+
+    def increment():
+        for _ in range(200):
+            assert cache.update(entry, lambda count: count + 1)
+
+    children = [fork.Process(target=increment) for _ in range(4)]
+    for child in children:
+        child.start()
+    for child in children:
+        child.join(30)
+        assert child.exitcode == 0
+
+    try:
+        assert cache.get(entry) == 800
+    finally:
+        cache.close()
+        cache.unlink()
+
+
+def test_update_skips_missing_entries_and_can_extend_the_expiry(cache):
+    assert not cache.update(key("Hilton", "Cairo", 1), lambda value: value)
+
+    cache.put(key("Hilton", "Cairo", 1), ["room"], ttl=10)
+    assert cache.update(key("Hilton", "Cairo", 1), lambda rooms: rooms + ["suite"], ttl=3600)
+    assert cache.get(key("Hilton", "Cairo", 1)) == ["room", "suite"]
+    assert cache._find(key("Hilton", "Cairo", 1), _key_hash(key("Hilton", "Cairo", 1)))[2] > cache._clock() + 60
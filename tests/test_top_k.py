@@ -0,0 +1,54 @@
+import random
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from backend.customer_backend_mgr import _collect_cheapest_pages, _TopKCollector
+
+Item = namedtuple("Item", "name cost")
+
+
+def offered(count: int, seed: int) -> list:
+    rng = random.Random(seed)
+    # Few distinct prices, so ties are common.
+    return [(f"api{rng.randrange(3)}", Item(f"item{i}", rng.randrange(50))) for i in range(count)]
+
+
+@pytest.mark.parametrize("k", [1, 5, 20, 500])
+@pytest.mark.parametrize("seed", range(5))
+def test_collector_matches_a_stable_sort(k, seed):
+    pairs = offered(200, seed)
+    collector = _TopKCollector(k)
+    for api, item in pairs:
+        collector.offer(api, item)
+
+    expected = sorted(pairs, key=lambda pair: pair[1].cost)[:k]
+    assert list(collector.to_map().values()) == expected
+    assert list(collector.to_map()) == list(range(1, len(expected) + 1))
+
+
+def test_concurrent_offers_keep_the_k_cheapest():
+    pairs = offered(2000, seed=7)
+    collector = _TopKCollector(10)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda pair: collector.offer(*pair), pairs))
+
+    costs = [item.cost for _, item in collector.to_map().values()]
+    assert costs == sorted(item.cost for _, item in pairs)[:10]
+
+
+def test_pages_stop_once_the_provider_cannot_beat_the_kth_price():
+    collector = _TopKCollector(2)
+    collector.offer("other", Item("a", 10))
+    collector.offer("other", Item("b", 20))
+    pages_served = []
+
+    def pages():
+        for page in ([Item("c", 5), Item("d", 15)], [Item("e", 25)], [Item("f", 30)]):
+            pages_served.append(page)
+            yield page
+
+    assert _collect_cheapest_pages(collector, "paged", pages()) == 1
+    assert len(pages_served) == 1
+    assert [item.name for _, item in collector.to_map().values()] == ["c", "a"]